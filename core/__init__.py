@@ -1,7 +1,15 @@
 # -*- coding: utf-8 -*-
 """核心功能模块"""
 
-from .ipatool import IPATool
-from .config import Config
-
 __all__ = ['IPATool', 'Config']
+
+
+def __getattr__(name):
+    # 延迟导入，导入 core.profiler 等轻量子模块时不会连带加载 ipatool 与配置
+    if name == 'IPATool':
+        from .ipatool import IPATool
+        return IPATool
+    if name == 'Config':
+        from .config import Config
+        return Config
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+多账号池
+
+除主账号（使用用户主目录下的 ~/.ipatool）外，可以添加多个 Apple ID，
+每个账号拥有独立的 ipatool 主目录（应用数据目录/accounts/<账号>），
+调用 ipatool 时通过 HOME/USERPROFILE 环境变量指向该目录，会话与钥匙串文件互不干扰。
+
+macOS 上 ipatool 优先使用系统钥匙串，各账号的凭据可能相互覆盖（Windows/Linux 使用文件钥匙串，可完全隔离）。
+因此账号参与下载前先在其主目录执行 `auth info`（在后台线程中）核对实际登录的 Apple ID，
+不一致时停用该账号，避免下载、许可缓存与限速预算记到错误的账号上。
+"""
+
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from .config import get_app_dir
+
+
+def _slug(email: str) -> str:
+    """账号目录名"""
+    return re.sub(r'[^a-z0-9._-]+', '_', email.strip().lower()) or 'account'
+
+
+class AccountPool:
+    """额外 Apple ID 账号池"""
+
+    def __init__(self, pool_file: Optional[Path] = None, root: Optional[Path] = None):
+        """
+        初始化
+
+        Args:
+            pool_file: 账号列表文件，None 则保存在应用数据目录
+            root: 各账号 ipatool 主目录的父目录
+        """
+        self.pool_file = Path(pool_file) if pool_file else get_app_dir() / 'accounts.json'
+        self.root = Path(root) if root else get_app_dir() / 'accounts'
+        self._lock = threading.Lock()
+        self._accounts: Optional[List[Dict]] = None
+        self._tools: Dict[str, object] = {}
+        # 本次运行中已核对过登录身份的账号（小写）
+        self._verified: Set[str] = set()
+
+    def _load(self) -> List[Dict]:
+        if self._accounts is None:
+            accounts = []
+            try:
+                with open(self.pool_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                accounts = [a for a in data.get('accounts', []) if isinstance(a, dict) and a.get('email')]
+            except (OSError, ValueError, AttributeError):
+                pass
+            self._accounts = accounts
+        return self._accounts
+
+    def _save(self):
+        try:
+            self.pool_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.pool_file.with_suffix('.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'accounts': self._accounts}, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.pool_file)
+        except OSError as e:
+            print(f"保存账号池失败: {e}")
+
+    def _find(self, email: str) -> Optional[Dict]:
+        key = email.strip().lower()
+        for account in self._load():
+            if account['email'].lower() == key:
+                return account
+        return None
+
+    def accounts(self) -> List[Dict]:
+        """全部账号（副本）"""
+        with self._lock:
+            return [dict(a) for a in self._load()]
+
+    def home_for(self, email: str) -> Path:
+        """账号的 ipatool 主目录"""
+        return self.root / _slug(email)
+
+    def add(self, email: str) -> Dict:
+        """添加账号（已存在时返回原记录），并创建其主目录"""
+        with self._lock:
+            account = self._find(email)
+            if account is None:
+                account = {
+                    'email': email.strip(),
+                    'home': str(self.home_for(email)),
+                    'enabled': True,
+                    'added': round(time.time())
+                }
+                self._load().append(account)
+                self._save()
+            Path(account['home']).mkdir(parents=True, exist_ok=True)
+            return dict(account)
+
+    def remove(self, email: str):
+        """移除账号并删除其 ipatool 主目录（会话与凭据）"""
+        with self._lock:
+            account = self._find(email)
+            if account is None:
+                return
+            self._accounts.remove(account)
+            self._tools.pop(account['email'].lower(), None)
+            self._verified.discard(account['email'].lower())
+            self._save()
+        shutil.rmtree(account['home'], ignore_errors=True)
+
+    def set_enabled(self, email: str, enabled: bool):
+        """启用/停用账号（停用的账号不参与下载分配）"""
+        with self._lock:
+            account = self._find(email)
+            if account is not None and account.get('enabled', True) != enabled:
+                account['enabled'] = enabled
+                if enabled:
+                    # 重新启用时再次核对身份
+                    self._verified.discard(account['email'].lower())
+                    account.pop('error', None)
+                self._save()
+
+    def tool_for(self, email: str, ipatool_path: str):
+        """
+        账号对应的 IPATool 实例（按账号缓存）
+
+        Args:
+            email: 账号
+            ipatool_path: ipatool 可执行文件路径
+
+        Returns:
+            IPATool；账号不存在时返回 None
+        """
+        from .ipatool import IPATool
+        with self._lock:
+            account = self._find(email)
+            if account is None:
+                return None
+            key = account['email'].lower()
+            tool = self._tools.get(key)
+            if tool is None or tool.ipatool_path != ipatool_path:
+                # account_email 在 verify 中由 auth info 的结果设置
+                tool = IPATool(ipatool_path, home=account['home'])
+                self._tools[key] = tool
+                self._verified.discard(key)
+            return tool
+
+    def verify(self, email: str, ipatool_path: str) -> bool:
+        """
+        核对账号主目录中实际登录的 Apple ID，不一致或未登录时停用该账号
+
+        Args:
+            email: 账号
+            ipatool_path: ipatool 可执行文件路径
+
+        Returns:
+            是否可以使用该账号
+        """
+        tool = self.tool_for(email, ipatool_path)
+        if tool is None:
+            return False
+        try:
+            actual = tool.get_account_info().get('email') or ''
+        except Exception as e:
+            print(f"核对账号 {email} 失败: {e}")
+            actual = ''
+        with self._lock:
+            account = self._find(email)
+            if account is None:
+                return False
+            key = account['email'].lower()
+            if actual.strip().lower() == key:
+                self._verified.add(key)
+                if account.pop('error', None) is not None:
+                    self._save()
+                return True
+            tool.account_email = None
+            self._verified.discard(key)
+            account['enabled'] = False
+            account['error'] = f"会话中登录的是 {actual}" if actual else "会话未登录"
+            self._save()
+        print(f"账号池账号 {email} 已停用: {account['error']}")
+        return False
+
+    def invalidate(self):
+        """登录任意账号后调用：共用系统钥匙串时其他账号的凭据可能已被覆盖，需要重新核对"""
+        with self._lock:
+            self._verified.clear()
+
+    def unverified(self) -> List[str]:
+        """已启用但在本次运行中尚未核对身份的账号（由调用方在后台线程中逐个 verify）"""
+        with self._lock:
+            return [a['email'] for a in self._load()
+                    if a.get('enabled', True) and a['email'].lower() not in self._verified]
+
+    def tools(self, ipatool_path: str) -> List:
+        """所有已启用且身份核对一致的账号的 IPATool 实例（尚未核对的账号不包含在内，不会阻塞调用方）"""
+        tools = []
+        for account in self.accounts():
+            if not account.get('enabled', True):
+                continue
+            with self._lock:
+                verified = account['email'].lower() in self._verified
+            if not verified:
+                continue
+            tool = self.tool_for(account['email'], ipatool_path)
+            if tool is not None:
+                tools.append(tool)
+        return tools
+
+
+_pool: Optional[AccountPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_account_pool() -> AccountPool:
+    """进程内共享的账号池"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = AccountPool()
+        return _pool
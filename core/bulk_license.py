@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+批量获取应用许可
+
+以有限并发为一批 Bundle ID 调用 `ipatool purchase`（调用速率由
+全局限速器的 purchase 预算控制），复用许可缓存（已拥有许可的应用不产生任何调用），
+并输出 CSV/JSON 报告。只有限流、超时等临时故障才会退避重试，
+应用不存在、付费应用、未登录等错误重试也不会成功，直接记为失败。
+
+命令行用法:
+    python -m core.bulk_license bundle_ids.txt -o report.csv [-j 4] [--rate 0.5] [--retries 2]
+"""
+
+import argparse
+import csv
+import json
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .concurrency import is_throttle_error
+from .licenses import LicenseCache, acquire_license, get_license_cache
+from .ratelimit import get_rate_limiter
+
+REPORT_FIELDS = ['bundle_id', 'status', 'attempts', 'elapsed', 'error']
+
+# 结果状态
+CACHED = 'cached'
+LICENSED = 'licensed'
+FAILED = 'failed'
+
+# 网络、超时等临时故障的关键词（限流由 is_throttle_error 判断）
+_TRANSIENT_HINTS = (
+    'timeout', 'timed out', 'connection reset', 'connection refused', 'network', 'unexpected eof',
+    'service unavailable', 'temporarily unavailable', '超时', '稍后再试',
+)
+
+
+def is_retryable(error: str) -> bool:
+    """purchase 失败是否值得重试（限流或临时故障）"""
+    text = (error or '').lower()
+    return is_throttle_error(text) or any(hint in text for hint in _TRANSIENT_HINTS)
+
+
+def read_bundle_ids(path: str) -> List[str]:
+    """读取 Bundle ID 列表（每行一个或以逗号/空白分隔，# 开头为注释），去重并保持顺序"""
+    seen = set()
+    ids = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0]
+            for bundle_id in re.split(r'[\s,;]+', line.strip()):
+                if bundle_id and bundle_id not in seen:
+                    seen.add(bundle_id)
+                    ids.append(bundle_id)
+    return ids
+
+
+def acquire_licenses(
+    ipatool,
+    bundle_ids: Iterable[str],
+    concurrency: int = 4,
+    retries: int = 2,
+    backoff: float = 2.0,
+    cache: Optional[LicenseCache] = None,
+    on_result: Optional[Callable[[Dict], None]] = None
+) -> List[Dict]:
+    """
+    批量获取许可
+
+    Args:
+        ipatool: IPATool 实例（需已登录）
+        bundle_ids: Bundle ID 列表
+        concurrency: 并发 purchase 调用数（实际速率受全局限速器约束）
+        retries: 限流或临时故障后的重试次数（其他错误不重试）
+        backoff: 重试等待的基数（秒），按指数增长
+        cache: 许可缓存，None 则使用共享实例
+        on_result: 每个应用完成后的回调（可在工作线程中调用）
+
+    Returns:
+        按输入顺序排列的结果列表
+    """
+    cache = cache or get_license_cache()
+    account = getattr(ipatool, 'account_email', None)
+    ids = list(dict.fromkeys(b for b in bundle_ids if b))
+
+    def run_one(bundle_id: str) -> Dict:
+        started = time.monotonic()
+        entry = {'bundle_id': bundle_id, 'status': FAILED, 'attempts': 0, 'elapsed': 0.0, 'error': ''}
+        if cache.is_licensed(account, bundle_id):
+            entry['status'] = CACHED
+        else:
+            for attempt in range(retries + 1):
+                if attempt:
+                    time.sleep(backoff * (2 ** (attempt - 1)))
+                entry['attempts'] = attempt + 1
+                result = acquire_license(ipatool, bundle_id, cache)
+                if result['licensed']:
+                    entry['status'] = CACHED if result['cached'] else LICENSED
+                    entry['error'] = ''
+                    break
+                entry['error'] = str(result.get('error', ''))
+                if not is_retryable(entry['error']):
+                    break
+        entry['elapsed'] = round(time.monotonic() - started, 3)
+        if on_result:
+            on_result(entry)
+        return entry
+
+    if not ids:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix='bulk-license') as pool:
+        return list(pool.map(run_one, ids))
+
+
+def write_report(results: List[Dict], path: str):
+    """按扩展名写出 CSV 或 JSON 报告"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix.lower() == '.json':
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    else:
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(results)
+
+
+def summarize(results: List[Dict]) -> Dict[str, int]:
+    """统计各状态数量"""
+    counts = {CACHED: 0, LICENSED: 0, FAILED: 0}
+    for entry in results:
+        counts[entry['status']] = counts.get(entry['status'], 0) + 1
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行入口"""
+    from .config import Config
+    from .ipatool import IPATool
+
+    parser = argparse.ArgumentParser(description='批量获取 App Store 应用许可')
+    parser.add_argument('input', help='Bundle ID 列表文件')
+    parser.add_argument('-o', '--output', default='licenses_report.csv', help='报告文件（.csv 或 .json）')
+    parser.add_argument('-j', '--concurrency', type=int, default=4, help='并发数')
+    parser.add_argument('--rate', type=float, default=None, help='覆盖 purchase 预算：每秒最多调用次数')
+    parser.add_argument('--retries', type=int, default=2, help='限流或临时故障的重试次数')
+    parser.add_argument('--ipatool', default=None, help='ipatool 路径（默认读取配置或自动查找）')
+    args = parser.parse_args(argv)
+
+    try:
+        ipatool = IPATool(args.ipatool or Config().ipatool_path or None)
+    except FileNotFoundError as e:
+        print(e, file=sys.stderr)
+        return 2
+    if not ipatool.check_auth():
+        print("请先登录 Apple ID", file=sys.stderr)
+        return 2
+
+    if args.rate is not None:
+        get_rate_limiter().configure('purchase', args.rate)
+
+    ids = read_bundle_ids(args.input)
+    total = len(ids)
+    done = [0]
+    lock = threading.Lock()
+
+    def report(entry: Dict):
+        with lock:
+            done[0] += 1
+            print(f"[{done[0]}/{total}] {entry['bundle_id']}: {entry['status']} {entry['error']}".rstrip())
+
+    results = acquire_licenses(
+        ipatool, ids, args.concurrency, args.retries, on_result=report
+    )
+    write_report(results, args.output)
+    counts = summarize(results)
+    print(f"完成: 新获取 {counts[LICENSED]}，已拥有 {counts[CACHED]}，失败 {counts[FAILED]}；报告: {args.output}")
+    return 0 if counts[FAILED] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
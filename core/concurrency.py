@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+下载并发自适应控制（AIMD）
+
+每完成一个下载任务记录一次样本（字节数、耗时、是否失败）：
+- 出现限流或错误率过高时乘性减小并发数；
+- 当前并发下已完成足够多的任务且总吞吐仍随并发增长时加性增大并发数；
+- 总吞吐不再随并发增长时回退一级并保持若干轮，之后再次试探；
+- 单任务延迟明显变差时不再试探更高的并发。
+并发数始终位于 [floor, ceiling] 之间，每次调整都会记录原因供指标页展示。
+"""
+
+import re
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+
+# 错误信息中表示被 App Store 限流的关键词
+_THROTTLE_HINTS = ('rate limit', 'too many', 'throttl', 'try again later', '请求过于频繁')
+# HTTP 429 状态码：只匹配紧跟在 HTTP/status/code 之后的独立数字（如 "HTTP 429"、"status code: 429"），
+# 不会误把 App ID、文件大小等包含 429 的数字当作限流
+_THROTTLE_STATUS = re.compile(r'(?:http(?:/[\d.]+)?|status(?: code)?|code)\W{0,3}429(?![\w.])')
+
+
+def is_throttle_error(text: str) -> bool:
+    """错误信息是否表示被限流"""
+    text = (text or '').lower()
+    return any(hint in text for hint in _THROTTLE_HINTS) or _THROTTLE_STATUS.search(text) is not None
+
+
+class Decision:
+    """一次并发调整（或保持）的记录"""
+
+    __slots__ = ('ts', 'old', 'new', 'reason', 'throughput', 'error_rate', 'latency')
+
+    def __init__(self, ts: float, old: int, new: int, reason: str,
+                 throughput: float, error_rate: float, latency: float):
+        self.ts = ts
+        self.old = old
+        self.new = new
+        self.reason = reason
+        self.throughput = throughput  # 总吞吐（字节/秒）
+        self.error_rate = error_rate  # 近期失败比例
+        self.latency = latency  # 近期单任务每 MB 耗时（秒）
+
+    @property
+    def changed(self) -> bool:
+        return self.old != self.new
+
+    def to_dict(self) -> Dict:
+        return {k: getattr(self, k) for k in self.__slots__}
+
+
+class AIMDController:
+    """根据吞吐、错误率与延迟调整并发下载数"""
+
+    def __init__(
+        self,
+        floor: int = 1,
+        ceiling: int = 4,
+        initial: Optional[int] = None,
+        decrease_factor: float = 0.5,
+        error_threshold: float = 0.25,
+        gain_threshold: float = 0.1,
+        latency_factor: float = 2.0,
+        window: int = 8,
+        probe_interval: int = 5,
+        history: int = 50,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        初始化
+
+        Args:
+            floor: 最小并发数
+            ceiling: 最大并发数
+            initial: 初始并发数，None 则为 floor
+            decrease_factor: 拥塞时的乘性减小系数
+            error_threshold: 近期失败比例超过该值视为拥塞
+            gain_threshold: 总吞吐比上一级至少提高该比例才继续增加并发
+            latency_factor: 单任务每 MB 耗时超过最好水平的该倍数视为延迟变差
+            window: 统计错误率与延迟的最近任务数
+            probe_interval: 吞吐饱和回退后，保持多少轮评估再尝试增加并发
+            history: 保留的调整记录数
+            clock: 时钟函数
+        """
+        self.floor = max(1, floor)
+        self.ceiling = max(self.floor, ceiling)
+        self.decrease_factor = decrease_factor
+        self.error_threshold = error_threshold
+        self.gain_threshold = gain_threshold
+        self.latency_factor = latency_factor
+        self.probe_interval = probe_interval
+        self.clock = clock
+        self.limit = min(self.ceiling, max(self.floor, initial or self.floor))
+        self._samples: Deque[tuple] = deque(maxlen=max(2, window))  # (成功, 每 MB 耗时)
+        self.decisions: Deque[Decision] = deque(maxlen=history)
+        # 各并发级别观测到的总吞吐（字节/秒）
+        self._level_throughput: Dict[int, float] = {}
+        self._best_latency: Optional[float] = None
+        # 吞吐饱和的并发级别及剩余的保持轮数
+        self._plateau: Optional[int] = None
+        self._hold = 0
+        self._reset_level()
+
+    def _reset_level(self):
+        self._level_started = self.clock()
+        self._level_bytes = 0
+        self._level_done = 0
+
+    def set_bounds(self, floor: int, ceiling: int):
+        """修改上下限（当前并发数会被限制到新范围内）"""
+        self.floor = max(1, floor)
+        self.ceiling = max(self.floor, ceiling)
+        clamped = min(self.ceiling, max(self.floor, self.limit))
+        if clamped != self.limit:
+            self._apply(clamped, '上下限已修改')
+
+    @property
+    def error_rate(self) -> float:
+        if not self._samples:
+            return 0.0
+        return sum(1 for ok, _ in self._samples if not ok) / len(self._samples)
+
+    @property
+    def latency(self) -> float:
+        """近期成功任务每 MB 的平均耗时（秒）"""
+        values = [lat for ok, lat in self._samples if ok and lat is not None]
+        return sum(values) / len(values) if values else 0.0
+
+    @property
+    def throughput(self) -> float:
+        """当前并发级别下的总吞吐（字节/秒）"""
+        elapsed = self.clock() - self._level_started
+        return self._level_bytes / elapsed if elapsed > 0 else 0.0
+
+    def record(self, ok: bool, nbytes: int = 0, elapsed: float = 0.0, error: str = '') -> Optional[Decision]:
+        """
+        记录一个完成的任务并在需要时调整并发数
+
+        Args:
+            ok: 是否成功
+            nbytes: 下载字节数
+            elapsed: 任务耗时（秒）
+            error: 失败原因
+
+        Returns:
+            本次产生的调整记录（未评估时为 None）
+        """
+        latency = elapsed / (nbytes / 1048576) if ok and nbytes > 0 and elapsed > 0 else None
+        self._samples.append((ok, latency))
+        if ok:
+            self._level_bytes += max(0, nbytes)
+            self._level_done += 1
+            if latency is not None and (self._best_latency is None or latency < self._best_latency):
+                self._best_latency = latency
+
+        if not ok and is_throttle_error(error):
+            return self._decrease('被限流')
+        if not ok and len(self._samples) >= 2 and self.error_rate > self.error_threshold:
+            return self._decrease(f'错误率 {self.error_rate:.0%}')
+        # 当前级别完成的任务数达到并发数后再评估，样本才能反映该级别的总吞吐
+        if not ok or self._level_done < self.limit:
+            return None
+
+        throughput = self.throughput
+        self._level_throughput[self.limit] = throughput
+        previous = self._level_throughput.get(self.limit - 1)
+        if (previous is not None and self.limit > self.floor
+                and throughput < previous * (1 + self.gain_threshold)):
+            # 多出的并发没有带来吞吐，回退一级，保持一段时间后再试探
+            self._plateau = self.limit
+            self._hold = self.probe_interval
+            return self._apply(self.limit - 1, '吞吐已饱和')
+        if self._hold > 0 and self._plateau == self.limit + 1:
+            self._hold -= 1
+            return self._apply(self.limit, '保持（吞吐已饱和）')
+        if self._best_latency and self.latency > self._best_latency * self.latency_factor:
+            return self._apply(self.limit, '保持（延迟变差）')
+        if self.limit < self.ceiling:
+            return self._apply(self.limit + 1, '吞吐随并发提升')
+        return self._apply(self.limit, '已达上限')
+
+    def _decrease(self, reason: str) -> Decision:
+        new = max(self.floor, int(self.limit * self.decrease_factor))
+        # 拥塞后清空样本，避免同一批失败连续触发减小
+        self._samples.clear()
+        return self._apply(new, reason)
+
+    def _apply(self, new: int, reason: str) -> Decision:
+        decision = Decision(
+            time.time(), self.limit, new, reason,
+            round(self.throughput, 1), round(self.error_rate, 3), round(self.latency, 3)
+        )
+        # 连续相同的保持记录只保留一条
+        last = self.decisions[-1] if self.decisions else None
+        if decision.changed or last is None or last.changed or last.reason != reason:
+            self.decisions.append(decision)
+        self.limit = new
+        self._reset_level()
+        return decision
+
+    def snapshot(self) -> List[Decision]:
+        """调整记录（旧 -> 新）"""
+        return list(self.decisions)
@@ -8,6 +8,15 @@ from pathlib import Path
 from typing import Dict, Any
 import platform
 
+from .locks import MAX_DOWNLOADS_PER_ACCOUNT
+
+
+def get_app_dir() -> Path:
+    """应用数据目录（Windows: AppData/Local/IPADownload，其他: ~/.ipadownload）"""
+    if platform.system() == 'Windows':
+        return Path.home() / 'AppData' / 'Local' / 'IPADownload'
+    return Path.home() / '.ipadownload'
+
 
 class Config:
     """配置管理类"""
@@ -21,11 +30,7 @@ class Config:
         """
         # 默认保存到用户目录（Windows: AppData/Local/IPADownload，其他: ~/.ipadownload）
         if not config_file or config_file == 'config.json':
-            if platform.system() == 'Windows':
-                default_dir = Path.home() / 'AppData' / 'Local' / 'IPADownload'
-            else:
-                default_dir = Path.home() / '.ipadownload'
-            self.config_file = default_dir / 'config.json'
+            self.config_file = get_app_dir() / 'config.json'
         else:
             self.config_file = Path(config_file)
         self.config_data = self._load_config()
@@ -143,6 +148,78 @@ class Config:
     def auto_purchase(self, value: bool):
         self.set('auto_purchase', value)
     
+    @property
+    def concurrency_floor(self) -> int:
+        """最小并发下载数（自适应并发控制的下限）"""
+        return min(int(self.get('download_concurrency.floor', 1)), MAX_DOWNLOADS_PER_ACCOUNT)
+    
+    @concurrency_floor.setter
+    def concurrency_floor(self, value: int):
+        self.set('download_concurrency.floor', int(value))
+    
+    @property
+    def concurrency_ceiling(self) -> int:
+        """最大并发下载数（自适应并发控制的上限，不超过每个账号的下载槽位数）"""
+        return min(int(self.get('download_concurrency.ceiling', 4)), MAX_DOWNLOADS_PER_ACCOUNT)
+    
+    @concurrency_ceiling.setter
+    def concurrency_ceiling(self, value: int):
+        self.set('download_concurrency.ceiling', int(value))
+    
+    @property
+    def verify_downloads(self) -> bool:
+        """下载完成后校验 IPA 完整性"""
+        return bool(self.get('verify_downloads', True))
+    
+    @verify_downloads.setter
+    def verify_downloads(self, value: bool):
+        self.set('verify_downloads', bool(value))
+    
+    @property
+    def watchlist_interval(self) -> int:
+        """关注列表的检查间隔（分钟，0 表示只手动检查）"""
+        return int(self.get('watchlist.interval_minutes', 60))
+    
+    @watchlist_interval.setter
+    def watchlist_interval(self, value: int):
+        self.set('watchlist.interval_minutes', int(value))
+    
+    @property
+    def watchlist_auto_download(self) -> bool:
+        """关注的应用有新版本时是否自动下载"""
+        return bool(self.get('watchlist.auto_download', True))
+    
+    @watchlist_auto_download.setter
+    def watchlist_auto_download(self, value: bool):
+        self.set('watchlist.auto_download', bool(value))
+    
+    @property
+    def history_max_entries(self) -> int:
+        """下载历史最多保留的条数（0 表示不限制）"""
+        return int(self.get('history_retention.max_entries', 0))
+    
+    @history_max_entries.setter
+    def history_max_entries(self, value: int):
+        self.set('history_retention.max_entries', int(value))
+    
+    @property
+    def history_max_age_days(self) -> int:
+        """下载历史保留的天数（0 表示不限制）"""
+        return int(self.get('history_retention.max_age_days', 0))
+    
+    @history_max_age_days.setter
+    def history_max_age_days(self, value: int):
+        self.set('history_retention.max_age_days', int(value))
+    
+    @property
+    def history_keep_per_bundle(self) -> int:
+        """每个应用保留的最近记录数（0 表示不限制）"""
+        return int(self.get('history_retention.keep_per_bundle', 0))
+    
+    @history_keep_per_bundle.setter
+    def history_keep_per_bundle(self, value: int):
+        self.set('history_retention.keep_per_bundle', int(value))
+    
     @property
     def remember_credentials(self) -> bool:
         """记住凭据"""
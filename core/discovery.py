@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+ipatool 查找结果缓存
+
+缓存已解析的 ipatool 路径、文件指纹（大小 + mtime）与 `--version` 输出，
+后续仅通过 stat 校验指纹，指纹变化时才重新查找或重新执行 `--version`。
+查找结果按配置的 ipatool 路径分别缓存，修改设置后不会沿用旧配置下的结果。
+"""
+
+import json
+import os
+import platform
+import subprocess
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .config import get_app_dir
+
+
+def _fingerprint(path: str) -> Optional[List[int]]:
+    """文件指纹：[大小, mtime(ns)]，文件不存在时返回 None"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _run_version(path: str) -> Optional[str]:
+    """执行 `ipatool --version`，失败返回 None"""
+    startupinfo = None
+    creationflags = 0
+    if platform.system() == 'Windows':
+        try:
+            startupinfo = subprocess.STARTUPINFO()
+            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+            creationflags = subprocess.CREATE_NO_WINDOW
+        except Exception:
+            startupinfo = None
+            creationflags = 0
+    try:
+        result = subprocess.run(
+            [path, '--version'],
+            capture_output=True,
+            text=True,
+            timeout=5,
+            startupinfo=startupinfo,
+            creationflags=creationflags
+        )
+    except Exception:
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip() or None
+
+
+class DiscoveryCache:
+    """ipatool 查找缓存"""
+
+    def __init__(self, cache_file: Optional[Path] = None):
+        """
+        初始化
+
+        Args:
+            cache_file: 缓存文件路径，None 则保存在应用数据目录
+        """
+        self.cache_file = Path(cache_file) if cache_file else get_app_dir() / 'ipatool_cache.json'
+        self._lock = threading.Lock()
+        self._data: Optional[Dict] = None
+
+    def _load(self) -> Dict:
+        if self._data is None:
+            data: Dict = {}
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                pass
+            if not isinstance(data, dict):
+                data = {}
+            # 配置的路径 -> 查找结果（旧版本缓存只有一个结果，直接丢弃）
+            if not isinstance(data.get('resolved'), dict):
+                data['resolved'] = {}
+            data.setdefault('entries', {})
+            self._data = data
+        return self._data
+
+    def _save(self):
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.cache_file.with_suffix('.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f, ensure_ascii=False)
+            os.replace(tmp, self.cache_file)
+        except OSError as e:
+            print(f"保存 ipatool 缓存失败: {e}")
+
+    def _entry(self, path: str) -> Optional[Dict]:
+        """返回指纹仍然有效的缓存条目，并清理失效条目"""
+        data = self._load()
+        entry = data['entries'].get(path)
+        if entry is None:
+            return None
+        if entry.get('fingerprint') != _fingerprint(path):
+            data['entries'].pop(path, None)
+            return None
+        return entry
+
+    def resolve(self, finder: Callable[[], Optional[str]], configured: Optional[str] = None) -> Optional[str]:
+        """
+        返回已缓存的 ipatool 路径；缓存失效时调用 finder 重新查找
+
+        Args:
+            finder: 实际的查找函数
+            configured: 设置中配置的路径（无效时才会查找），不同配置的查找结果分别缓存
+        """
+        key = configured or ''
+        with self._lock:
+            data = self._load()
+            cached = data['resolved'].get(key)
+            if cached and self._entry(cached) is not None:
+                return cached
+
+            found = finder()
+            data['resolved'][key] = found
+            if found:
+                fp = _fingerprint(found)
+                if fp is not None:
+                    data['entries'][found] = {'fingerprint': fp, 'version': None}
+            self._save()
+            return found
+
+    def version(self, path: str) -> Optional[str]:
+        """
+        返回 ipatool 版本，仅在文件指纹变化后才重新执行 `--version`
+
+        Args:
+            path: ipatool 可执行文件路径
+        """
+        with self._lock:
+            entry = self._entry(path)
+            if entry is not None and entry.get('version'):
+                return entry['version']
+
+            fp = _fingerprint(path)
+            if fp is None:
+                return None
+            version = _run_version(path)
+            if version:
+                self._load()['entries'][path] = {'fingerprint': fp, 'version': version}
+                self._save()
+            return version
+
+    def invalidate(self):
+        """清空缓存（例如重新安装 ipatool 后）"""
+        with self._lock:
+            self._data = {'resolved': {}, 'entries': {}}
+            self._save()
+
+
+_cache: Optional[DiscoveryCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_discovery_cache() -> DiscoveryCache:
+    """进程内共享的缓存实例"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DiscoveryCache()
+        return _cache
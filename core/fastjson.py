@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+JSON 解码
+
+安装了 orjson 或 msgspec 时使用更快的解码器，否则回退到标准库 json。
+解码失败统一抛出 DecodeError。
+"""
+
+import json
+
+try:
+    import orjson
+
+    loads = orjson.loads
+    DecodeError = orjson.JSONDecodeError
+    BACKEND = 'orjson'
+except ImportError:
+    try:
+        import msgspec
+
+        loads = msgspec.json.Decoder().decode
+        DecodeError = msgspec.DecodeError
+        BACKEND = 'msgspec'
+    except ImportError:
+        loads = json.loads
+        DecodeError = json.JSONDecodeError
+        BACKEND = 'json'
+
+__all__ = ['loads', 'DecodeError', 'BACKEND']
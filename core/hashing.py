@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+边写边算的文件摘要
+
+ipatool 顺序写入输出文件（下载后重新打包 IPA 时同样是顺序写入），
+下载过程中反复读取新追加的部分即可增量计算 SHA-256，下载结束时摘要也随即可用，
+无需再完整读取一遍 IPA。安装了 blake3 时同时计算 BLAKE3。
+
+ipatool 先写入 <output>.tmp，完成后改名为目标文件：目标文件出现前跟随临时文件，
+改名后仍是同一个文件（设备号与 inode 不变），已计算的部分继续有效。
+每次读取都重新打开文件并在读取后立即关闭，不会妨碍 ipatool 改名或删除文件（Windows）。
+文件被替换或截断时自动从头计算；结束时若已读取的长度与文件大小不一致则完整重算。
+"""
+
+import hashlib
+import os
+from typing import Dict, Optional
+
+try:
+    import blake3 as _blake3
+except ImportError:
+    _blake3 = None
+
+ALGORITHMS = ('sha256', 'blake3') if _blake3 is not None else ('sha256',)
+
+
+def _new_hashers() -> Dict[str, object]:
+    hashers = {'sha256': hashlib.sha256()}
+    if _blake3 is not None:
+        hashers['blake3'] = _blake3.blake3()
+    return hashers
+
+
+class StreamingHasher:
+    """跟随文件写入增量计算摘要（poll 与 finish 需在同一线程调用）"""
+
+    def __init__(self, path: str, partial: Optional[str] = None, chunk_size: int = 1024 * 1024):
+        """
+        初始化
+
+        Args:
+            path: 被写入的文件
+            partial: 写入过程中使用的临时文件（如 <path>.tmp），目标文件出现前跟随该文件
+            chunk_size: 每次读取的块大小
+        """
+        self.path = path
+        self.partial = partial
+        self.chunk_size = chunk_size
+        self.rehashed = False
+        self._reset()
+
+    def _reset(self):
+        self._hashers = _new_hashers()
+        self.offset = 0
+        self._file_id = None
+
+    def poll(self) -> int:
+        """
+        读取文件新追加的部分
+
+        Returns:
+            已计算摘要的字节数
+        """
+        # 目标文件存在时以它为准（改名后或重新打包时），否则跟随临时文件
+        for path in (self.path, self.partial):
+            if not path:
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            break
+        else:
+            return self.offset
+        file_id = (st.st_dev, st.st_ino)
+        if (self._file_id is not None and file_id != self._file_id) or st.st_size < self.offset:
+            # 文件被替换或截断，从头开始
+            self._reset()
+        self._file_id = file_id
+        remaining = st.st_size - self.offset
+        if remaining <= 0:
+            return self.offset
+        try:
+            with open(path, 'rb') as f:
+                f.seek(self.offset)
+                while remaining > 0:
+                    chunk = f.read(min(self.chunk_size, remaining))
+                    if not chunk:
+                        break
+                    for hasher in self._hashers.values():
+                        hasher.update(chunk)
+                    self.offset += len(chunk)
+                    remaining -= len(chunk)
+        except OSError:
+            pass
+        return self.offset
+
+    def finish(self, path: Optional[str] = None) -> Optional[Dict[str, str]]:
+        """
+        写入结束后读取剩余部分并返回摘要
+
+        Args:
+            path: 文件的最终路径（写入结束后被改名时传入）
+
+        Returns:
+            {算法: 十六进制摘要}；文件不存在时返回 None
+        """
+        if path:
+            self.path = path
+        self.poll()
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        if st.st_size != self.offset or (st.st_dev, st.st_ino) != self._file_id:
+            # 最后一次读取后文件又被替换或改动，增量结果不可用，完整重算
+            self.rehashed = True
+            self._reset()
+            self.poll()
+        return {name: hasher.hexdigest() for name, hasher in self._hashers.items()}
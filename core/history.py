@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+下载历史的去重与保留策略
+
+同一文件被重复下载时历史中会出现多条指向同一路径的记录，只保留最新一条；
+再按保留策略删除过旧的记录、每个应用只保留最近若干条、总数不超过上限。
+压缩后的历史写回配置文件，历史的体积与加载时间因此保持有界。
+"""
+
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class RetentionPolicy:
+    """历史保留策略（各项为 0 表示不限制）"""
+
+    __slots__ = ('max_entries', 'max_age_days', 'keep_per_bundle')
+
+    def __init__(self, max_entries: int = 0, max_age_days: int = 0, keep_per_bundle: int = 0):
+        self.max_entries = max(0, int(max_entries))
+        self.max_age_days = max(0, int(max_age_days))
+        self.keep_per_bundle = max(0, int(keep_per_bundle))
+
+    @property
+    def active(self) -> bool:
+        """是否设置了任何限制"""
+        return bool(self.max_entries or self.max_age_days or self.keep_per_bundle)
+
+    def describe(self) -> str:
+        """策略说明"""
+        parts = []
+        if self.max_entries:
+            parts.append(f"最多 {self.max_entries} 条")
+        if self.max_age_days:
+            parts.append(f"{self.max_age_days} 天内")
+        if self.keep_per_bundle:
+            parts.append(f"每个应用最近 {self.keep_per_bundle} 条")
+        return "，".join(parts) if parts else "不限制"
+
+
+def compact_history(
+    history: List[Dict[str, Any]],
+    policy: Optional[RetentionPolicy] = None,
+    now: Optional[float] = None
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    去重并按保留策略裁剪历史
+
+    Args:
+        history: 下载历史
+        policy: 保留策略，None 则只去重
+        now: 当前时间戳（计算记录年龄）
+
+    Returns:
+        (按时间正序的新历史, {'before', 'after', 'duplicates', 'expired', 'per_bundle', 'overflow'})
+    """
+    policy = policy or RetentionPolicy()
+    now = time.time() if now is None else now
+    items = [item for item in history if isinstance(item, dict)]
+    before = len(history)
+    # 新记录在前，便于"保留最新"
+    items.sort(key=lambda x: x.get('timestamp', 0) or 0, reverse=True)
+
+    seen_paths = set()
+    per_bundle: Dict[str, int] = {}
+    cutoff = now - policy.max_age_days * 86400 if policy.max_age_days else None
+    kept = []
+    stats = {'duplicates': 0, 'expired': 0, 'per_bundle': 0, 'overflow': 0}
+    for item in items:
+        path = item.get('file_path')
+        if path:
+            if path in seen_paths:
+                stats['duplicates'] += 1
+                continue
+            seen_paths.add(path)
+        if cutoff is not None and (item.get('timestamp', 0) or 0) < cutoff:
+            stats['expired'] += 1
+            continue
+        bundle = item.get('bundle_id') or ''
+        if policy.keep_per_bundle and bundle:
+            count = per_bundle.get(bundle, 0)
+            if count >= policy.keep_per_bundle:
+                stats['per_bundle'] += 1
+                continue
+            per_bundle[bundle] = count + 1
+        if policy.max_entries and len(kept) >= policy.max_entries:
+            stats['overflow'] += 1
+            continue
+        kept.append(item)
+
+    kept.reverse()
+    stats['before'] = before
+    stats['after'] = len(kept)
+    return kept, stats
+
+
+def history_stats(history: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    历史记录的规模
+
+    Returns:
+        {'entries': 条数, 'bundles': 应用数, 'files': 记录的文件总大小}
+    """
+    bundles = set()
+    files = 0
+    for item in history:
+        if not isinstance(item, dict):
+            continue
+        bundles.add(item.get('bundle_id') or '')
+        size = item.get('size')
+        if isinstance(size, int):
+            files += size
+    bundles.discard('')
+    return {'entries': len(history), 'bundles': len(bundles), 'files': files}
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+IPA 元数据读取
+
+IPA 是 ZIP 文件，末尾的中央目录记录了每个成员的名称与偏移。
+只读取中央目录定位 `Payload/<App>.app/Info.plist`，再定位并解压这一个成员，
+无论 IPA 多大都只需几次 seek 和几十 KB 的读取，不会解压整个压缩包。
+"""
+
+import plistlib
+import re
+import zipfile
+from typing import Any, Dict, Optional
+
+# 只匹配主应用的 Info.plist（不含 Watch、插件等嵌套的 .app / .appex）
+_INFO_PLIST = re.compile(r'^Payload/[^/]+\.app/Info\.plist$')
+# Info.plist 的合理上限，防止损坏的压缩包声明超大成员
+MAX_PLIST_SIZE = 8 * 1024 * 1024
+
+
+def _find_info_plist(zf: zipfile.ZipFile) -> Optional[zipfile.ZipInfo]:
+    for info in zf.infolist():
+        if _INFO_PLIST.match(info.filename):
+            return info
+    return None
+
+
+def _icon_names(plist: Dict[str, Any]) -> list:
+    """Info.plist 中声明的图标文件名前缀"""
+    names = []
+    for key in ('CFBundleIcons', 'CFBundleIcons~ipad'):
+        icons = plist.get(key)
+        if isinstance(icons, dict):
+            primary = icons.get('CFBundlePrimaryIcon')
+            if isinstance(primary, dict):
+                names.extend(n for n in primary.get('CFBundleIconFiles', []) if isinstance(n, str))
+    names.extend(n for n in plist.get('CFBundleIconFiles', []) if isinstance(n, str))
+    if isinstance(plist.get('CFBundleIconFile'), str):
+        names.append(plist['CFBundleIconFile'])
+    return names
+
+
+def _read_icon(zf: zipfile.ZipFile, app_dir: str, plist: Dict[str, Any]) -> Optional[bytes]:
+    """读取最大的图标文件（App Store 的 PNG 经过 Xcode 压缩，可能需转换后才能显示）"""
+    prefixes = [app_dir + name.rsplit('.png', 1)[0] for name in _icon_names(plist)]
+    if not prefixes:
+        return None
+    candidates = [
+        info for info in zf.infolist()
+        if info.filename.endswith('.png') and '/' not in info.filename[len(app_dir):]
+        and any(info.filename.startswith(prefix) for prefix in prefixes)
+    ]
+    if not candidates:
+        return None
+    return zf.read(max(candidates, key=lambda i: i.file_size))
+
+
+def inspect_ipa(path: str, with_icon: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    读取 IPA 中主应用的名称、Bundle ID 与版本
+
+    Args:
+        path: IPA 文件路径
+        with_icon: 是否同时读取图标
+
+    Returns:
+        {'name', 'bundle_id', 'version', 'build', 'minimum_os', 'executable'[, 'icon']}；
+        不是有效的 IPA 时返回 None
+    """
+    try:
+        with zipfile.ZipFile(path) as zf:
+            info = _find_info_plist(zf)
+            if info is None or info.file_size > MAX_PLIST_SIZE:
+                return None
+            plist = plistlib.loads(zf.read(info))
+            if not isinstance(plist, dict):
+                return None
+            result = {
+                'name': plist.get('CFBundleDisplayName') or plist.get('CFBundleName') or '',
+                'bundle_id': plist.get('CFBundleIdentifier') or '',
+                'version': plist.get('CFBundleShortVersionString') or '',
+                'build': plist.get('CFBundleVersion') or '',
+                'minimum_os': plist.get('MinimumOSVersion') or '',
+                'executable': plist.get('CFBundleExecutable') or '',
+            }
+            if with_icon:
+                app_dir = info.filename[:-len('Info.plist')]
+                result['icon'] = _read_icon(zf, app_dir, plist)
+            return {k: (str(v) if k != 'icon' and v is not None else v) for k, v in result.items()}
+    except Exception as e:
+        print(f"读取 IPA 信息失败: {path}: {e}")
+        return None
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+IPA 完整性校验
+
+先在当前进程检查 ZIP 结构（中央目录可读、各成员的数据范围不超出文件、包含主应用 Info.plist），
+再把成员按压缩后大小分批，交给进程池逐个解压并校验 CRC-32。
+多个文件的批次提交到同一个进程池，单个大文件与大量小文件都能占满所有 CPU 核心。
+单个成员无法再拆分，校验时间的下限是最大成员的解压耗时。
+
+命令行用法:
+    python -m core.ipa_verify 文件或目录 [...] [-j 16] [--json]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+import threading
+import time
+import zipfile
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# 每个批次的压缩后大小（批次越小负载越均衡，进程间调度开销越大）
+BATCH_BYTES = 64 * 1024 * 1024
+# 解压时每次读取的大小
+READ_CHUNK = 1024 * 1024
+
+_INFO_PLIST = re.compile(r'^Payload/[^/]+\.app/Info\.plist$')
+
+
+def _check_members(path: str, names: List[str]) -> Tuple[int, int, List[str]]:
+    """
+    解压一批成员并校验 CRC（在子进程中执行）
+
+    Returns:
+        (校验的成员数, 解压后字节数, 错误列表)
+    """
+    checked = 0
+    total = 0
+    errors = []
+    try:
+        with zipfile.ZipFile(path) as zf:
+            for name in names:
+                try:
+                    # ZipExtFile 读到末尾时校验 CRC，不一致抛出 BadZipFile
+                    with zf.open(name) as f:
+                        while True:
+                            chunk = f.read(READ_CHUNK)
+                            if not chunk:
+                                break
+                            total += len(chunk)
+                    checked += 1
+                except Exception as e:
+                    errors.append(f"{name}: {e}")
+    except Exception as e:
+        errors.append(str(e))
+    return checked, total, errors
+
+
+def _plan(path: str, batch_bytes: int = BATCH_BYTES) -> Tuple[List[List[str]], List[str], int]:
+    """
+    检查 ZIP 结构并把成员分批
+
+    Returns:
+        (批次列表, 结构错误列表, 成员数)
+    """
+    try:
+        size = os.path.getsize(path)
+        with zipfile.ZipFile(path) as zf:
+            infos = zf.infolist()
+    except Exception as e:
+        return [], [f"无法读取 ZIP 结构: {e}"], 0
+
+    errors = []
+    if not any(_INFO_PLIST.match(info.filename) for info in infos):
+        errors.append("缺少 Payload/*.app/Info.plist")
+    for info in infos:
+        # 本地文件头（30 字节 + 文件名）之后才是数据，粗略判断数据是否被截断
+        if info.header_offset + 30 + len(info.filename) + info.compress_size > size:
+            errors.append(f"{info.filename}: 数据超出文件末尾（文件可能被截断）")
+    if errors:
+        return [], errors, len(infos)
+
+    batches: List[List[str]] = []
+    current: List[str] = []
+    current_bytes = 0
+    for info in infos:
+        if info.is_dir():
+            continue
+        current.append(info.filename)
+        current_bytes += info.compress_size
+        if current_bytes >= batch_bytes:
+            batches.append(current)
+            current, current_bytes = [], 0
+    if current:
+        batches.append(current)
+    return batches, [], len(infos)
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_verify_pool() -> ProcessPoolExecutor:
+    """进程内共享的校验进程池（spawn 方式启动，避免在带 Qt 线程的进程中 fork）"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _pool
+
+
+def verify_files(
+    paths: Iterable[str],
+    executor: Optional[Executor] = None,
+    workers: Optional[int] = None,
+    batch_bytes: int = BATCH_BYTES,
+    on_result: Optional[Callable[[Dict], None]] = None
+) -> List[Dict]:
+    """
+    校验一批 IPA
+
+    Args:
+        paths: 文件路径
+        executor: 使用的进程池，None 则临时创建 workers 个进程
+        workers: 临时进程池的进程数，None 为 CPU 核心数
+        batch_bytes: 每个批次的压缩后大小
+        on_result: 每个文件校验完成时的回调（在调用线程中执行）
+
+    Returns:
+        与输入顺序一致的结果列表：
+        {'path', 'ok', 'members', 'checked', 'bytes', 'elapsed', 'errors'}
+    """
+    paths = list(paths)
+    started = time.monotonic()
+    results: Dict[str, Dict] = {}
+    pending: Dict[str, int] = {}
+
+    def done(path: str):
+        entry = results[path]
+        entry['ok'] = not entry['errors'] and entry['checked'] == entry['expected']
+        entry['elapsed'] = round(time.monotonic() - started, 3)
+        del entry['expected']
+        if on_result:
+            on_result(entry)
+
+    plans = []
+    for path in paths:
+        if path in results:
+            continue
+        batches, errors, members = _plan(path, batch_bytes)
+        results[path] = {
+            'path': path, 'ok': False, 'members': members, 'checked': 0, 'bytes': 0,
+            'elapsed': 0.0, 'errors': errors, 'expected': sum(len(b) for b in batches),
+        }
+        if batches:
+            pending[path] = len(batches)
+            plans.append((path, batches))
+        else:
+            done(path)
+
+    if plans:
+        own = executor is None
+        if own:
+            executor = ProcessPoolExecutor(
+                max_workers=workers or os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        try:
+            futures = {}
+            for path, batches in plans:
+                for names in batches:
+                    futures[executor.submit(_check_members, path, names)] = path
+            for future in as_completed(futures):
+                path = futures[future]
+                entry = results[path]
+                try:
+                    checked, total, errors = future.result()
+                except Exception as e:
+                    checked, total, errors = 0, 0, [f"校验进程失败: {e}"]
+                entry['checked'] += checked
+                entry['bytes'] += total
+                entry['errors'].extend(errors)
+                pending[path] -= 1
+                if not pending[path]:
+                    done(path)
+        finally:
+            if own:
+                executor.shutdown()
+
+    return [results[path] for path in paths]
+
+
+def verify_ipa(path: str, executor: Optional[Executor] = None) -> Dict:
+    """校验单个 IPA（默认使用共享进程池）"""
+    return verify_files([path], executor or get_verify_pool())[0]
+
+
+def collect_ipas(targets: Iterable[str]) -> List[str]:
+    """展开命令行参数中的目录（递归查找 .ipa，跳过下载中的暂存文件）"""
+    files = []
+    for target in targets:
+        p = Path(target)
+        if p.is_dir():
+            files.extend(str(f) for f in sorted(p.rglob('*.ipa'))
+                         if f.is_file() and not f.name.startswith('.'))
+        else:
+            files.append(str(p))
+    return files
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description='校验 IPA 的 ZIP 结构与 CRC')
+    parser.add_argument('targets', nargs='+', help='IPA 文件或包含 IPA 的目录')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='进程数（默认 CPU 核心数）')
+    parser.add_argument('--json', action='store_true', help='以 JSON 输出结果')
+    args = parser.parse_args(argv)
+
+    files = collect_ipas(args.targets)
+    if not files:
+        print("没有找到 IPA 文件", file=sys.stderr)
+        return 2
+
+    def report(entry: Dict):
+        if args.json:
+            return
+        status = 'OK ' if entry['ok'] else '损坏'
+        print(f"[{status}] {entry['path']}  ({entry['checked']}/{entry['members']} 个成员, {entry['elapsed']:.2f}s)")
+        for error in entry['errors'][:5]:
+            print(f"       {error}")
+
+    started = time.monotonic()
+    results = verify_files(files, workers=args.jobs, on_result=report)
+    bad = [r for r in results if not r['ok']]
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        total = sum(r['bytes'] for r in results)
+        elapsed = time.monotonic() - started
+        print(f"共 {len(results)} 个文件，损坏 {len(bad)} 个，解压 {total / 1048576:.1f} MB，"
+              f"耗时 {elapsed:.2f}s")
+    return 1 if bad else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
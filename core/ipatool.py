@@ -6,30 +6,73 @@ ipatool 命令行工具封装
 import os
 import shutil
 import sys
-import json
 import subprocess
 import platform
 from pathlib import Path
 from typing import Optional, List, Dict
 
+from .discovery import get_discovery_cache
+from .fastjson import loads as json_loads, DecodeError
+from .locks import get_command_slots
+from .models import AppRecord
+from .ratelimit import get_rate_limiter
+
 
 class IPATool:
-    """ipatool 封装类"""
+    """
+    ipatool 封装类
+    
+    可在多个线程间共享：同一主目录的调用经 command_slot() 协调，
+    登录/注销独占执行，其余命令按类型限制并发。
+    """
+    
+    # 等待执行槽位的最长时间（秒），超时返回错误
+    SLOT_TIMEOUT = 600
     
-    def __init__(self, ipatool_path: Optional[str] = None):
+    def __init__(self, ipatool_path: Optional[str] = None, home: Optional[str] = None):
         """
         初始化
         
         Args:
             ipatool_path: ipatool 可执行文件路径，None 则自动查找
+            home: ipatool 使用的主目录（账号池中的账号各自独立），None 则使用用户主目录
         """
         # 若指定路径无效，则回退到自动查找（优先使用内置/打包资源）
+        # 自动查找结果带指纹缓存，重复初始化时仅需一次 stat
         if ipatool_path and Path(ipatool_path).exists():
             self.ipatool_path = ipatool_path
         else:
-            self.ipatool_path = self._find_ipatool()
+            self.ipatool_path = get_discovery_cache().resolve(self._find_ipatool, ipatool_path)
         if not self.ipatool_path:
             raise FileNotFoundError("未找到 ipatool，请先安装 ipatool")
+        self.home = str(home) if home else None
+        # 当前登录的 Apple ID（由 auth info 更新，用于按账号缓存许可）
+        self.account_email: Optional[str] = None
+    
+    @property
+    def version(self) -> Optional[str]:
+        """ipatool 版本（缓存，文件变化后才重新获取）"""
+        return get_discovery_cache().version(self.ipatool_path)
+    
+    def env(self) -> Dict[str, str]:
+        """ipatool 子进程的环境变量（指定 home 时重定向主目录，隔离会话与钥匙串）"""
+        env = os.environ.copy()
+        env['PYTHONIOENCODING'] = 'utf-8'
+        if self.home:
+            env['HOME'] = self.home
+            env['USERPROFILE'] = self.home
+        return env
+    
+    def command_slot(self, command: str, subcommand: str = '', timeout: Optional[float] = None):
+        """
+        占用命令执行槽位（上下文管理器），直接启动 ipatool 进程的调用方也需使用
+        
+        Args:
+            command: ipatool 子命令（search、download 等）
+            subcommand: 二级子命令（auth login 等）
+            timeout: 最长等待秒数，超时抛出 TimeoutError
+        """
+        return get_command_slots(self.home).slot(command, subcommand, timeout)
     
     def _find_ipatool(self) -> Optional[str]:
         """自动查找 ipatool 可执行文件"""
@@ -147,8 +190,7 @@ class IPATool:
         
         try:
             # 设置环境变量，强制使用UTF-8编码
-            env = os.environ.copy()
-            env['PYTHONIOENCODING'] = 'utf-8'
+            env = self.env()
             
             # 使用二进制模式捕获输出，稍后手动解码
             # 隐藏子进程控制台窗口（Windows）
@@ -163,15 +205,22 @@ class IPATool:
                     startupinfo = None
                     creationflags = 0
 
-            result = subprocess.run(
-                cmd,
-                input=input_data.encode('utf-8') if input_data else None,
-                capture_output=True,
-                timeout=300,
-                env=env,
-                startupinfo=startupinfo,
-                creationflags=creationflags
-            )
+            command = args[0] if args else ''
+            subcommand = args[1] if len(args) > 1 else ''
+            # 访问 App Store 的命令按预算限速（auth 等本地命令不受限）；
+            # 先取得令牌再占用槽位，等待限速时不占用并发槽位与会话读锁
+            get_rate_limiter().acquire(command, self.account_email)
+            # 同一账号的 auth login/revoke 与其他命令互斥，各类命令数受信号量限制
+            with self.command_slot(command, subcommand, timeout=self.SLOT_TIMEOUT):
+                result = subprocess.run(
+                    cmd,
+                    input=input_data.encode('utf-8') if input_data else None,
+                    capture_output=True,
+                    timeout=300,
+                    env=env,
+                    startupinfo=startupinfo,
+                    creationflags=creationflags
+                )
             
             # 尝试使用utf-8解码，如果失败则使用系统默认编码
             try:
@@ -200,20 +249,20 @@ class IPATool:
             if stdout.strip():
                 # 首先尝试直接解析整个输出
                 try:
-                    json_data = json.loads(stdout)
+                    json_data = json_loads(stdout)
                     print(f"Successfully parsed JSON from full output")
                     return json_data
-                except json.JSONDecodeError as e:
+                except DecodeError as e:
                     print(f"Failed to parse full output as JSON: {e}")
                     
                 # 尝试修复常见的JSON格式错误
                 try:
                     # 尝试修复未转义的引号
                     fixed_stdout = stdout.replace('"', '"').replace("'", '"')
-                    json_data = json.loads(fixed_stdout)
+                    json_data = json_loads(fixed_stdout)
                     print("Successfully parsed JSON after fixing quotes")
                     return json_data
-                except json.JSONDecodeError:
+                except DecodeError:
                     pass
                     
                 # 尝试提取多个 JSON 对象并取最后一个
@@ -225,9 +274,9 @@ class IPATool:
                         if not line:
                             continue
                         try:
-                            obj = json.loads(line)
+                            obj = json_loads(line)
                             candidates.append(obj)
-                        except json.JSONDecodeError:
+                        except DecodeError:
                             continue
                     if candidates:
                         # 若前面的 JSON 行包含 metadata，则并入最后一个对象，便于上层提取详细错误
@@ -253,7 +302,7 @@ class IPATool:
                     last = stdout.rfind('}')
                     if first != -1 and last != -1 and last > first:
                         slice_text = stdout[first:last+1]
-                        json_data = json.loads(slice_text)
+                        json_data = json_loads(slice_text)
                         print("Successfully parsed JSON from sliced stdout")
                         return json_data
                 except Exception as e:
@@ -285,8 +334,7 @@ class IPATool:
     
     def check_auth(self) -> bool:
         """检查认证状态"""
-        result = self._execute(['auth', 'info'])
-        return result.get('email') is not None
+        return self.get_account_info().get('email') is not None
     
     def login(self, email: str, password: str, auth_code: Optional[str] = None) -> Dict:
         """
@@ -358,45 +406,52 @@ class IPATool:
     
     def logout(self) -> Dict:
         """注销登录"""
+        self.account_email = None
         return self._execute(['auth', 'revoke'])
     
     def clear_local_cache(self) -> Dict:
-        """清理 ipatool 本地缓存目录 (~/.ipatool)
+        """清理 ipatool 本地缓存目录 (~/.ipatool，账号池中的账号为其独立主目录下的 .ipatool)
         Returns:
             Dict: {success: bool, removed: [paths], not_found: [paths], error?: str}
         """
         removed, not_found = [], []
         try:
-            home = Path.home()
+            home = Path(self.home) if self.home else Path.home()
             paths = [home / '.ipatool']
-            for p in paths:
-                try:
-                    if p.exists():
-                        # 记录将要删除的内容
-                        removed.append(str(p))
-                        if p.is_dir():
-                            shutil.rmtree(p, ignore_errors=True)
+            # 删除会话文件期间不允许其他命令读取
+            with self.command_slot('auth', 'clear', timeout=self.SLOT_TIMEOUT):
+                for p in paths:
+                    try:
+                        if p.exists():
+                            # 记录将要删除的内容
+                            removed.append(str(p))
+                            if p.is_dir():
+                                shutil.rmtree(p, ignore_errors=True)
+                            else:
+                                try:
+                                    p.unlink(missing_ok=True)
+                                except TypeError:
+                                    # Python <3.8 兼容
+                                    if p.exists():
+                                        p.unlink()
                         else:
-                            try:
-                                p.unlink(missing_ok=True)
-                            except TypeError:
-                                # Python <3.8 兼容
-                                if p.exists():
-                                    p.unlink()
-                    else:
-                        not_found.append(str(p))
-                except Exception:
-                    # 不因单项失败而中断
-                    continue
+                            not_found.append(str(p))
+                    except Exception:
+                        # 不因单项失败而中断
+                        continue
             return {'success': True, 'removed': removed, 'not_found': not_found}
         except Exception as e:
             return {'success': False, 'error': str(e), 'removed': removed, 'not_found': not_found}
     
     def get_account_info(self) -> Dict:
         """获取账号信息"""
-        return self._execute(['auth', 'info'])
+        result = self._execute(['auth', 'info'])
+        if not isinstance(result, dict):
+            return {}
+        self.account_email = result.get('email')
+        return result
     
-    def search(self, keyword: str, limit: int = 10) -> List[Dict]:
+    def search(self, keyword: str, limit: int = 10) -> List[AppRecord]:
         """
         搜索应用
         
@@ -414,9 +469,6 @@ class IPATool:
             if result is None:
                 print("No result returned from _execute")
                 return []
-                
-            print(f"Search result type: {type(result)}")
-            print(f"Search result content: {result}")
             
             def extract_apps(data):
                 """从不同格式的结果中提取应用列表"""
@@ -430,54 +482,13 @@ class IPATool:
                     # 如果直接是应用对象
                     if 'bundleID' in data or 'bundleId' in data or 'name' in data:
                         return [data]
-                    # 如果是包含计数的结果
-                    if 'count' in data and 'apps' in data and isinstance(data['apps'], list):
-                        return data['apps']
                 return []
             
-            # 提取应用列表
+            # 提取应用列表并解码为 AppRecord
             apps = extract_apps(result)
-            
-            if not apps:
-                print("No apps found in the result")
-                return []
-                
-            print(f"Found {len(apps)} apps in the result")
-            
-            # 格式化应用数据
-            formatted_apps = []
-            for app in apps:
-                if not isinstance(app, dict):
-                    print(f"Skipping non-dict app data: {app}")
-                    continue
-                    
-                # 标准化字段名
-                price_value = app.get('price', 0)
-                if price_value is None:
-                    price_value = 0
-                
-                # 格式化价格显示
-                if price_value == 0:
-                    formatted_price = '免费'
-                else:
-                    formatted_price = app.get('formattedPrice', f'${price_value:.2f}')
-                
-                app_data = {
-                    'id': str(app.get('id', '')),
-                    'bundleId': str(app.get('bundleID') or app.get('bundleId') or ''),
-                    'name': str(app.get('trackName') or app.get('name') or '未知应用'),
-                    'version': str(app.get('version') or '1.0'),
-                    'price': price_value,
-                    'formattedPrice': formatted_price,
-                    'artistName': str(app.get('artistName') or app.get('sellerName') or '未知开发者'),
-                    'trackName': str(app.get('trackName') or app.get('name') or ''),
-                    'sellerName': str(app.get('sellerName') or app.get('artistName') or '')
-                }
-                
-                print(f"Formatted app data: {app_data}")
-                formatted_apps.append(app_data)
-            
-            return formatted_apps
+            records = [AppRecord.from_json(app) for app in apps if isinstance(app, dict)]
+            print(f"Found {len(records)} apps in the result")
+            return records
             
         except Exception as e:
             print(f"Search exception: {str(e)}")
@@ -485,33 +496,6 @@ class IPATool:
             traceback.print_exc()
             return []
     
-    def _format_app(self, app_data):
-        """格式化应用数据"""
-        if isinstance(app_data, str):
-            return {
-                'name': app_data,
-                'bundleId': '',
-                'version': '',
-                'price': 0,
-                'formattedPrice': 'Free',
-                'artistName': 'Unknown',
-                'trackName': app_data,
-                'sellerName': 'Unknown'
-            }
-            
-        # 确保所有需要的键都存在
-        return {
-            'name': app_data.get('trackName') or app_data.get('name', ''),
-            'bundleId': app_data.get('bundleID') or app_data.get('bundleId', ''),
-            'version': app_data.get('version', ''),
-            'price': app_data.get('price', 0),
-            'formattedPrice': app_data.get('formattedPrice', 'Free'),
-            'artistName': app_data.get('artistName', app_data.get('sellerName', 'Unknown')),
-            'trackName': app_data.get('trackName', app_data.get('name', '')),
-            'sellerName': app_data.get('sellerName', app_data.get('artistName', 'Unknown')),
-            'original_data': app_data  # 保留原始数据
-        }
-    
     def purchase(self, bundle_id: str) -> Dict:
         """
         获取应用许可（购买/已购买）
@@ -560,7 +544,7 @@ class IPATool:
         
         return self._execute(args)
     
-    def list_versions(self, bundle_id: str) -> List[Dict]:
+    def list_versions(self, bundle_id: str) -> List[str]:
         """
         列出应用版本
         
@@ -568,13 +552,15 @@ class IPATool:
             bundle_id: Bundle ID
         
         Returns:
-            版本列表
+            外部版本 ID 列表（ipatool 输出的 externalVersionIdentifiers，最新的在最后）
         """
         result = self._execute(['list-versions', '--bundle-identifier', bundle_id])
         
         if isinstance(result, list):
             return result
-        elif isinstance(result, dict) and 'versions' in result:
-            return result['versions']
+        elif isinstance(result, dict):
+            versions = result.get('externalVersionIdentifiers', result.get('versions'))
+            if isinstance(versions, list):
+                return [str(v) for v in versions]
         
         return []
@@ -192,29 +192,23 @@ def check_ipatool_installed(ipatool_path: str = None) -> Tuple[bool, str]:
     """
     检查 ipatool 是否已安装
     
+    版本信息来自查找缓存，仅在可执行文件变化后才重新执行 `--version`。
+    
     Returns:
         tuple: (是否已安装, 版本信息或错误信息)
     """
     try:
-        import subprocess
+        from .discovery import get_discovery_cache
         
         # 如果指定了路径，使用指定路径
-        cmd = [ipatool_path] if ipatool_path else ['ipatool', '--version']
-        
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
+        path = ipatool_path or shutil.which('ipatool')
+        if not path or not Path(path).exists():
+            return False, "未找到 ipatool"
         
-        if result.returncode == 0:
-            version = result.stdout.strip()
+        version = get_discovery_cache().version(path)
+        if version:
             return True, f"已安装 (版本: {version})"
-        else:
-            return False, f"ipatool 执行失败: {result.stderr.strip() or '未知错误'}"
+        return False, "ipatool 执行失败: 无法获取版本信息"
             
-    except FileNotFoundError:
-        return False, "未找到 ipatool"
     except Exception as e:
         return False, f"检查失败: {str(e)}"
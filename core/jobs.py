@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+下载任务模型
+"""
+
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+# 任务生命周期状态
+QUEUED = 'queued'
+PURCHASING = 'purchasing'
+DOWNLOADING = 'downloading'
+VERIFYING = 'verifying'
+DONE = 'done'
+FAILED = 'failed'
+
+TERMINAL_STATES = frozenset({DONE, FAILED})
+
+
+class DownloadJob:
+    """单个下载任务"""
+
+    __slots__ = ('id', 'bundle_id', 'app_id', 'output_path', 'auto_purchase',
+                 'state', 'error', 'created', 'result_path', 'expected_size', 'version', 'account')
+
+    def __init__(
+        self,
+        bundle_id: str = '',
+        app_id: str = '',
+        output_path: str = '',
+        auto_purchase: bool = True,
+        id: Optional[str] = None,
+        state: str = QUEUED,
+        error: str = '',
+        created: Optional[float] = None,
+        result_path: str = '',
+        expected_size: int = 0,
+        version: str = '',
+        account: str = ''
+    ):
+        self.id = id or uuid.uuid4().hex[:12]
+        self.bundle_id = bundle_id
+        self.app_id = app_id
+        self.output_path = output_path
+        self.auto_purchase = auto_purchase
+        self.state = state
+        self.error = error
+        self.created = created if created is not None else time.time()
+        self.result_path = result_path
+        self.expected_size = expected_size  # 预计大小（字节，0 表示未知），用于磁盘空间预检
+        self.version = version  # App Store 当前版本（来自搜索结果，空表示未知），用于跳过已存在的文件
+        self.account = account  # 预取许可时分配的账号（空表示尚未分配），开始下载时使用同一账号
+
+    @property
+    def label(self) -> str:
+        """显示名称"""
+        return self.bundle_id or self.app_id
+
+    @property
+    def finished(self) -> bool:
+        return self.state in TERMINAL_STATES
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'DownloadJob':
+        return cls(**{k: data[k] for k in cls.__slots__ if k in data})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f"DownloadJob({self.id!r}, {self.label!r}, {self.state!r})"
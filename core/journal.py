@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+下载任务日志（追加写入、批量 fsync）
+
+每次状态变化追加一行 JSON：入队时记录完整任务，之后只记录状态。
+程序崩溃或被关闭后，重放日志即可找回未完成的任务；已完成的任务不会重复执行。
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .config import get_app_dir
+from .fastjson import loads as json_loads, DecodeError
+from .jobs import DownloadJob, QUEUED, TERMINAL_STATES
+
+
+class JobJournal:
+    """追加写入的任务日志"""
+
+    def __init__(
+        self,
+        journal_file: Optional[Path] = None,
+        batch_size: int = 16,
+        sync_interval: float = 1.0
+    ):
+        """
+        初始化
+
+        Args:
+            journal_file: 日志文件路径，None 则保存在应用数据目录
+            batch_size: 累计多少条记录后执行一次 fsync
+            sync_interval: 距上次 fsync 超过该秒数时执行 fsync
+        """
+        self.journal_file = Path(journal_file) if journal_file else get_app_dir() / 'download_jobs.journal'
+        self.batch_size = batch_size
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._fh = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _open(self):
+        if self._fh is None:
+            self.journal_file.parent.mkdir(parents=True, exist_ok=True)
+            self._fh = open(self.journal_file, 'a', encoding='utf-8')
+        return self._fh
+
+    def _sync(self):
+        if self._fh is None:
+            return
+        self._fh.flush()
+        try:
+            os.fsync(self._fh.fileno())
+        except OSError:
+            pass
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def record(self, job: DownloadJob, state: Optional[str] = None, error: str = ''):
+        """
+        记录任务状态变化
+
+        Args:
+            job: 任务
+            state: 新状态，None 表示使用 job.state
+            error: 失败原因
+        """
+        if state is not None:
+            job.state = state
+        if error:
+            job.error = error
+        entry: Dict = {'id': job.id, 'state': job.state, 'ts': round(time.time(), 3)}
+        if job.state == QUEUED:
+            entry['job'] = job.to_dict()
+        if job.error:
+            entry['error'] = job.error
+        if job.result_path:
+            entry['path'] = job.result_path
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+        with self._lock:
+            try:
+                fh = self._open()
+                # 每条记录都刷到系统缓冲区，进程崩溃不会丢失；fsync 按批执行
+                fh.write(line)
+                fh.flush()
+                self._unsynced += 1
+                if (self._unsynced >= self.batch_size
+                        or time.monotonic() - self._last_sync >= self.sync_interval):
+                    self._sync()
+            except OSError as e:
+                print(f"写入任务日志失败: {e}")
+
+    def replay(self) -> List[DownloadJob]:
+        """
+        重放日志，返回未完成的任务（按入队顺序）
+
+        末尾可能因崩溃而残缺的行会被忽略。
+        """
+        jobs: Dict[str, DownloadJob] = {}
+        try:
+            with open(self.journal_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json_loads(line)
+                    except DecodeError:
+                        continue
+                    if not isinstance(entry, dict):
+                        continue
+                    job_id = entry.get('id')
+                    if 'job' in entry:
+                        jobs[job_id] = DownloadJob.from_dict(entry['job'])
+                    job = jobs.get(job_id)
+                    if job is None:
+                        continue
+                    job.state = entry.get('state', job.state)
+                    job.error = entry.get('error', job.error)
+                    job.result_path = entry.get('path', job.result_path)
+        except OSError:
+            return []
+        return [job for job in jobs.values() if job.state not in TERMINAL_STATES]
+
+    def compact(self, pending: List[DownloadJob]):
+        """
+        重写日志，只保留给定的未完成任务
+
+        Args:
+            pending: 需要保留的任务
+        """
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+            try:
+                self.journal_file.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.journal_file.with_suffix('.tmp')
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    for job in pending:
+                        entry = {'id': job.id, 'state': QUEUED, 'ts': round(time.time(), 3),
+                                 'job': job.to_dict()}
+                        f.write(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n')
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.journal_file)
+            except OSError as e:
+                print(f"压缩任务日志失败: {e}")
+
+    def close(self):
+        """刷新并关闭日志"""
+        with self._lock:
+            if self._fh is not None:
+                self._sync()
+                self._fh.close()
+                self._fh = None
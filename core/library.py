@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+"""
+下载目录索引
+
+递归查找下载目录中的 IPA，读取每个文件的 Bundle ID、名称与版本，保存到应用数据目录的 library.json。
+索引以路径为键并记录文件大小与修改时间，重新扫描时只解析新增或变化的文件，删除已不存在的条目。
+下载前据此判断目标版本是否已经存在，包括不在下载历史中的旧文件。
+目录内容变化时可调用 sync_directory 只同步该目录，无需重新扫描整个下载目录。
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .config import get_app_dir
+
+# IPA 解析（zipfile/plistlib）在需要解析文件时才导入，主窗口启动时只需读取索引
+
+INDEX_VERSION = 1
+# 索引中保存的 IPA 信息字段
+INFO_FIELDS = ('bundle_id', 'name', 'version', 'build')
+
+
+def iter_ipas(root: str, directories: Optional[List[str]] = None) -> Iterator[os.DirEntry]:
+    """
+    递归列出目录中的 IPA（跳过以 . 开头的暂存文件与隐藏目录）
+
+    Args:
+        root: 根目录
+        directories: 传入列表时追加遍历到的子目录（供目录监视使用，无需再遍历一遍）
+    """
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.name.startswith('.'):
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                            if directories is not None:
+                                directories.append(os.path.abspath(entry.path))
+                        elif entry.name.lower().endswith('.ipa') and entry.is_file():
+                            yield entry
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+
+
+# 历史记录中文件的检查结果
+PRESENT = 'present'
+MISSING = 'missing'
+CHANGED = 'changed'  # 文件仍存在但大小与记录不同
+
+
+def check_paths(entries: Iterable[Tuple[str, int]]) -> Dict[str, str]:
+    """
+    检查历史记录中的文件是否仍存在、大小是否变化
+
+    Args:
+        entries: (路径, 记录的大小)，大小为 0 表示未知，只检查是否存在
+
+    Returns:
+        {路径: PRESENT/MISSING/CHANGED}
+    """
+    statuses = {}
+    for path, size in entries:
+        try:
+            st = os.stat(path)
+        except OSError:
+            statuses[path] = MISSING
+            continue
+        statuses[path] = CHANGED if size and st.st_size != size else PRESENT
+    return statuses
+
+
+def _file_key(st: os.stat_result) -> List[int]:
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _make_entry(st: os.stat_result, info: Optional[Dict]) -> Dict:
+    entry = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+    info = info or {}
+    for field in INFO_FIELDS:
+        entry[field] = info.get(field) or ''
+    if not info:
+        entry['invalid'] = True
+    return entry
+
+
+class LibraryIndex:
+    """下载目录中 IPA 的持久化索引"""
+
+    def __init__(self, index_file: Optional[Path] = None):
+        """
+        初始化
+
+        Args:
+            index_file: 索引文件，None 则保存在应用数据目录
+        """
+        self.index_file = Path(index_file) if index_file else get_app_dir() / 'library.json'
+        self._lock = threading.RLock()
+        self._entries: Optional[Dict[str, Dict]] = None
+        self.root = ''
+        self.scanned = 0.0
+
+    def _load(self) -> Dict[str, Dict]:
+        if self._entries is None:
+            entries = {}
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == INDEX_VERSION and isinstance(data.get('entries'), dict):
+                    entries = data['entries']
+                    self.root = data.get('root', '')
+                    self.scanned = data.get('scanned', 0.0)
+            except (OSError, ValueError, AttributeError):
+                pass
+            self._entries = entries
+        return self._entries
+
+    def save(self):
+        """写入索引文件"""
+        with self._lock:
+            data = {'version': INDEX_VERSION, 'root': self.root, 'scanned': self.scanned,
+                    'entries': self._load()}
+            try:
+                self.index_file.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.index_file.with_suffix('.tmp')
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp, self.index_file)
+            except OSError as e:
+                print(f"保存库索引失败: {e}")
+
+    def scan(
+        self,
+        root: str,
+        workers: Optional[int] = None,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+        directories: Optional[List[str]] = None
+    ) -> Dict[str, float]:
+        """
+        扫描目录并更新索引
+
+        Args:
+            root: 下载目录
+            workers: 并行解析的线程数（读取 Info.plist 只需少量 I/O，线程即可并行）
+            on_progress: 解析进度回调 (已解析, 需解析总数)
+            directories: 传入列表时追加扫描到的子目录
+
+        Returns:
+            {'total', 'parsed', 'reused', 'removed', 'elapsed'}
+        """
+        started = time.monotonic()
+        root = os.path.abspath(root)
+        found: Dict[str, os.stat_result] = {}
+        for entry in iter_ipas(root, directories):
+            try:
+                found[os.path.abspath(entry.path)] = entry.stat()
+            except OSError:
+                continue
+
+        with self._lock:
+            entries = self._load()
+            changed = [path for path, st in found.items()
+                       if path not in entries
+                       or [entries[path].get('size'), entries[path].get('mtime_ns')] != _file_key(st)]
+            # 根目录以外的条目保留（下载目录修改后旧目录的文件仍可被识别）
+            prefix = root.rstrip(os.sep) + os.sep
+            removed = [path for path in entries if path.startswith(prefix) and path not in found]
+
+        parsed: Dict[str, Dict] = {}
+        if changed:
+            from concurrent.futures import ThreadPoolExecutor
+            from .ipa_inspect import inspect_ipa
+            done = 0
+            with ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) * 2)) as executor:
+                for path, info in zip(changed, executor.map(inspect_ipa, changed)):
+                    parsed[path] = _make_entry(found[path], info)
+                    done += 1
+                    if on_progress:
+                        on_progress(done, len(changed))
+
+        with self._lock:
+            entries = self._load()
+            for path in removed:
+                entries.pop(path, None)
+            entries.update(parsed)
+            self.root = root
+            self.scanned = time.time()
+        if parsed or removed:
+            self.save()
+        return {
+            'total': len(found),
+            'parsed': len(parsed),
+            'reused': len(found) - len(parsed),
+            'removed': len(removed),
+            'elapsed': round(time.monotonic() - started, 3),
+        }
+
+    def update_file(self, path: str, info: Optional[Dict] = None, save: bool = True) -> Optional[Dict]:
+        """
+        添加或更新单个文件
+
+        Args:
+            path: IPA 路径
+            info: 已知的 IPA 信息（如下载清单），None 则读取文件
+            save: 是否立即写入索引文件
+
+        Returns:
+            索引条目；文件不存在时移除条目并返回 None
+        """
+        path = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.remove(path, save)
+            return None
+        from .ipa_inspect import inspect_ipa
+        entry = _make_entry(st, info if info and info.get('bundle_id') else inspect_ipa(path))
+        with self._lock:
+            self._load()[path] = entry
+        if save:
+            self.save()
+        return entry
+
+    def remove(self, path: str, save: bool = True) -> bool:
+        """移除单个文件的条目"""
+        with self._lock:
+            existed = self._load().pop(os.path.abspath(path), None) is not None
+        if existed and save:
+            self.save()
+        return existed
+
+    def sync_directory(self, directory: str, save: bool = True) -> Tuple[List[str], List[str], List[str]]:
+        """
+        同步单个目录（不递归）：解析新增或变化的文件，移除已不存在的文件及已删除子目录中的条目
+
+        Args:
+            directory: 目录路径
+            save: 有变化时是否写入索引文件
+
+        Returns:
+            (新增或更新的路径, 移除的路径, 当前的子目录)
+        """
+        directory = os.path.abspath(directory)
+        files: Dict[str, os.stat_result] = {}
+        subdirs: List[str] = []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.name.startswith('.'):
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(os.path.abspath(entry.path))
+                        elif entry.name.lower().endswith('.ipa') and entry.is_file():
+                            files[os.path.abspath(entry.path)] = entry.stat()
+                    except OSError:
+                        continue
+        except OSError:
+            pass  # 目录已被删除，下面会移除其中的全部条目
+
+        prefix = directory.rstrip(os.sep) + os.sep
+        existing_dirs = set(subdirs)
+        with self._lock:
+            entries = self._load()
+            changed = [path for path, st in files.items()
+                       if path not in entries
+                       or [entries[path].get('size'), entries[path].get('mtime_ns')] != _file_key(st)]
+            removed = []
+            for path in entries:
+                if not path.startswith(prefix):
+                    continue
+                rest = path[len(prefix):]
+                if os.sep not in rest:
+                    if path not in files:
+                        removed.append(path)
+                elif prefix + rest.split(os.sep, 1)[0] not in existing_dirs:
+                    removed.append(path)
+
+        from .ipa_inspect import inspect_ipa
+        parsed = {path: _make_entry(files[path], inspect_ipa(path)) for path in changed}
+        with self._lock:
+            entries = self._load()
+            for path in removed:
+                entries.pop(path, None)
+            entries.update(parsed)
+        if save and (parsed or removed):
+            self.save()
+        return list(parsed), removed, subdirs
+
+    def entries(self) -> Dict[str, Dict]:
+        """全部条目（副本）"""
+        with self._lock:
+            return {path: dict(entry) for path, entry in self._load().items()}
+
+    def find(self, bundle_id: str, version: Optional[str] = None) -> List[str]:
+        """
+        查找已存在的文件
+
+        Args:
+            bundle_id: Bundle ID
+            version: 版本号，None 则匹配任意版本
+
+        Returns:
+            仍存在且大小未变的文件路径
+        """
+        with self._lock:
+            candidates = [
+                (path, entry['size']) for path, entry in self._load().items()
+                if entry.get('bundle_id') == bundle_id and (version is None or entry.get('version') == version)
+            ]
+        matches = []
+        for path, size in candidates:
+            try:
+                if os.path.getsize(path) == size:
+                    matches.append(path)
+            except OSError:
+                continue
+        return matches
+
+
+_index: Optional[LibraryIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_library_index() -> LibraryIndex:
+    """进程内共享的库索引"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = LibraryIndex()
+        return _index
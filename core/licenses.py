@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+应用许可缓存
+
+按 Apple ID 记录已确认拥有许可的 Bundle ID，下载前先查缓存，
+已拥有许可的应用不再调用 `ipatool purchase`，也不再给 download 传 `--purchase`。
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from .config import get_app_dir
+
+# ipatool 在应用已拥有许可时返回的错误信息
+_ALREADY_LICENSED_HINTS = ('license already exists', 'already purchased', 'already own')
+
+
+def _result_text(result) -> str:
+    if not isinstance(result, dict):
+        return str(result or '')
+    return f"{result.get('message', '')} {result.get('error', '')} {result.get('output', '')}".lower()
+
+
+def is_already_licensed(result) -> bool:
+    """purchase 返回结果是否表示应用已拥有许可"""
+    text = _result_text(result)
+    return any(hint in text for hint in _ALREADY_LICENSED_HINTS)
+
+
+def is_license_error(text: str) -> bool:
+    """下载错误是否与许可有关（缓存可能已过期）"""
+    text = (text or '').lower()
+    return 'license' in text or '许可' in text
+
+
+class LicenseCache:
+    """按账号记录已拥有许可的 Bundle ID"""
+
+    def __init__(self, cache_file: Optional[Path] = None):
+        """
+        初始化
+
+        Args:
+            cache_file: 缓存文件路径，None 则保存在应用数据目录
+        """
+        self.cache_file = Path(cache_file) if cache_file else get_app_dir() / 'licenses.json'
+        self._lock = threading.Lock()
+        self._data: Optional[Dict[str, Dict[str, float]]] = None
+
+    def _load(self) -> Dict[str, Dict[str, float]]:
+        if self._data is None:
+            data = {}
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                pass
+            self._data = data if isinstance(data, dict) else {}
+        return self._data
+
+    def _save(self):
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.cache_file.with_suffix('.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp, self.cache_file)
+        except OSError as e:
+            print(f"保存许可缓存失败: {e}")
+
+    @staticmethod
+    def _key(account: str) -> str:
+        return (account or '').strip().lower()
+
+    def is_licensed(self, account: str, bundle_id: str) -> bool:
+        """是否已知拥有许可"""
+        if not account or not bundle_id:
+            return False
+        with self._lock:
+            return bundle_id in self._load().get(self._key(account), {})
+
+    def mark(self, account: str, bundle_id: str):
+        """记录已拥有许可"""
+        if not account or not bundle_id:
+            return
+        with self._lock:
+            licensed = self._load().setdefault(self._key(account), {})
+            if bundle_id in licensed:
+                return
+            licensed[bundle_id] = round(time.time())
+            self._save()
+
+    def forget(self, account: str, bundle_id: str):
+        """移除记录（例如下载时提示许可无效）"""
+        with self._lock:
+            licensed = self._load().get(self._key(account), {})
+            if licensed.pop(bundle_id, None) is not None:
+                self._save()
+
+    def count(self, account: str) -> int:
+        """账号已缓存的许可数量"""
+        with self._lock:
+            return len(self._load().get(self._key(account), {}))
+
+
+def acquire_license(ipatool, bundle_id: str, cache: Optional['LicenseCache'] = None) -> Dict:
+    """
+    确保应用许可：缓存命中则直接返回，否则调用 ipatool purchase 并更新缓存
+
+    Args:
+        ipatool: IPATool 实例
+        bundle_id: Bundle ID
+        cache: 许可缓存，None 则使用共享实例
+
+    Returns:
+        {licensed: bool, cached: bool, error?: str}
+    """
+    cache = cache or get_license_cache()
+    account = getattr(ipatool, 'account_email', None)
+    if cache.is_licensed(account, bundle_id):
+        return {'licensed': True, 'cached': True}
+
+    result = ipatool.purchase(bundle_id)
+    if (isinstance(result, dict) and result.get('success')) or is_already_licensed(result):
+        cache.mark(account, bundle_id)
+        return {'licensed': True, 'cached': False}
+
+    error = result.get('error') or result.get('message') if isinstance(result, dict) else str(result)
+    return {'licensed': False, 'cached': False, 'error': error or '获取许可失败'}
+
+
+class LicensePrefetcher:
+    """
+    许可预取：在当前任务下载的同时，为队列中即将开始的任务提前获取许可
+
+    使用独立的小线程池，任务开始时通过 wait() 取得预取结果，
+    许可获取不再位于每个任务的关键路径上。
+    """
+
+    def __init__(self, max_workers: int = 2, cache: Optional[LicenseCache] = None):
+        """
+        初始化
+
+        Args:
+            max_workers: 同时进行的 purchase 调用数
+            cache: 许可缓存，None 则使用共享实例
+        """
+        self.max_workers = max_workers
+        self.cache = cache
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # 按 (账号, Bundle ID) 索引，多账号时不会错用其他账号的预取结果
+        self._futures: Dict[Tuple[str, str], Future] = {}
+        self._lock = threading.Lock()
+
+    def prefetch(self, ipatool, bundle_id: str):
+        """提交预取（已缓存或正在预取时忽略）"""
+        cache = self.cache or get_license_cache()
+        account = getattr(ipatool, 'account_email', None)
+        if not bundle_id or cache.is_licensed(account, bundle_id):
+            return
+        key = (LicenseCache._key(account), bundle_id)
+        with self._lock:
+            if key in self._futures:
+                return
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix='license-prefetch'
+                )
+            future = self._executor.submit(acquire_license, ipatool, bundle_id, cache)
+            self._futures[key] = future
+        future.add_done_callback(lambda f, k=key: self._on_done(k, f))
+
+    def _on_done(self, key: Tuple[str, str], future: Future):
+        # 成功的结果已写入缓存，无需保留；失败的结果留给 wait() 取走，避免重复 purchase
+        try:
+            licensed = future.result()['licensed']
+        except Exception:
+            licensed = False
+        if licensed:
+            with self._lock:
+                if self._futures.get(key) is future:
+                    del self._futures[key]
+
+    def pending(self, bundle_id: str, account: Optional[str] = None) -> bool:
+        """是否存在该账号对该应用的预取"""
+        with self._lock:
+            return (LicenseCache._key(account), bundle_id) in self._futures
+
+    def wait(
+        self,
+        bundle_id: str,
+        account: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> Optional[Dict]:
+        """
+        等待并取出预取结果
+
+        Args:
+            bundle_id: Bundle ID
+            account: 执行下载的账号
+            timeout: 最长等待秒数
+
+        Returns:
+            acquire_license() 的结果；没有预取或预取异常时返回 None
+        """
+        with self._lock:
+            future = self._futures.pop((LicenseCache._key(account), bundle_id), None)
+        if future is None:
+            return None
+        try:
+            return future.result(timeout)
+        except Exception:
+            return None
+
+    def shutdown(self):
+        """停止预取（不等待进行中的调用）"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._futures.clear()
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+_cache: Optional[LicenseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_license_cache() -> LicenseCache:
+    """进程内共享的许可缓存"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LicenseCache()
+        return _cache
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+ipatool 调用的并发控制
+
+每个 ipatool 主目录（主账号或账号池中的账号）对应一组锁：
+- 读写锁：auth login / auth revoke / 清理缓存会改写会话与钥匙串文件，持写锁独占；
+  其他命令持读锁，可并行执行；
+- 按命令的信号量：限制同一账号同时运行的 search、purchase、download 等进程数。
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+# 每个账号同时运行的各类命令数上限（未列出的命令为 1）
+DEFAULT_COMMAND_LIMITS: Dict[str, int] = {
+    'search': 2,
+    'purchase': 2,
+    'list-versions': 2,
+    'download': 4,
+    'auth': 1,
+}
+
+# 每个账号同时运行的下载数上限，并发下载数的设置不能超过该值（多出的任务只会在槽位上等待）
+MAX_DOWNLOADS_PER_ACCOUNT = DEFAULT_COMMAND_LIMITS['download']
+
+# 会修改会话状态、需要独占执行的 auth 子命令（auth clear 表示删除本地缓存目录）
+STATE_MUTATING = frozenset({('auth', 'login'), ('auth', 'revoke'), ('auth', 'clear')})
+
+
+class RWLock:
+    """写优先的读写锁（有写者等待时，新的读者排队，避免登录被持续的下载饿死）"""
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    def acquire_read(self, timeout: Optional[float] = None) -> bool:
+        with self._cond:
+            if not self._cond.wait_for(lambda: not self._writer and not self._writers_waiting, timeout):
+                return False
+            self._readers += 1
+            return True
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self, timeout: Optional[float] = None) -> bool:
+        with self._cond:
+            self._writers_waiting += 1
+            try:
+                if not self._cond.wait_for(lambda: not self._writer and not self._readers, timeout):
+                    return False
+                self._writer = True
+                return True
+            finally:
+                self._writers_waiting -= 1
+                # 超时放弃时唤醒被挡住的读者
+                self._cond.notify_all()
+
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+    @property
+    def readers(self) -> int:
+        return self._readers
+
+
+class CommandSlots:
+    """单个 ipatool 主目录的命令并发控制"""
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None):
+        self.limits = dict(DEFAULT_COMMAND_LIMITS)
+        if limits:
+            self.limits.update(limits)
+        self.state_lock = RWLock()
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, command: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            sem = self._semaphores.get(command)
+            if sem is None:
+                sem = threading.BoundedSemaphore(max(1, self.limits.get(command, 1)))
+                self._semaphores[command] = sem
+            return sem
+
+    @contextmanager
+    def slot(self, command: str, subcommand: str = '', timeout: Optional[float] = None):
+        """
+        占用一个命令执行槽位
+
+        Args:
+            command: ipatool 子命令
+            subcommand: 二级子命令（auth login 等）
+            timeout: 最长等待秒数，超时抛出 TimeoutError
+
+        Yields:
+            None
+        """
+        sem = self._semaphore(command)
+        if not sem.acquire(timeout=timeout):
+            raise TimeoutError(f"等待 {command} 执行槽位超时")
+        try:
+            if (command, subcommand) in STATE_MUTATING:
+                if not self.state_lock.acquire_write(timeout):
+                    raise TimeoutError("有其他 ipatool 命令正在执行，请稍后再试")
+                try:
+                    yield
+                finally:
+                    self.state_lock.release_write()
+            else:
+                if not self.state_lock.acquire_read(timeout):
+                    raise TimeoutError("ipatool 会话正在更新，请稍后再试")
+                try:
+                    yield
+                finally:
+                    self.state_lock.release_read()
+        finally:
+            sem.release()
+
+
+_slots: Dict[str, CommandSlots] = {}
+_slots_lock = threading.Lock()
+
+
+def get_command_slots(home: Optional[str] = None) -> CommandSlots:
+    """ipatool 主目录对应的并发控制（同一目录的所有 IPATool 实例共享）"""
+    key = home or ''
+    with _slots_lock:
+        slots = _slots.get(key)
+        if slots is None:
+            slots = CommandSlots()
+            _slots[key] = slots
+        return slots
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+下载结果清单
+
+每个成功下载的 IPA 旁边写入 `<文件名>.manifest.json`，记录最终路径、大小、SHA-256（及可选的 BLAKE3）、
+应用名称、版本、externalVersionId、各阶段耗时、使用的账号与 ipatool 版本。
+下游工具读取清单即可，无需重新扫描目录或重新读取 IPA。
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+MANIFEST_SUFFIX = '.manifest.json'
+MANIFEST_VERSION = 1
+
+# ipatool 结果中可能出现的版本字段
+_VERSION_KEYS = ('version', 'bundleShortVersionString', 'displayVersion')
+_EXTERNAL_VERSION_KEYS = ('externalVersionId', 'externalVersionID', 'externalVersionIdentifier',
+                          'external_version_id')
+
+
+def manifest_path(ipa_path: str) -> str:
+    """IPA 对应的清单文件路径"""
+    return str(ipa_path) + MANIFEST_SUFFIX
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """计算文件 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _first(result: Dict[str, Any], keys) -> Optional[str]:
+    for key in keys:
+        value = result.get(key)
+        if value not in (None, ''):
+            return str(value)
+    return None
+
+
+def build_manifest(
+    path: str,
+    result: Optional[Dict[str, Any]] = None,
+    bundle_id: str = '',
+    app_id: str = '',
+    account: Optional[str] = None,
+    ipatool_version: Optional[str] = None,
+    timings: Optional[Dict[str, float]] = None,
+    digests: Optional[Dict[str, str]] = None,
+    info: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    生成下载清单
+
+    Args:
+        path: 最终文件路径
+        result: ipatool download 的 JSON 结果
+        bundle_id: Bundle ID
+        app_id: App ID
+        account: 下载使用的 Apple ID
+        ipatool_version: ipatool 版本
+        timings: 各阶段时间（started/finished 为时间戳，其余为秒）
+        digests: 下载过程中已计算的摘要 {算法: 摘要}，缺少 sha256 时读取文件计算
+        info: IPA 中 Info.plist 的信息（inspect_ipa 的结果），补充名称与 ipatool 未返回的版本
+
+    Returns:
+        清单字典
+    """
+    result = result if isinstance(result, dict) else {}
+    digests = digests or {}
+    info = info or {}
+    stat = os.stat(path)
+    manifest = {
+        'manifest_version': MANIFEST_VERSION,
+        'path': str(Path(path).resolve()),
+        'file_name': Path(path).name,
+        'size': stat.st_size,
+        'mtime': int(stat.st_mtime),
+        'sha256': digests.get('sha256') or file_sha256(path),
+        'bundle_id': bundle_id or result.get('bundleID') or result.get('bundleId') or info.get('bundle_id') or '',
+        'app_id': str(app_id or result.get('appID') or result.get('appId') or ''),
+        'app_name': info.get('name') or None,
+        'version': _first(result, _VERSION_KEYS) or info.get('version') or None,
+        'build': info.get('build') or None,
+        'external_version_id': _first(result, _EXTERNAL_VERSION_KEYS),
+        'account': account,
+        'ipatool_version': ipatool_version,
+        'timings': {k: round(v, 3) for k, v in (timings or {}).items()},
+        'created': int(time.time()),
+    }
+    if digests.get('blake3'):
+        manifest['blake3'] = digests['blake3']
+    return manifest
+
+
+def write_manifest(manifest: Dict[str, Any], ipa_path: Optional[str] = None) -> str:
+    """
+    写入清单（先写临时文件再替换）
+
+    Returns:
+        清单文件路径
+    """
+    target = manifest_path(ipa_path or manifest['path'])
+    tmp = target + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, target)
+    return target
+
+
+def load_manifest(ipa_path: str) -> Optional[Dict[str, Any]]:
+    """读取 IPA 对应的清单，不存在或损坏时返回 None"""
+    try:
+        with open(manifest_path(ipa_path), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else None
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+数据模型
+"""
+
+from typing import Any, Dict
+
+
+class AppRecord:
+    """App Store 应用记录（由 ipatool 搜索结果直接解码）"""
+
+    __slots__ = ('id', 'bundle_id', 'name', 'version', 'price', 'formatted_price', 'artist')
+
+    def __init__(
+        self,
+        id: str = '',
+        bundle_id: str = '',
+        name: str = '未知应用',
+        version: str = '',
+        price: float = 0.0,
+        formatted_price: str = '免费',
+        artist: str = '未知开发者'
+    ):
+        self.id = id
+        self.bundle_id = bundle_id
+        self.name = name
+        self.version = version
+        self.price = price
+        self.formatted_price = formatted_price
+        self.artist = artist
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> 'AppRecord':
+        """
+        从 ipatool / iTunes 返回的应用对象解码
+
+        兼容 bundleID/bundleId、trackName/name、artistName/sellerName 等字段名。
+        """
+        get = data.get
+        price = get('price') or 0
+        if not isinstance(price, (int, float)):
+            try:
+                price = float(price)
+            except (TypeError, ValueError):
+                price = 0
+        if price == 0:
+            formatted_price = '免费'
+        else:
+            formatted_price = get('formattedPrice') or f'${price:.2f}'
+        app_id = get('id', get('trackId', ''))
+        version = get('version')
+        return cls(
+            app_id if isinstance(app_id, str) else str(app_id),
+            get('bundleID') or get('bundleId') or '',
+            get('trackName') or get('name') or '未知应用',
+            version if isinstance(version, str) else str(version or ''),
+            price,
+            formatted_price,
+            get('artistName') or get('sellerName') or '未知开发者'
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'AppRecord':
+        """从 to_dict() 的结果还原"""
+        return cls(**{k: data[k] for k in cls.__slots__ if k in data})
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可 JSON 序列化的字典"""
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f"AppRecord({self.bundle_id!r}, {self.name!r}, {self.version!r})"
+
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+启动耗时分析（--profile-startup）
+"""
+
+import time
+import unicodedata
+from typing import List, Optional, Tuple
+
+
+def _display_width(text: str) -> int:
+    """显示宽度（中文字符按两列计算）"""
+    return sum(2 if unicodedata.east_asian_width(c) in ('W', 'F') else 1 for c in text)
+
+
+def _pad(text: str, width: int) -> str:
+    """按显示宽度补齐"""
+    return text + ' ' * max(0, width - _display_width(text))
+
+
+class StartupProfiler:
+    """记录启动各阶段耗时，直到首帧绘制"""
+
+    def __init__(self, enabled: bool = False, t0: Optional[float] = None):
+        """
+        初始化
+
+        Args:
+            enabled: 是否启用（未启用时所有调用均为空操作）
+            t0: 起始时间（time.perf_counter），默认取当前时间
+        """
+        self.enabled = enabled
+        self.t0 = t0 if t0 is not None else time.perf_counter()
+        self._last = self.t0
+        self.phases: List[Tuple[str, float]] = []
+        self.finished = False
+
+    def mark(self, phase: str):
+        """记录从上一个标记到现在的阶段耗时"""
+        if not self.enabled or self.finished:
+            return
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def finish(self, phase: str = '首帧绘制'):
+        """记录最后一个阶段并输出报告"""
+        if not self.enabled or self.finished:
+            return
+        self.mark(phase)
+        self.finished = True
+        print(self.report())
+
+    def report(self) -> str:
+        """格式化耗时报告"""
+        total = self._last - self.t0
+        width = max((_display_width(name) for name, _ in self.phases), default=0)
+        lines = ["启动耗时分析:"]
+        for name, cost in self.phases:
+            share = (cost / total * 100) if total > 0 else 0
+            lines.append(f"  {_pad(name, width)}  {cost * 1000:8.1f} ms  {share:5.1f}%")
+        lines.append(f"  {_pad('总计', width)}  {total * 1000:8.1f} ms")
+        return "\n".join(lines)
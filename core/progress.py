@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+下载进度监控
+
+通过采样输出文件大小并结合 ipatool 输出中的百分比/总大小，
+计算已传输字节、瞬时速率、滑动平均速率与剩余时间。
+"""
+
+import os
+import re
+import time
+from typing import Callable, List, Optional
+
+_PERCENT_RE = re.compile(r"(\d{1,3}(?:\.\d+)?)\s*%")
+_SIZE_RE = re.compile(
+    r"([\d.]+)\s*([KMGT]?i?B)\s*/\s*([\d.]+)\s*([KMGT]?i?B)",
+    re.IGNORECASE
+)
+_UNITS = {'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3, 'TB': 1024 ** 4}
+
+
+def _to_bytes(value: str, unit: str) -> int:
+    return int(float(value) * _UNITS.get(unit.upper().replace('I', ''), 1))
+
+
+def format_bytes(size: float) -> str:
+    """格式化字节数"""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(size) < 1024 or unit == 'GB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def format_eta(seconds: Optional[float]) -> str:
+    """格式化剩余时间"""
+    if seconds is None:
+        return '--:--'
+    seconds = int(seconds)
+    hours, rem = divmod(seconds, 3600)
+    minutes, secs = divmod(rem, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes:02d}:{secs:02d}"
+
+
+class ProgressEvent:
+    """结构化进度事件"""
+
+    __slots__ = ('stage', 'bytes_done', 'bytes_total', 'percent', 'rate', 'avg_rate', 'eta', 'elapsed')
+
+    def __init__(
+        self,
+        stage: str,
+        bytes_done: int = 0,
+        bytes_total: Optional[int] = None,
+        percent: Optional[float] = None,
+        rate: float = 0.0,
+        avg_rate: float = 0.0,
+        eta: Optional[float] = None,
+        elapsed: float = 0.0
+    ):
+        self.stage = stage
+        self.bytes_done = bytes_done
+        self.bytes_total = bytes_total
+        self.percent = percent
+        self.rate = rate
+        self.avg_rate = avg_rate
+        self.eta = eta
+        self.elapsed = elapsed
+
+    @property
+    def message(self) -> str:
+        """适合显示在界面上的进度描述"""
+        if self.stage == 'finished':
+            avg = self.bytes_done / self.elapsed if self.elapsed > 0 else 0
+            return (f"已下载 {format_bytes(self.bytes_done)} · 平均 {format_bytes(avg)}/s"
+                    f" · 用时 {format_eta(self.elapsed)}")
+        if self.bytes_total:
+            done = f"{format_bytes(self.bytes_done)} / {format_bytes(self.bytes_total)}"
+        else:
+            done = format_bytes(self.bytes_done)
+        return f"正在下载 {done} · {format_bytes(self.avg_rate)}/s · 剩余 {format_eta(self.eta)}"
+
+    def to_dict(self) -> dict:
+        return {k: getattr(self, k) for k in self.__slots__}
+
+
+class TransferMonitor:
+    """单个下载任务的传输监控"""
+
+    def __init__(
+        self,
+        paths: List[str],
+        total: Optional[int] = None,
+        smoothing: float = 0.3,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        初始化
+
+        Args:
+            paths: 需要采样的文件路径（如输出文件及其 .tmp 临时文件），取其中最大者
+            total: 已知的总字节数
+            smoothing: 滑动平均系数（指数移动平均，越大越偏向最新速率）
+            clock: 时钟函数，便于替换
+        """
+        self.paths = list(paths)
+        self.total = total
+        self.smoothing = smoothing
+        self.clock = clock
+        self.started = clock()
+        self.reported_percent: Optional[float] = None
+        self._derived_total: Optional[int] = None
+        self._last_time = self.started
+        self._last_bytes = 0
+        self.bytes_done = 0
+        self.rate = 0.0
+        self.avg_rate = 0.0
+
+    def feed_line(self, line: str) -> bool:
+        """
+        解析 ipatool 输出行中的进度信息（百分比、已下载/总大小）
+
+        Returns:
+            是否解析到进度信息
+        """
+        found = False
+        m = _SIZE_RE.search(line)
+        if m:
+            total = _to_bytes(m.group(3), m.group(4))
+            if total > 0:
+                self.total = total
+                found = True
+        m = _PERCENT_RE.search(line)
+        if m:
+            pct = float(m.group(1))
+            if 0 <= pct <= 100:
+                self.reported_percent = pct
+                # 以报告时刻的文件大小推算总大小，直到下一次报告前保持不变
+                size = self._current_size()
+                if pct > 0 and size:
+                    self._derived_total = int(size * 100 / pct)
+                found = True
+        return found
+
+    def _current_size(self) -> int:
+        size = 0
+        for path in self.paths:
+            try:
+                size = max(size, os.stat(path).st_size)
+            except OSError:
+                continue
+        return size
+
+    def sample(self, stage: str = 'downloading') -> ProgressEvent:
+        """采样一次文件大小并返回进度事件"""
+        now = self.clock()
+        size = self._current_size()
+        dt = now - self._last_time
+        if dt > 0:
+            delta = max(0, size - self._last_bytes)
+            self.rate = delta / dt
+            if self.avg_rate == 0.0:
+                self.avg_rate = self.rate
+            else:
+                self.avg_rate = self.smoothing * self.rate + (1 - self.smoothing) * self.avg_rate
+        self._last_time = now
+        self._last_bytes = size
+        self.bytes_done = size
+
+        # 总大小：优先使用已知值，其次由 ipatool 报告的百分比推算
+        total = self.total or self._derived_total
+        if total and size > total:
+            total = size
+
+        percent = None
+        if total:
+            percent = min(100.0, size * 100 / total)
+        elif self.reported_percent is not None:
+            percent = self.reported_percent
+
+        eta = None
+        if total and self.avg_rate > 0:
+            eta = max(0.0, (total - size) / self.avg_rate)
+
+        return ProgressEvent(
+            stage, size, total, percent, self.rate, self.avg_rate, eta, now - self.started
+        )
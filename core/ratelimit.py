@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+App Store 请求限速（令牌桶）
+
+search / purchase / list-versions / download 各有独立的令牌桶预算；
+purchase 与 download 按账号分别计数（账号池中的每个账号各有一份预算）。
+桶状态保存在应用数据目录的 ratelimit.json 中，读写时持有文件锁，
+因此同时运行的多个进程（界面、命令行批量工具）共享同一组预算；
+文件锁不可用时退化为仅进程内限速。
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from .config import get_app_dir
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    try:
+        import msvcrt
+    except ImportError:
+        msvcrt = None
+
+# 各命令的默认预算：(每秒补充令牌数, 桶容量)
+DEFAULT_BUDGETS: Dict[str, Tuple[float, float]] = {
+    'search': (1.0, 3),
+    'purchase': (0.5, 2),
+    'list-versions': (1.0, 3),
+    'download': (0.2, 2),
+}
+
+# 按账号分别计算预算的命令
+PER_ACCOUNT_COMMANDS = frozenset({'purchase', 'download'})
+
+
+class _FileLock:
+    """跨进程互斥锁（fcntl/msvcrt），不可用时为空操作"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._fh = None
+
+    def __enter__(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fh = open(self.path, 'a+b')
+            if fcntl is not None:
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_EX)
+            elif msvcrt is not None:
+                self._fh.seek(0)
+                # LK_LOCK 最多重试 10 秒，超时抛出 OSError
+                msvcrt.locking(self._fh.fileno(), msvcrt.LK_LOCK, 1)
+        except OSError:
+            self._close()
+        return self
+
+    def __exit__(self, *exc):
+        if self._fh is not None:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+                elif msvcrt is not None:
+                    self._fh.seek(0)
+                    msvcrt.locking(self._fh.fileno(), msvcrt.LK_UNLCK, 1)
+            except OSError:
+                pass
+            self._close()
+        return False
+
+    def _close(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+
+class RateLimiter:
+    """按命令划分预算的令牌桶限速器"""
+
+    def __init__(
+        self,
+        budgets: Optional[Dict[str, Tuple[float, float]]] = None,
+        state_file: Optional[Path] = None,
+        shared: bool = True
+    ):
+        """
+        初始化
+
+        Args:
+            budgets: {命令: (每秒补充令牌数, 桶容量)}，未列出的命令不限速
+            state_file: 桶状态文件，None 则保存在应用数据目录
+            shared: 是否通过状态文件与其他进程共享预算
+        """
+        self.budgets: Dict[str, Tuple[float, float]] = dict(DEFAULT_BUDGETS)
+        if budgets:
+            self.budgets.update(budgets)
+        self.state_file = Path(state_file) if state_file else get_app_dir() / 'ratelimit.json'
+        self.shared = shared
+        self._lock = threading.Lock()
+        # 桶状态 {命令: [令牌数, 更新时间]}；跨进程时间基准需一致，使用 time.time()
+        self._state: Dict[str, list] = {}
+        # 统计：{命令: [放行次数, 累计等待秒数]}
+        self._stats: Dict[str, list] = {}
+
+    def configure(self, command: str, rate: float, burst: Optional[float] = None):
+        """调整某个命令的预算（rate <= 0 表示不限速）"""
+        with self._lock:
+            if rate <= 0:
+                self.budgets.pop(command, None)
+            else:
+                self.budgets[command] = (rate, burst if burst is not None else max(1.0, rate))
+
+    def _read_state(self) -> Dict[str, list]:
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _write_state(self, state: Dict[str, list]):
+        try:
+            tmp = self.state_file.with_suffix('.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(state, f, separators=(',', ':'))
+            os.replace(tmp, self.state_file)
+        except OSError as e:
+            print(f"保存限速状态失败: {e}")
+
+    def _take(self, command: str, rate: float, burst: float) -> float:
+        """
+        尝试取出一个令牌
+
+        Returns:
+            0 表示已取得；否则为需要等待的秒数
+        """
+        if self.shared:
+            with _FileLock(self.state_file.with_suffix('.lock')):
+                state = self._read_state()
+                wait = self._refill_and_take(state, command, rate, burst)
+                self._write_state(state)
+            return wait
+        return self._refill_and_take(self._state, command, rate, burst)
+
+    @staticmethod
+    def _refill_and_take(state: Dict[str, list], command: str, rate: float, burst: float) -> float:
+        now = time.time()
+        bucket = state.get(command)
+        if not isinstance(bucket, list) or len(bucket) != 2:
+            bucket = [burst, now]
+        tokens = min(burst, bucket[0] + max(0.0, now - bucket[1]) * rate)
+        if tokens >= 1:
+            state[command] = [tokens - 1, now]
+            return 0.0
+        state[command] = [tokens, now]
+        return (1 - tokens) / rate
+
+    def acquire(self, command: str, account: Optional[str] = None, timeout: Optional[float] = None) -> bool:
+        """
+        阻塞直到可以执行该命令
+
+        Args:
+            command: ipatool 子命令（search、purchase 等）
+            account: 发起调用的账号（purchase/download 按账号计算预算）
+            timeout: 最长等待秒数，None 表示一直等待
+
+        Returns:
+            是否取得令牌（仅在超时时返回 False）
+        """
+        budget = self.budgets.get(command)
+        if not budget:
+            return True
+        rate, burst = budget
+        key = command
+        if account and command in PER_ACCOUNT_COMMANDS:
+            key = f"{command}:{account.strip().lower()}"
+        started = time.monotonic()
+        while True:
+            # 进程内串行化，避免多个线程同时争抢文件锁
+            with self._lock:
+                wait = self._take(key, rate, burst)
+            if not wait:
+                self._record(command, time.monotonic() - started)
+                return True
+            if timeout is not None and time.monotonic() - started + wait > timeout:
+                return False
+            time.sleep(wait)
+
+    def _record(self, command: str, waited: float):
+        with self._lock:
+            stats = self._stats.setdefault(command, [0, 0.0])
+            stats[0] += 1
+            stats[1] += waited
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """各命令的放行次数与累计等待时间"""
+        with self._lock:
+            return {cmd: {'calls': s[0], 'waited': round(s[1], 3)} for cmd, s in self._stats.items()}
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """进程内共享的限速器（预算可在配置文件的 rate_limits 中覆盖）"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            from .config import Config
+            overrides = {}
+            configured = Config().get('rate_limits') or {}
+            if isinstance(configured, dict):
+                for command, value in configured.items():
+                    try:
+                        rate, burst = value
+                        overrides[command] = (float(rate), float(burst))
+                    except (TypeError, ValueError):
+                        print(f"忽略无效的限速配置: {command}={value!r}")
+            _limiter = RateLimiter(overrides)
+        return _limiter
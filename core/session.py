@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+会话快照
+
+保存上次退出时的界面状态（搜索结果、账号、当前标签页、窗口几何信息），
+下次启动时立即渲染，实时数据在后台重新校验。
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .config import get_app_dir
+
+SNAPSHOT_VERSION = 2
+
+
+class SessionSnapshot:
+    """会话快照读写"""
+
+    def __init__(self, snapshot_file: Optional[Path] = None):
+        """
+        初始化
+
+        Args:
+            snapshot_file: 快照文件路径，None 则保存在应用数据目录
+        """
+        self.snapshot_file = Path(snapshot_file) if snapshot_file else get_app_dir() / 'session.json'
+
+    def load(self) -> Dict[str, Any]:
+        """读取快照，文件不存在、损坏或版本不符时返回空字典"""
+        try:
+            with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get('version') != SNAPSHOT_VERSION:
+            return {}
+        return data
+
+    def save(self, data: Dict[str, Any]):
+        """原子写入快照（紧凑 JSON）"""
+        payload = dict(data)
+        payload['version'] = SNAPSHOT_VERSION
+        try:
+            self.snapshot_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.snapshot_file.with_suffix('.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp, self.snapshot_file)
+        except OSError as e:
+            print(f"保存会话快照失败: {e}")
+
+    def clear(self):
+        """删除快照"""
+        try:
+            self.snapshot_file.unlink()
+        except OSError:
+            pass
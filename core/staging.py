@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+下载文件暂存与磁盘空间预检
+
+下载先写入同一目录下的暂存文件（.<文件名>.<随机串>.partial.ipa），
+成功并校验后通过 os.replace 原子地改名为最终文件；失败时删除暂存文件
+（以及 ipatool 生成的 .tmp 文件），目标位置不会出现残缺的 IPA。
+
+开始下载前根据已知大小（历史记录中同一应用的文件大小）检查剩余空间，
+并扣除同一磁盘上其他进行中下载的预留空间，避免批量下载中途写满磁盘。
+"""
+
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from .progress import format_bytes
+
+PARTIAL_SUFFIX = '.partial.ipa'
+# 大小未知时至少保留的剩余空间
+MIN_FREE_BYTES = 256 * 1024 * 1024
+# 已知大小的安全系数（新版本通常略大）
+SIZE_MARGIN = 1.2
+
+
+def staging_path(final_path: str) -> str:
+    """最终文件对应的暂存文件路径（同一目录，保证 os.replace 为原子操作）"""
+    final = Path(final_path)
+    return str(final.with_name(f".{final.stem}.{uuid.uuid4().hex[:8]}{PARTIAL_SUFFIX}"))
+
+
+def remove_partial(stage_path: str):
+    """删除暂存文件及 ipatool 的 .tmp 文件"""
+    for path in (stage_path, stage_path + '.tmp'):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"删除暂存文件失败: {path}: {e}")
+
+
+def cleanup_stale(directory: str, max_age: float = 86400) -> int:
+    """
+    删除目录中遗留的暂存文件（程序崩溃时可能残留）
+
+    Args:
+        directory: 下载目录
+        max_age: 仅删除修改时间早于该秒数的文件，避免误删其他进程正在写入的文件
+
+    Returns:
+        删除的文件数
+    """
+    removed = 0
+    cutoff = time.time() - max_age
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                name = entry.name
+                if not name.startswith('.') or not (name.endswith(PARTIAL_SUFFIX)
+                                                    or name.endswith(PARTIAL_SUFFIX + '.tmp')):
+                    continue
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                        removed += 1
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return removed
+
+
+def estimate_size(bundle_id: str, history: Iterable[Dict]) -> int:
+    """
+    根据历史记录估计应用大小
+
+    Args:
+        bundle_id: Bundle ID
+        history: 下载历史（优先使用记录中的 size，否则读取仍存在的文件大小）
+
+    Returns:
+        最近一次下载的大小；未知时为 0
+    """
+    if not bundle_id:
+        return 0
+    for item in reversed(list(history)):
+        if not isinstance(item, dict) or item.get('bundle_id') != bundle_id:
+            continue
+        size = item.get('size')
+        if isinstance(size, int) and size > 0:
+            return size
+        try:
+            size = os.path.getsize(item.get('file_path', ''))
+        except (OSError, TypeError):
+            continue
+        if size > 0:
+            return size
+    return 0
+
+
+class SpaceReservations:
+    """进行中下载的磁盘空间预留（按磁盘设备区分）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reserved: Dict[int, int] = {}
+
+    @staticmethod
+    def _device(directory: str) -> int:
+        try:
+            return os.stat(directory).st_dev
+        except OSError:
+            return -1
+
+    def reserve(self, directory: str, needed: int, min_free: int = MIN_FREE_BYTES) -> Tuple[bool, str]:
+        """
+        检查剩余空间并预留
+
+        Args:
+            directory: 下载目录（需已存在）
+            needed: 需要的字节数（未知时为 0）
+            min_free: 下载后至少保留的剩余空间
+
+        Returns:
+            (是否成功, 失败原因)
+        """
+        device = self._device(directory)
+        try:
+            free = shutil.disk_usage(directory).free
+        except OSError:
+            # 无法获取剩余空间时不阻止下载
+            return True, ''
+        with self._lock:
+            available = free - self._reserved.get(device, 0)
+            if available - needed < min_free:
+                need_text = format_bytes(needed) if needed else '未知大小'
+                return False, (f"磁盘空间不足：需要 {need_text}，"
+                               f"可用 {format_bytes(max(0, available))}（另需保留 {format_bytes(min_free)}）")
+            self._reserved[device] = self._reserved.get(device, 0) + needed
+        return True, ''
+
+    def release(self, directory: str, needed: int):
+        """释放预留"""
+        if not needed:
+            return
+        device = self._device(directory)
+        with self._lock:
+            left = self._reserved.get(device, 0) - needed
+            if left > 0:
+                self._reserved[device] = left
+            else:
+                self._reserved.pop(device, None)
+
+
+_reservations = SpaceReservations()
+
+
+def get_space_reservations() -> SpaceReservations:
+    """进程内共享的空间预留"""
+    return _reservations
+
+
+def preflight(directory: str, expected_size: int = 0) -> Tuple[bool, str, int]:
+    """
+    下载前检查并预留空间
+
+    Args:
+        directory: 下载目录
+        expected_size: 已知的应用大小（0 表示未知）
+
+    Returns:
+        (是否可以下载, 失败原因, 预留的字节数)
+    """
+    needed = int(expected_size * SIZE_MARGIN) if expected_size > 0 else 0
+    ok, message = _reservations.reserve(directory, needed)
+    return ok, message, needed if ok else 0
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+内存中的子串索引
+
+以三元组（连续 3 个字符）建立倒排表，查询时取查询串中最少见的三元组的倒排表作为候选，
+必要时与第二少见的取交集，再核对子串，查询代价只与候选数量有关，不随总条目数线性增长。
+1～2 个字符的查询通过包含该串的三元组合并倒排表得到结果，无需额外的索引。
+
+文件路径中的目录部分通常由大量条目共享，单独按目录分组匹配，只有文件名参与三元组索引，
+索引体积与建立时间都与目录深度无关。
+
+已有文档可通过 update 修改（例如文件被移动或改名）：新的三元组追加到倒排表，旧的不删除，
+查询结果中修改过的文档会再核对一次，避免误匹配。
+"""
+
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+_SEPARATOR = '\x00'
+
+
+def _normalize(text: str) -> str:
+    return text.lower().replace('\\', '/')
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """不区分大小写的子串索引（文档编号从 0 开始按添加顺序分配）"""
+
+    def __init__(self):
+        self._texts: List[str] = []
+        self._dirs: List[str] = []
+        self._names: List[str] = []
+        self._postings: Dict[str, object] = {}
+        # 目录 -> 位于该目录的文档编号
+        self._groups: Dict[str, List[int]] = {}
+        # 修改过的文档（倒排表中可能残留旧的三元组）
+        self._updated: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def add(self, fields: Sequence[str], path: str = '') -> int:
+        """
+        添加一个文档
+
+        Args:
+            fields: 参与匹配的字段（名称、Bundle ID、版本等）
+            path: 文件路径（文件名参与三元组索引，目录单独分组）
+
+        Returns:
+            文档编号
+        """
+        doc = len(self._texts)
+        directory, name, text = self._split(fields, path)
+        self._texts.append(text)
+        self._dirs.append(directory)
+        self._names.append(name)
+        self._groups.setdefault(directory, []).append(doc)
+        self._post(doc, _trigrams(text))
+        return doc
+
+    @staticmethod
+    def _split(fields: Sequence[str], path: str):
+        path = _normalize(path or '')
+        directory, _, name = path.rpartition('/')
+        return directory, name, _SEPARATOR.join([_normalize(str(f or '')) for f in fields] + [name])
+
+    def _post(self, doc: int, grams: Iterable[str]):
+        postings = self._postings
+        for gram in grams:
+            posting = postings.get(gram)
+            if posting is None:
+                postings[gram] = [doc]
+            else:
+                posting.append(doc)
+
+    def update(self, doc: int, fields: Sequence[str], path: str = ''):
+        """
+        修改已有文档
+
+        Args:
+            doc: 文档编号
+            fields: 新的字段
+            path: 新的文件路径
+        """
+        directory, name, text = self._split(fields, path)
+        old_dir = self._dirs[doc]
+        if directory != old_dir:
+            group = self._groups[old_dir]
+            group.remove(doc)
+            if not group:
+                del self._groups[old_dir]
+            self._groups.setdefault(directory, []).append(doc)
+        self._post(doc, _trigrams(text) - _trigrams(self._texts[doc]))
+        self._texts[doc] = text
+        self._dirs[doc] = directory
+        self._names[doc] = name
+        self._updated.add(doc)
+
+    def compact(self):
+        """把倒排表转换为紧凑数组（批量添加结束后调用，之后仍可继续添加）"""
+        for gram, posting in self._postings.items():
+            if isinstance(posting, list):
+                self._postings[gram] = array('I', posting)
+
+    def _path(self, doc: int) -> str:
+        return self._dirs[doc] + '/' + self._names[doc]
+
+    def matches(self, doc: int, query: str) -> bool:
+        """单个文档是否匹配"""
+        query = _normalize(query)
+        if not query:
+            return True
+        return query in self._texts[doc] or query in self._path(doc)
+
+    def search(self, query: str) -> Optional[List[int]]:
+        """
+        查询包含 query 的文档
+
+        Args:
+            query: 查询串（不区分大小写）
+
+        Returns:
+            升序的文档编号；查询串为空时返回 None（表示全部）
+        """
+        query = _normalize(query.strip())
+        if not query:
+            return None
+        found: Set[int] = set()
+
+        if len(query) >= 3:
+            postings = []
+            for gram in _trigrams(query):
+                posting = self._postings.get(gram)
+                if posting is None:
+                    postings = None
+                    break
+                postings.append(posting)
+            if postings:
+                postings.sort(key=len)
+                candidates: Iterable[int] = postings[0]
+                if len(postings) > 1:
+                    # 第二个倒排表不比第一个大太多时，取交集能显著减少需要核对的文档
+                    if len(postings[1]) <= 8 * len(postings[0]) + 1024:
+                        other = set(postings[1])
+                        candidates = [d for d in candidates if d in other]
+                if len(query) == 3:
+                    found.update(candidates)
+                else:
+                    texts = self._texts
+                    found.update(d for d in candidates if query in texts[d])
+        else:
+            keys = [gram for gram in self._postings if query in gram]
+            found = found.union(*(self._postings[gram] for gram in keys))
+
+        # 目录部分：只需对不同的目录逐一比较
+        for directory, docs in self._groups.items():
+            if query in directory:
+                found.update(docs)
+        if '/' in query:
+            # 跨越目录与文件名的查询：目录以最后一个 / 之前的部分结尾，文件名以之后的部分开头
+            head, _, tail = query.rpartition('/')
+            names = self._names
+            for directory, docs in self._groups.items():
+                if directory.endswith(head):
+                    found.update(d for d in docs if names[d].startswith(tail))
+        if self._updated:
+            # 修改过的文档可能仅因旧的三元组被选中
+            found.difference_update([d for d in found & self._updated if not self.matches(d, query)])
+        if len(found) == len(self._texts):
+            return list(range(len(self._texts)))
+        return sorted(found)
+
+
+def build_index(documents: Iterable[Sequence[str]]) -> TrigramIndex:
+    """
+    批量建立索引
+
+    Args:
+        documents: 每个文档为 (字段..., 路径)，最后一项作为路径
+
+    Returns:
+        索引
+    """
+    index = TrigramIndex()
+    for doc in documents:
+        index.add(doc[:-1], doc[-1])
+    index.compact()
+    return index
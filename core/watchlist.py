@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+关注列表
+
+记录需要跟踪的 Bundle ID 及上次看到的版本，定期通过 `ipatool search`（找不到时退回 `list-versions`）
+查询当前版本，只有版本变化时才需要下载。每次只查询一批最久未检查的应用，
+检查结果在 CHECK_TTL 内视为有效，App Store 请求由 IPATool 内部的限速器统一限速。
+列表保存在应用数据目录的 watchlist.json。
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .config import get_app_dir
+
+WATCHLIST_VERSION = 1
+CHECK_TTL = 30 * 60  # 检查结果的有效期（秒），期间不重复查询
+BATCH_SIZE = 20  # 每轮最多查询的应用数
+
+
+def lookup_version(ipatool, bundle_id: str) -> Optional[Dict[str, str]]:
+    """
+    查询应用在 App Store 的当前版本
+
+    Args:
+        ipatool: IPATool 实例
+        bundle_id: Bundle ID
+
+    Returns:
+        {'version', 'external_version', 'app_id', 'name'}；查询不到时返回 None
+    """
+    for record in ipatool.search(bundle_id, limit=5):
+        if record.bundle_id == bundle_id and record.version:
+            return {'version': record.version, 'external_version': '', 'app_id': record.id, 'name': record.name}
+    # 搜索结果中没有该应用（例如搜索不到的地区）时，用版本号列表中最新的外部版本 ID 判断变化
+    versions = ipatool.list_versions(bundle_id)
+    if versions:
+        return {'version': '', 'external_version': str(versions[-1]), 'app_id': '', 'name': ''}
+    return None
+
+
+class Watchlist:
+    """关注的应用及其上次看到的版本"""
+
+    def __init__(self, watch_file: Optional[Path] = None):
+        """
+        初始化
+
+        Args:
+            watch_file: 列表文件，None 则保存在应用数据目录
+        """
+        self.watch_file = Path(watch_file) if watch_file else get_app_dir() / 'watchlist.json'
+        self._lock = threading.RLock()
+        self._apps: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._apps is None:
+            apps = {}
+            try:
+                with open(self.watch_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == WATCHLIST_VERSION and isinstance(data.get('apps'), dict):
+                    apps = data['apps']
+            except (OSError, ValueError, AttributeError):
+                pass
+            self._apps = apps
+        return self._apps
+
+    def _save(self):
+        data = {'version': WATCHLIST_VERSION, 'apps': self._load()}
+        try:
+            self.watch_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.watch_file.with_suffix('.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.watch_file)
+        except OSError as e:
+            print(f"保存关注列表失败: {e}")
+
+    def add(self, bundle_id: str, name: str = '') -> bool:
+        """添加应用，已存在时返回 False"""
+        bundle_id = bundle_id.strip()
+        if not bundle_id:
+            return False
+        with self._lock:
+            apps = self._load()
+            if bundle_id in apps:
+                return False
+            apps[bundle_id] = {'name': name, 'added': round(time.time()), 'checked': 0}
+            self._save()
+        return True
+
+    def remove(self, bundle_id: str) -> bool:
+        """移除应用"""
+        with self._lock:
+            existed = self._load().pop(bundle_id, None) is not None
+            if existed:
+                self._save()
+        return existed
+
+    def __contains__(self, bundle_id: str) -> bool:
+        with self._lock:
+            return bundle_id in self._load()
+
+    def items(self) -> Dict[str, Dict[str, Any]]:
+        """全部应用（副本）"""
+        with self._lock:
+            return {bundle_id: dict(entry) for bundle_id, entry in self._load().items()}
+
+    def due(self, ttl: float = CHECK_TTL, limit: Optional[int] = BATCH_SIZE, now: Optional[float] = None) -> List[str]:
+        """
+        需要重新查询的应用（最久未检查的在前）
+
+        Args:
+            ttl: 检查结果的有效期，0 表示全部需要查询
+            limit: 最多返回的数量，None 表示不限制
+            now: 当前时间戳
+
+        Returns:
+            Bundle ID 列表
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            stale = [(entry.get('checked', 0) or 0, bundle_id) for bundle_id, entry in self._load().items()
+                     if now - (entry.get('checked', 0) or 0) >= ttl]
+        stale.sort()
+        bundle_ids = [bundle_id for _, bundle_id in stale]
+        return bundle_ids if limit is None else bundle_ids[:limit]
+
+    def record(self, bundle_id: str, result: Optional[Dict[str, str]], error: str = '') -> bool:
+        """
+        保存一次查询结果
+
+        Args:
+            bundle_id: Bundle ID
+            result: lookup_version 的返回值，查询失败时为 None
+            error: 查询失败的原因
+
+        Returns:
+            版本是否与上次看到的不同（首次看到只记录为基准，不算变化）
+        """
+        with self._lock:
+            entry = self._load().get(bundle_id)
+            if entry is None:
+                return False
+            entry['checked'] = round(time.time())
+            if not result:
+                entry['error'] = error or '未找到该应用'
+                self._save()
+                return False
+            entry.pop('error', None)
+            # 只比较同一来源的版本，避免搜索结果偶尔缺失时误判为变化；
+            # 该来源还没有记录过版本时只保存基准，添加应用不会触发下载
+            source = 'version' if result.get('version') else 'external_version'
+            previous = entry.get(source)
+            changed = bool(previous) and result.get(source) != previous
+            for field in ('version', 'external_version', 'app_id', 'name'):
+                if result.get(field):
+                    entry[field] = result[field]
+            if changed:
+                entry['changed'] = entry['checked']
+            self._save()
+        return changed
+
+    def mark_downloaded(self, bundle_id: str, version: str) -> bool:
+        """记录已下载的版本（不在列表中时忽略）"""
+        with self._lock:
+            entry = self._load().get(bundle_id)
+            if entry is None or not version or entry.get('downloaded') == version:
+                return False
+            entry['downloaded'] = version
+            self._save()
+        return True
+
+    def outdated(self) -> List[str]:
+        """当前版本尚未下载的应用"""
+        with self._lock:
+            return [bundle_id for bundle_id, entry in self._load().items()
+                    if entry.get('version') and entry.get('version') != entry.get('downloaded')]
+
+
+_watchlist: Optional[Watchlist] = None
+_watchlist_lock = threading.Lock()
+
+
+def get_watchlist() -> Watchlist:
+    """进程内共享的关注列表"""
+    global _watchlist
+    with _watchlist_lock:
+        if _watchlist is None:
+            _watchlist = Watchlist()
+        return _watchlist
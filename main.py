@@ -3,50 +3,74 @@
 """
 IPA Download Tool - 桌面版
 基于 ipatool 的图形化 iOS 应用下载工具
+
+用法: python main.py [--profile-startup]
 """
 
+import time
+
+_T0 = time.perf_counter()
+
 import sys
-from PyQt6.QtWidgets import QApplication
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QIcon
-from pathlib import Path
-from ui.main_window import MainWindow
+from core.profiler import StartupProfiler
 
 
 def main():
     """主函数"""
+    profile = '--profile-startup' in sys.argv
+    argv = [a for a in sys.argv if a != '--profile-startup']
+    profiler = StartupProfiler(enabled=profile, t0=_T0)
+
+    # 重量级模块延迟到此处导入，便于分阶段计时
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtCore import Qt, QObject, QEvent
+    profiler.mark('导入 PyQt6')
+
     # 启用高 DPI 缩放
     QApplication.setHighDpiScaleFactorRoundingPolicy(
         Qt.HighDpiScaleFactorRoundingPolicy.PassThrough
     )
-    
+
     # 创建应用
-    app = QApplication(sys.argv)
+    app = QApplication(argv)
     app.setApplicationName("IPA Download Tool")
     app.setOrganizationName("IPADownload")
-    
+    profiler.mark('创建 QApplication')
+
+    from ui import assets
+    from ui.main_window import MainWindow
+    profiler.mark('导入界面模块')
+
     # 设置应用图标（assets/qianshu.png）
-    try:
-        icon_path = Path(__file__).resolve().parent / "assets" / "qianshu.png"
-        if not icon_path.exists():
-            # PyInstaller 运行时的临时目录
-            meipass = getattr(__import__('sys'), '_MEIPASS', None)
-            if meipass:
-                alt = Path(meipass) / "assets" / "qianshu.png"
-                if alt.exists():
-                    icon_path = alt
-        if icon_path.exists():
-            app.setWindowIcon(QIcon(str(icon_path)))
-    except Exception:
-        pass
-    
+    app.setWindowIcon(assets.icon())
+    profiler.mark('加载图标')
+
     # 创建主窗口
-    window = MainWindow()
+    window = MainWindow(profiler=profiler)
+    profiler.mark('构建主窗口')
+
+    if profile:
+        class FirstPaintFilter(QObject):
+            """捕获主窗口首次绘制事件"""
+
+            def eventFilter(self, obj, event):
+                if event.type() == QEvent.Type.Paint:
+                    obj.removeEventFilter(self)
+                    profiler.finish('首帧绘制')
+                return False
+
+        paint_filter = FirstPaintFilter(window)
+        window.installEventFilter(paint_filter)
+
     window.show()
-    
+    profiler.mark('显示窗口')
+
     # 运行应用
     sys.exit(app.exec())
 
 
 if __name__ == '__main__':
+    # 打包为可执行文件时，校验进程池以 spawn 方式启动子进程需要此调用
+    import multiprocessing
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""StreamingHasher 测试"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+
+from core.hashing import StreamingHasher
+
+
+class StreamingHasherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        self.path = os.path.join(self.dir, 'app.ipa')
+        self.partial = self.path + '.tmp'
+
+    def test_follows_partial_file_across_rename(self):
+        # 与 ipatool 相同：先写入 <output>.tmp，写完后改名为目标文件
+        hasher = StreamingHasher(self.path, self.partial, chunk_size=7)
+        data = b''
+        with open(self.partial, 'wb') as f:
+            for i in range(5):
+                chunk = os.urandom(1000 + i)
+                f.write(chunk)
+                f.flush()
+                data += chunk
+                self.assertEqual(hasher.poll(), len(data))
+        os.replace(self.partial, self.path)
+
+        digests = hasher.finish(self.path)
+        self.assertEqual(digests['sha256'], hashlib.sha256(data).hexdigest())
+        self.assertFalse(hasher.rehashed)
+
+    def test_rewritten_output_is_hashed_from_start(self):
+        # 重新打包：目标文件是新写出的文件，临时文件随后被删除
+        hasher = StreamingHasher(self.path, self.partial)
+        with open(self.partial, 'wb') as f:
+            f.write(os.urandom(4096))
+        hasher.poll()
+        data = os.urandom(5000)
+        with open(self.path, 'wb') as f:
+            f.write(data)
+        os.remove(self.partial)
+
+        digests = hasher.finish(self.path)
+        self.assertEqual(digests['sha256'], hashlib.sha256(data).hexdigest())
+
+
+if __name__ == '__main__':
+    unittest.main()
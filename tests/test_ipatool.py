@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""IPATool 输出解析测试（使用 ipatool 的真实 JSON 输出）"""
+
+import subprocess
+import sys
+import unittest
+from unittest import mock
+
+from core.ipatool import IPATool
+from core.watchlist import lookup_version
+
+# ipatool 2.x `list-versions --format json` 的输出
+LIST_VERSIONS_OUTPUT = (
+    b'{"bundleID":"com.example.app","externalVersionIdentifiers":["857455426","858291842","860028147"],'
+    b'"level":"info","success":true,"time":"2024-05-20T10:12:03+08:00"}\n'
+)
+
+
+def completed(stdout: bytes) -> subprocess.CompletedProcess:
+    return subprocess.CompletedProcess(args=[], returncode=0, stdout=stdout, stderr=b'')
+
+
+class ListVersionsTest(unittest.TestCase):
+
+    def setUp(self):
+        # 任意存在的可执行文件即可，子进程调用被替换；限速器替换掉，不读写本机的限速状态
+        self.ipatool = IPATool(sys.executable)
+        patcher = mock.patch('core.ipatool.get_rate_limiter')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reads_external_version_identifiers(self):
+        with mock.patch('core.ipatool.subprocess.run', return_value=completed(LIST_VERSIONS_OUTPUT)):
+            versions = self.ipatool.list_versions('com.example.app')
+        self.assertEqual(versions, ['857455426', '858291842', '860028147'])
+
+    def test_lookup_version_falls_back_to_latest_identifier(self):
+        with mock.patch.object(self.ipatool, 'search', return_value=[]), \
+                mock.patch('core.ipatool.subprocess.run', return_value=completed(LIST_VERSIONS_OUTPUT)):
+            result = lookup_version(self.ipatool, 'com.example.app')
+        self.assertEqual(result['external_version'], '860028147')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,12 @@
 # -*- coding: utf-8 -*-
 """UI 界面模块"""
 
-from .main_window import MainWindow
-
 __all__ = ['MainWindow']
+
+
+def __getattr__(name):
+    # 延迟导入主窗口，避免导入 ui 包时构建整套界面依赖
+    if name == 'MainWindow':
+        from .main_window import MainWindow
+        return MainWindow
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
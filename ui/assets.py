@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+资源缓存
+
+统一解析 assets 目录（兼容 PyInstaller 运行目录），并缓存已加载/缩放的图标，
+避免各窗口重复从磁盘读取同一张 PNG。
+"""
+
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QIcon, QPixmap
+
+APP_ICON = 'qianshu.png'
+
+
+@lru_cache(maxsize=None)
+def asset_path(name: str) -> Optional[Path]:
+    """查找资源文件，依次尝试项目 assets 目录与 PyInstaller 临时目录"""
+    candidates = [Path(__file__).resolve().parents[1] / 'assets' / name]
+    meipass = getattr(sys, '_MEIPASS', None)
+    if meipass:
+        candidates.append(Path(meipass) / 'assets' / name)
+    for path in candidates:
+        if path.exists():
+            return path
+    return None
+
+
+@lru_cache(maxsize=None)
+def icon(name: str = APP_ICON) -> QIcon:
+    """获取图标（缓存），找不到时返回空图标"""
+    path = asset_path(name)
+    return QIcon(str(path)) if path else QIcon()
+
+
+@lru_cache(maxsize=None)
+def pixmap(name: str = APP_ICON, size: int = 0) -> QPixmap:
+    """
+    获取图片（缓存）
+
+    Args:
+        name: assets 目录下的文件名
+        size: 缩放后的边长，0 表示原始尺寸
+    """
+    path = asset_path(name)
+    pm = QPixmap(str(path)) if path else QPixmap(":/icons/ipatool.png")
+    if size and not pm.isNull():
+        pm = pm.scaled(
+            size, size,
+            Qt.AspectRatioMode.KeepAspectRatio,
+            Qt.TransformationMode.SmoothTransformation
+        )
+    return pm
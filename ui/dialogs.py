@@ -6,15 +6,17 @@
 from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel,
     QLineEdit, QPushButton, QCheckBox, QFileDialog,
-    QGroupBox, QDialogButtonBox, QProgressBar, QTextEdit
+    QGroupBox, QDialogButtonBox, QProgressBar, QTextEdit,
+    QListWidget, QListWidgetItem, QMessageBox, QSpinBox
 )
 from PyQt6.QtCore import Qt, QSize
-from PyQt6.QtGui import QIcon, QPixmap
+from PyQt6.QtGui import QColor, QIcon
 from pathlib import Path
 import platform
-import sys
-from PyQt6.QtCore import Qt
 from core.config import Config
+from core.locks import MAX_DOWNLOADS_PER_ACCOUNT
+
+from . import assets
 
 
 class InstallIPADialog(QDialog):
@@ -34,26 +36,8 @@ class InstallIPADialog(QDialog):
         # 图标和标题
         title_layout = QHBoxLayout()
         icon_label = QLabel()
-        try:
-            icon_path = Path(__file__).resolve().parents[1] / 'assets' / 'qianshu.png'
-            if not icon_path.exists():
-                try:
-                    import sys as _sys
-                    _meipass = getattr(_sys, '_MEIPASS', None)
-                    if _meipass:
-                        alt = Path(_meipass) / 'assets' / 'qianshu.png'
-                        if alt.exists():
-                            icon_path = alt
-                except Exception:
-                    pass
-            if icon_path.exists():
-                pm = QPixmap(str(icon_path)).scaled(64, 64, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
-                icon_label.setPixmap(pm)
-                self.setWindowIcon(QIcon(str(icon_path)))
-            else:
-                icon_label.setPixmap(QPixmap(":/icons/ipatool.png").scaled(64, 64, Qt.AspectRatioMode.KeepAspectRatio))
-        except Exception:
-            icon_label.setPixmap(QPixmap(":/icons/ipatool.png").scaled(64, 64, Qt.AspectRatioMode.KeepAspectRatio))
+        icon_label.setPixmap(assets.pixmap(size=64))
+        self.setWindowIcon(assets.icon())
         title_layout.addWidget(icon_label)
         
         title_text = QLabel("<h2>安装 ipatool</h2>")
@@ -181,22 +165,7 @@ class LoginDialog(QDialog):
         self.setWindowTitle("登录 Apple ID")
         self.setModal(True)
         self.setMinimumWidth(400)
-        try:
-            icon_path = Path(__file__).resolve().parents[1] / 'assets' / 'qianshu.png'
-            if not icon_path.exists():
-                try:
-                    import sys as _sys
-                    _meipass = getattr(_sys, '_MEIPASS', None)
-                    if _meipass:
-                        alt = Path(_meipass) / 'assets' / 'qianshu.png'
-                        if alt.exists():
-                            icon_path = alt
-                except Exception:
-                    pass
-            if icon_path.exists():
-                self.setWindowIcon(QIcon(str(icon_path)))
-        except Exception:
-            pass
+        self.setWindowIcon(assets.icon())
         
         layout = QVBoxLayout(self)
         
@@ -268,6 +237,97 @@ class LoginDialog(QDialog):
         return self.email_input.text(), self.password_input.text()
 
 
+class AccountPoolDialog(QDialog):
+    """账号池管理对话框"""
+    
+    def __init__(self, parent=None, pool=None, on_add=None):
+        """
+        Args:
+            pool: AccountPool
+            on_add: 添加账号的回调，返回是否添加成功（负责登录流程）
+        """
+        super().__init__(parent)
+        self.pool = pool
+        self.on_add = on_add
+        self.init_ui()
+        self.refresh()
+    
+    def init_ui(self):
+        """初始化界面"""
+        self.setWindowTitle("账号池")
+        self.setModal(True)
+        self.setMinimumWidth(420)
+        self.setWindowIcon(assets.icon())
+        
+        layout = QVBoxLayout(self)
+        
+        info_label = QLabel(
+            "除主账号外的 Apple ID，各自使用独立的 ipatool 会话目录。\n"
+            "批量下载时任务会分配给当前下载数最少的账号。取消勾选可暂停使用某个账号。"
+        )
+        info_label.setWordWrap(True)
+        info_label.setStyleSheet("color: #666; padding: 10px; background: #f5f5f5; border-radius: 5px;")
+        layout.addWidget(info_label)
+        
+        self.account_list = QListWidget()
+        self.account_list.itemChanged.connect(self.on_item_changed)
+        layout.addWidget(self.account_list)
+        
+        btn_layout = QHBoxLayout()
+        add_btn = QPushButton("添加账号...")
+        add_btn.clicked.connect(self.add_account)
+        btn_layout.addWidget(add_btn)
+        
+        remove_btn = QPushButton("移除")
+        remove_btn.clicked.connect(self.remove_account)
+        btn_layout.addWidget(remove_btn)
+        btn_layout.addStretch()
+        
+        close_btn = QPushButton("关闭")
+        close_btn.clicked.connect(self.accept)
+        btn_layout.addWidget(close_btn)
+        layout.addLayout(btn_layout)
+    
+    def refresh(self):
+        """刷新列表"""
+        self.account_list.blockSignals(True)
+        self.account_list.clear()
+        for account in self.pool.accounts():
+            item = QListWidgetItem(account['email'])
+            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+            item.setCheckState(
+                Qt.CheckState.Checked if account.get('enabled', True) else Qt.CheckState.Unchecked
+            )
+            if account.get('error'):
+                item.setToolTip(f"已停用：{account['error']}")
+                item.setForeground(QColor('#ff3b30'))
+            self.account_list.addItem(item)
+        self.account_list.blockSignals(False)
+    
+    def on_item_changed(self, item: QListWidgetItem):
+        """启用/停用账号"""
+        self.pool.set_enabled(item.text(), item.checkState() == Qt.CheckState.Checked)
+    
+    def add_account(self):
+        """添加账号"""
+        if self.on_add and self.on_add():
+            self.refresh()
+    
+    def remove_account(self):
+        """移除选中的账号"""
+        item = self.account_list.currentItem()
+        if item is None:
+            return
+        reply = QMessageBox.question(
+            self, "确认", f"确定移除账号 {item.text()} 吗？\n该账号的 ipatool 会话将被删除。",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            QMessageBox.StandardButton.No
+        )
+        if reply == QMessageBox.StandardButton.Yes:
+            self.pool.remove(item.text())
+            self.refresh()
+
+
 class SettingsDialog(QDialog):
     """设置对话框"""
     
@@ -281,12 +341,7 @@ class SettingsDialog(QDialog):
         self.setWindowTitle("设置")
         self.setModal(True)
         self.setMinimumWidth(500)
-        try:
-            icon_path = Path(__file__).resolve().parents[1] / 'assets' / 'qianshu.png'
-            if icon_path.exists():
-                self.setWindowIcon(QIcon(str(icon_path)))
-        except Exception:
-            pass
+        self.setWindowIcon(assets.icon())
         
         layout = QVBoxLayout(self)
         
@@ -333,9 +388,54 @@ class SettingsDialog(QDialog):
             self.auto_purchase_check.setChecked(self.config.auto_purchase)
         download_layout.addWidget(self.auto_purchase_check)
         
+        # 并发下载数范围（实际并发数根据吞吐与错误率自动调整）
+        concurrency_layout = QHBoxLayout()
+        concurrency_layout.addWidget(QLabel("并发下载数:"))
+        self.concurrency_floor_spin = QSpinBox()
+        self.concurrency_floor_spin.setRange(1, MAX_DOWNLOADS_PER_ACCOUNT)
+        concurrency_layout.addWidget(self.concurrency_floor_spin)
+        concurrency_layout.addWidget(QLabel("至"))
+        self.concurrency_ceiling_spin = QSpinBox()
+        self.concurrency_ceiling_spin.setRange(1, MAX_DOWNLOADS_PER_ACCOUNT)
+        concurrency_layout.addWidget(self.concurrency_ceiling_spin)
+        concurrency_layout.addWidget(QLabel(f"（自动调整，每个账号最多 {MAX_DOWNLOADS_PER_ACCOUNT} 个）"))
+        concurrency_layout.addStretch()
+        if self.config:
+            self.concurrency_floor_spin.setValue(self.config.concurrency_floor)
+            self.concurrency_ceiling_spin.setValue(self.config.concurrency_ceiling)
+        download_layout.addLayout(concurrency_layout)
+        
         download_group.setLayout(download_layout)
         layout.addWidget(download_group)
         
+        # 下载历史保留策略（0 表示不限制），设置了任一限制后启动时及修改后自动压缩
+        history_group = QGroupBox("下载历史")
+        history_layout = QHBoxLayout()
+        history_layout.addWidget(QLabel("最多保留"))
+        self.history_max_entries_spin = QSpinBox()
+        self.history_max_entries_spin.setRange(0, 1000000)
+        self.history_max_entries_spin.setSingleStep(1000)
+        self.history_max_entries_spin.setSpecialValueText("不限")
+        history_layout.addWidget(self.history_max_entries_spin)
+        history_layout.addWidget(QLabel("条，保留"))
+        self.history_max_age_spin = QSpinBox()
+        self.history_max_age_spin.setRange(0, 3650)
+        self.history_max_age_spin.setSpecialValueText("不限")
+        history_layout.addWidget(self.history_max_age_spin)
+        history_layout.addWidget(QLabel("天，每个应用最近"))
+        self.history_per_bundle_spin = QSpinBox()
+        self.history_per_bundle_spin.setRange(0, 1000)
+        self.history_per_bundle_spin.setSpecialValueText("不限")
+        history_layout.addWidget(self.history_per_bundle_spin)
+        history_layout.addWidget(QLabel("条"))
+        history_layout.addStretch()
+        if self.config:
+            self.history_max_entries_spin.setValue(self.config.history_max_entries)
+            self.history_max_age_spin.setValue(self.config.history_max_age_days)
+            self.history_per_bundle_spin.setValue(self.config.history_keep_per_bundle)
+        history_group.setLayout(history_layout)
+        layout.addWidget(history_group)
+        
         layout.addStretch()
         
         # 按钮
@@ -373,5 +473,11 @@ class SettingsDialog(QDialog):
             self.config.ipatool_path = self.ipatool_path_input.text()
             self.config.download_path = self.download_path_input.text()
             self.config.auto_purchase = self.auto_purchase_check.isChecked()
+            floor = self.concurrency_floor_spin.value()
+            self.config.concurrency_floor = floor
+            self.config.concurrency_ceiling = max(floor, self.concurrency_ceiling_spin.value())
+            self.config.history_max_entries = self.history_max_entries_spin.value()
+            self.config.history_max_age_days = self.history_max_age_spin.value()
+            self.config.history_keep_per_bundle = self.history_per_bundle_spin.value()
         
         super().accept()
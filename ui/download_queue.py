@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""
+下载队列
+"""
+
+from collections import deque
+from functools import partial
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
+
+from core import jobs
+from core.accounts import AccountPool
+from core.concurrency import AIMDController
+from core.ipatool import IPATool
+from core.jobs import DownloadJob
+from core.journal import JobJournal
+
+# 工作线程模块在第一次启动任务时才导入，避免拖慢主窗口启动
+
+
+class DownloadQueue(QObject):
+    """
+    下载队列：以有限并发执行下载任务，并把每个任务的生命周期写入任务日志
+
+    配置账号池时，任务分配给当前下载数最少的已登录账号，每个账号各自受并发上限约束。
+    配置并发控制器时，并发上限由控制器根据完成任务的吞吐、错误与延迟动态调整。
+    """
+
+    job_started = pyqtSignal(object)  # 任务开始 (DownloadJob)
+    job_progress = pyqtSignal(object, str, int)  # 任务进度 (任务, 消息, 百分比)
+    job_transfer = pyqtSignal(object, object)  # 传输进度 (任务, ProgressEvent)
+    job_finished = pyqtSignal(object, str)  # 任务完成 (任务, 文件路径)
+    job_failed = pyqtSignal(object, str)  # 任务失败 (任务, 错误信息)
+    drained = pyqtSignal()  # 队列已清空
+    concurrency_changed = pyqtSignal(object)  # 并发控制器的评估结果 (Decision)
+
+    def __init__(
+        self,
+        ipatool_getter: Callable[[], Optional[IPATool]],
+        journal: Optional[JobJournal] = None,
+        max_concurrent: int = 1,
+        prefetch_workers: int = 2,
+        account_pool: Optional[AccountPool] = None,
+        controller: Optional[AIMDController] = None,
+        parent=None
+    ):
+        """
+        初始化
+
+        Args:
+            ipatool_getter: 返回当前 IPATool 实例的函数（设置变更后实例可能被替换）
+            journal: 任务日志，None 则使用默认位置
+            max_concurrent: 每个账号的最大并发下载数
+            prefetch_workers: 许可预取并发数（0 表示不预取）
+            account_pool: 额外账号池，None 则只使用主账号
+            controller: 并发控制器，指定时忽略 max_concurrent，由控制器决定并发数
+        """
+        super().__init__(parent)
+        self.ipatool_getter = ipatool_getter
+        self.journal = journal or JobJournal()
+        self.controller = controller
+        self.max_concurrent = controller.limit if controller else max_concurrent
+        self.account_pool = account_pool
+        # 许可预取线程池在第一次用到时创建
+        self.prefetch_workers = prefetch_workers
+        self._prefetcher = None
+        # 预取窗口：只为队首若干个任务提前获取许可
+        self.prefetch_lookahead = max(1, prefetch_workers) * 2
+        self._pending: Deque[DownloadJob] = deque()
+        self._active: Dict[str, QThread] = {}  # 任务 ID -> DownloadWorker
+        # 各 IPATool 实例（账号）正在执行的任务数
+        self._load: Dict[int, int] = {}
+        self._retired: List[QThread] = []
+        self._verify_worker: Optional[QThread] = None
+        # 下载完成后是否校验 IPA 完整性
+        self.verify = True
+
+    @property
+    def prefetcher(self):
+        """许可预取器（LicensePrefetcher），不预取时为 None"""
+        if self._prefetcher is None and self.prefetch_workers > 0:
+            from core.licenses import LicensePrefetcher
+            self._prefetcher = LicensePrefetcher(self.prefetch_workers)
+        return self._prefetcher
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    @property
+    def active_count(self) -> int:
+        return len(self._active)
+
+    @property
+    def idle(self) -> bool:
+        return not self._pending and not self._active
+
+    def recover(self) -> List[DownloadJob]:
+        """读取上次未完成的任务并压缩日志（不会自动入队）"""
+        pending = self.journal.replay()
+        self.journal.compact(pending)
+        return pending
+
+    def enqueue(self, job: DownloadJob):
+        """添加任务"""
+        self.journal.record(job, jobs.QUEUED)
+        self._pending.append(job)
+        self._pump()
+
+    def resume(self, pending: List[DownloadJob]):
+        """恢复 recover() 返回的任务（日志中已有入队记录）"""
+        self._pending.extend(pending)
+        self._pump()
+
+    def discard(self, pending: List[DownloadJob]):
+        """放弃 recover() 返回的任务"""
+        for job in pending:
+            self.journal.record(job, jobs.FAILED, '已取消')
+
+    def busy_for(self, ipatool: IPATool) -> bool:
+        """是否有任务正在使用与该实例相同主目录（同一账号会话）的 ipatool"""
+        return any(w.ipatool.home == ipatool.home for w in self._active.values())
+
+    def rebalance(self):
+        """账号池变化后，按新的账号列表启动等待中的任务"""
+        self._pump()
+
+    def _tools(self) -> List[IPATool]:
+        """可用于下载的 IPATool 实例：主账号与账号池中已启用的账号"""
+        default = self.ipatool_getter()
+        if default is None:
+            return []
+        tools = [default]
+        if self.account_pool is not None:
+            tools += self.account_pool.tools(default.ipatool_path)
+            self._verify_accounts(default.ipatool_path)
+        return tools
+
+    def _verify_accounts(self, ipatool_path: str):
+        """在后台核对尚未核对身份的账号，完成后重新分配等待中的任务"""
+        if self._verify_worker is not None and self._verify_worker.isRunning():
+            return
+        emails = self.account_pool.unverified()
+        if not emails:
+            return
+        from .workers import AccountVerifyWorker
+        self._verify_worker = AccountVerifyWorker(self.account_pool, emails, ipatool_path)
+        self._verify_worker.finished.connect(lambda _usable: self.rebalance())
+        self._verify_worker.start()
+
+    def _pick_tool(self, tools: Optional[List[IPATool]] = None) -> Optional[IPATool]:
+        """选择当前任务数最少且未达并发上限的账号"""
+        best = None
+        for tool in self._tools() if tools is None else tools:
+            load = self._load.get(id(tool), 0)
+            if load >= self.max_concurrent:
+                continue
+            if best is None or load < self._load.get(id(best), 0):
+                best = tool
+        return best
+
+    @staticmethod
+    def _tool_for_account(tools: List[IPATool], account: str) -> Optional[IPATool]:
+        for tool in tools:
+            if tool.account_email and tool.account_email.lower() == account.lower():
+                return tool
+        return None
+
+    def _next_job(self, tools: List[IPATool]) -> Optional[Tuple[DownloadJob, IPATool]]:
+        """
+        下一个可以开始的任务及其账号
+
+        已分配账号（已按该账号预取许可）的任务只在该账号有空闲时开始，
+        账号已被移除或停用时改为重新分配；其他任务分配给任务数最少的账号。
+        """
+        free = self._pick_tool(tools)
+        if free is None:
+            return None
+        for job in self._pending:
+            if job.account:
+                tool = self._tool_for_account(tools, job.account)
+                if tool is None:
+                    job.account = ''
+                elif self._load.get(id(tool), 0) < self.max_concurrent:
+                    return job, tool
+                else:
+                    continue
+            return job, free
+        return None
+
+    def _pump(self):
+        """在并发上限内启动等待中的任务"""
+        self._retired = [w for w in self._retired if not w.isFinished()]
+        tools = self._tools()
+        while self._pending:
+            picked = self._next_job(tools)
+            if picked is None:
+                break
+            job, ipatool = picked
+            self._pending.remove(job)
+            job.account = ipatool.account_email or ''
+            from .workers import DownloadWorker
+            worker = DownloadWorker(
+                ipatool,
+                job.bundle_id or None,
+                job.app_id or None,
+                job.output_path or None,
+                job.auto_purchase,
+                self.prefetcher,
+                job.expected_size,
+                self.verify
+            )
+            worker.stage.connect(partial(self._on_stage, job))
+            worker.progress.connect(partial(self.job_progress.emit, job))
+            worker.transfer.connect(partial(self.job_transfer.emit, job))
+            worker.finished.connect(partial(self._on_finished, job))
+            worker.error.connect(partial(self._on_error, job))
+            self._active[job.id] = worker
+            self._load[id(ipatool)] = self._load.get(id(ipatool), 0) + 1
+            self.job_started.emit(job)
+            worker.start()
+        self._prefetch_upcoming(tools)
+
+    def _prefetch_upcoming(self, tools: List[IPATool]):
+        """
+        为即将开始的任务预取许可，与当前下载并行
+
+        许可按账号区分：按 _next_job 的分配规则模拟各账号的任务数，为每个任务确定账号并记录在任务上，
+        开始下载时使用同一账号，预取的许可不会落到其他账号上。
+        """
+        if not self._pending or not tools or self.prefetcher is None:
+            return
+        load = {id(tool): self._load.get(id(tool), 0) for tool in tools}
+        for i, job in enumerate(self._pending):
+            if i >= self.prefetch_lookahead:
+                break
+            tool = self._tool_for_account(tools, job.account) if job.account else None
+            if tool is None:
+                tool = min(tools, key=lambda t: load[id(t)])
+                if not tool.account_email:
+                    continue  # 账号尚未确认，无法按账号预取
+                job.account = tool.account_email
+            load[id(tool)] += 1
+            if job.auto_purchase and job.bundle_id:
+                self.prefetcher.prefetch(tool, job.bundle_id)
+
+    def _on_stage(self, job: DownloadJob, stage: str):
+        self.journal.record(job, stage)
+
+    def _observe(self, job: DownloadJob, ok: bool, error: str = ''):
+        """把完成的任务反馈给并发控制器，并应用新的并发上限"""
+        if self.controller is None:
+            return
+        worker = self._active.get(job.id)
+        event = worker.last_event if worker is not None else None
+        nbytes = event.bytes_done if event is not None else 0
+        elapsed = event.elapsed if event is not None else 0.0
+        decision = self.controller.record(ok, nbytes, elapsed, error)
+        if decision is not None:
+            self.max_concurrent = self.controller.limit
+            self.concurrency_changed.emit(decision)
+
+    def _on_finished(self, job: DownloadJob, file_path: str):
+        job.result_path = file_path
+        self._observe(job, True)
+        self.journal.record(job, jobs.DONE)
+        self._retire(job)
+        self.job_finished.emit(job, file_path)
+        self._after_job()
+
+    def _on_error(self, job: DownloadJob, error: str):
+        self._observe(job, False, error)
+        self.journal.record(job, jobs.FAILED, error)
+        self._retire(job)
+        self.job_failed.emit(job, error)
+        self._after_job()
+
+    def _retire(self, job: DownloadJob):
+        # 自定义 finished 信号在 run() 返回前发出，线程结束前保留引用
+        worker = self._active.pop(job.id, None)
+        if worker is not None:
+            key = id(worker.ipatool)
+            self._load[key] = max(0, self._load.get(key, 0) - 1)
+            if not self._load[key]:
+                del self._load[key]
+            self._retired.append(worker)
+
+    def _after_job(self):
+        self._pump()
+        if self.idle:
+            self.drained.emit()
+
+    def shutdown(self):
+        """关闭队列，刷新任务日志（未完成的任务下次启动时可恢复）"""
+        if self._prefetcher is not None:
+            self._prefetcher.shutdown()
+        self.journal.close()
@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+"""
+下载历史表格模型
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt, pyqtSignal
+from PyQt6.QtGui import QColor
+
+from core.text_index import TrigramIndex, build_index
+
+COLUMNS = ["文件名", "应用名称", "Bundle ID", "下载时间", "文件路径"]
+
+
+def _document(item: Dict[str, Any]) -> tuple:
+    """参与筛选的字段（名称、Bundle ID、版本、路径）"""
+    return (item.get('app_name') or '', item.get('bundle_id') or '', item.get('version') or '',
+            item.get('file_path') or '')
+
+
+class HistoryModel(QAbstractTableModel):
+    """
+    下载历史（新记录在前）
+
+    记录按时间正序保存，编号即在列表中的下标；_rows 为当前显示的记录编号（升序），
+    第 row 行对应 _rows 的倒数第 row + 1 项，新下载只需在末尾追加并插入第 0 行。
+    行按需分批加载（canFetchMore/fetchMore），单元格文本在显示时生成，格式化后的时间会被缓存，
+    十万条记录也能立即打开。
+
+    筛选使用三元组索引（载入记录后在后台线程建立），只重置为匹配的行，不会逐行扫描或重建表格。
+    文件移动、新增或删除时按文件路径只更新、插入或删除对应的行（删除的记录保留编号，不再显示）。
+    """
+
+    filter_changed = pyqtSignal(int, int)  # 筛选结果变化 (显示的条数, 总条数)
+    _index_built = pyqtSignal(object, int)  # 后台索引建立完成 (索引, 载入批次)
+
+    BATCH = 256  # 每次滚动到底部时加载的行数
+    MISSING_COLOR = QColor('#999999')
+    CHANGED_COLOR = QColor('#b26a00')
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._items: List[Dict[str, Any]] = []
+        self._rows: List[int] = []
+        self._removed: Set[int] = set()
+        self._loaded = 0
+        self._missing: Set[str] = set()
+        self._changed: Set[str] = set()
+        self._time_cache: Dict[int, str] = {}
+        # 文件路径 -> 记录编号（同一路径可能被重复下载）
+        self._positions: Dict[str, List[int]] = {}
+        # 筛选：索引、查询串（空表示不筛选）
+        self._search: Optional[TrigramIndex] = None
+        self._query = ''
+        # 索引建立期间被修改的记录，建立完成后补充到索引
+        self._dirty: Set[int] = set()
+        self._generation = 0
+        self._index_built.connect(self._on_index_built)
+
+    # ---- 数据 ----
+
+    def set_items(self, history: Iterable[Dict[str, Any]]):
+        """重新加载全部记录"""
+        self.beginResetModel()
+        items = [item for item in history if isinstance(item, dict)]
+        # 历史通常已按时间追加，Timsort 对有序数据是线性的
+        items.sort(key=lambda x: x.get('timestamp', 0) or 0)
+        self._items = items
+        self._rows = list(range(len(items)))
+        self._removed = set()
+        self._loaded = min(len(items), self.BATCH)
+        self._positions = {}
+        for i, item in enumerate(items):
+            self._positions.setdefault(item.get('file_path', ''), []).append(i)
+        self._search = None
+        self._dirty = set()
+        self._generation += 1
+        self.endResetModel()
+        self.filter_changed.emit(len(items), len(items))
+        threading.Thread(
+            target=self._build_index, args=(list(items), self._generation), daemon=True
+        ).start()
+
+    def _build_index(self, items: List[Dict[str, Any]], generation: int):
+        """建立筛选索引（后台线程）"""
+        try:
+            index = build_index(_document(item) for item in items)
+        except Exception as e:
+            print(f"建立历史索引失败: {e}")
+            return
+        self._index_built.emit(index, generation)
+
+    def _on_index_built(self, index: TrigramIndex, generation: int):
+        if generation != self._generation:
+            return
+        # 建立索引期间修改或新增的记录
+        built = len(index)
+        for i in self._dirty:
+            if i < built:
+                index.update(i, *self._split(self._items[i]))
+        self._dirty = set()
+        for item in self._items[built:]:
+            index.add(*self._split(item))
+        self._search = index
+        if self._query:
+            self._apply_filter()
+
+    @staticmethod
+    def _split(item: Dict[str, Any]) -> tuple:
+        doc = _document(item)
+        return doc[:-1], doc[-1]
+
+    def set_filter(self, query: str):
+        """按名称、Bundle ID、版本或路径筛选（索引尚未建立时，建立完成后自动应用）"""
+        self._query = query.strip()
+        if self._search is not None or not self._query:
+            self._apply_filter()
+
+    @property
+    def filtering(self) -> bool:
+        return bool(self._query) and self._search is not None
+
+    def _apply_filter(self):
+        view = self._search.search(self._query) if self._search is not None and self._query else None
+        if view is None:
+            view = range(len(self._items))
+        self.beginResetModel()
+        removed = self._removed
+        self._rows = [i for i in view if i not in removed] if removed else list(view)
+        self._loaded = min(len(self._rows), self.BATCH)
+        self.endResetModel()
+        self._emit_count()
+
+    def _emit_count(self):
+        self.filter_changed.emit(len(self._rows), len(self._items) - len(self._removed))
+
+    def _index_of(self, row: int) -> int:
+        return self._rows[len(self._rows) - 1 - row]
+
+    def _pos_of(self, i: int) -> Optional[int]:
+        pos = bisect_left(self._rows, i)
+        if pos < len(self._rows) and self._rows[pos] == i:
+            return pos
+        return None
+
+    def _row_of(self, i: int) -> Optional[int]:
+        pos = self._pos_of(i)
+        return None if pos is None else len(self._rows) - 1 - pos
+
+    def prepend(self, item: Dict[str, Any]):
+        """新增一条记录（不符合当前筛选条件时不显示）"""
+        i = len(self._items)
+        self._items.append(item)
+        self._positions.setdefault(item.get('file_path', ''), []).append(i)
+        if self._search is not None:
+            self._search.add(*self._split(item))
+            if self._query and not self._search.matches(i, self._query):
+                self._emit_count()
+                return
+        self.beginInsertRows(QModelIndex(), 0, 0)
+        self._rows.append(i)
+        self._loaded += 1
+        self.endInsertRows()
+        self._emit_count()
+
+    def upsert(self, item: Dict[str, Any]):
+        """按文件路径更新已有记录，不存在时作为新记录插入"""
+        path = item.get('file_path', '')
+        if path in self._positions:
+            self.update_path(path, item)
+        else:
+            self.prepend(item)
+
+    def update_path(self, path: str, changes: Dict[str, Any]):
+        """
+        修改某个文件路径对应的记录，只刷新这些行
+
+        Args:
+            path: 原文件路径
+            changes: 要修改的字段（包含新的 file_path 时表示文件被移动或改名）
+        """
+        ids = self._positions.pop(path, None)
+        if not ids:
+            return
+        new_path = changes.get('file_path', path)
+        self._positions.setdefault(new_path, []).extend(ids)
+        for i in ids:
+            item = self._items[i]
+            item.update(changes)
+            if self._search is not None:
+                self._search.update(i, *self._split(item))
+            else:
+                self._dirty.add(i)
+        if self.filtering:
+            # 修改后的记录可能不再符合（或开始符合）当前筛选条件
+            for i in ids:
+                if i in self._removed:
+                    continue
+                if self._search.matches(i, self._query):
+                    self._show(i)
+                else:
+                    self._hide(i)
+            self._emit_count()
+        self.refresh_paths([new_path])
+
+    def remove_path(self, path: str):
+        """删除某个文件路径对应的记录，只移除这些行"""
+        ids = self._positions.pop(path, None)
+        if not ids:
+            return
+        self._removed.update(ids)
+        for i in ids:
+            self._hide(i)
+        self._emit_count()
+
+    def _show(self, i: int):
+        """显示第 i 条记录（已显示时忽略）"""
+        pos = bisect_left(self._rows, i)
+        if pos < len(self._rows) and self._rows[pos] == i:
+            return
+        row = len(self._rows) - pos
+        if row <= self._loaded:
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._rows.insert(pos, i)
+            self._loaded += 1
+            self.endInsertRows()
+        else:
+            # 落在尚未加载的部分，滚动到该处时再加载
+            self._rows.insert(pos, i)
+
+    def _hide(self, i: int):
+        """不再显示第 i 条记录（未显示时忽略）"""
+        pos = self._pos_of(i)
+        if pos is None:
+            return
+        row = len(self._rows) - 1 - pos
+        if row < self._loaded:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self._rows[pos]
+            self._loaded -= 1
+            self.endRemoveRows()
+        else:
+            # 尚未加载的行视图还不知道，直接移除即可
+            del self._rows[pos]
+
+    def items_for(self, path: str) -> List[Dict[str, Any]]:
+        """某个文件路径对应的记录"""
+        return [self._items[i] for i in self._positions.get(path, ())]
+
+    def item(self, row: int) -> Optional[Dict[str, Any]]:
+        """第 row 行的记录"""
+        if 0 <= row < len(self._rows):
+            return self._items[self._index_of(row)]
+        return None
+
+    def rows_for(self, path: str) -> List[int]:
+        """某个文件路径对应的已加载行"""
+        rows = []
+        for i in self._positions.get(path, ()):
+            row = self._row_of(i)
+            if row is not None and row < self._loaded:
+                rows.append(row)
+        return rows
+
+    def set_missing(self, paths: Set[str]):
+        """标记文件已不存在的路径，只刷新状态变化的行"""
+        changed = self._missing ^ paths
+        self._missing = set(paths)
+        self.refresh_paths(changed)
+
+    def set_changed(self, paths: Set[str]):
+        """标记大小与记录不同的路径，只刷新状态变化的行"""
+        changed = self._changed ^ paths
+        self._changed = set(paths)
+        self.refresh_paths(changed)
+
+    def refresh_paths(self, paths: Iterable[str]):
+        """刷新指定路径所在的行"""
+        for path in paths:
+            for row in self.rows_for(path):
+                self.dataChanged.emit(self.index(row, 0), self.index(row, len(COLUMNS) - 1))
+
+    def _time_text(self, timestamp: Any) -> str:
+        if not timestamp:
+            return '未知'
+        key = int(timestamp)
+        text = self._time_cache.get(key)
+        if text is None:
+            text = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(key))
+            self._time_cache[key] = text
+        return text
+
+    # ---- QAbstractTableModel ----
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._loaded
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def canFetchMore(self, parent: QModelIndex = QModelIndex()) -> bool:
+        return not parent.isValid() and self._loaded < len(self._rows)
+
+    def fetchMore(self, parent: QModelIndex = QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(self.BATCH, len(self._rows) - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return COLUMNS[section]
+        return None
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        item = self.item(index.row())
+        if item is None:
+            return None
+        column = index.column()
+        file_path = item.get('file_path', '')
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                return Path(file_path).name if file_path else '未知'
+            if column == 1:
+                app_name = item.get('app_name', '未知')
+                return f"{app_name} ({item['version']})" if item.get('version') else app_name
+            if column == 2:
+                return item.get('bundle_id', '')
+            if column == 3:
+                return self._time_text(item.get('timestamp', 0))
+            if column == 4:
+                return file_path
+        elif role == Qt.ItemDataRole.ToolTipRole:
+            if file_path in self._missing:
+                return f"文件已不存在: {file_path}"
+            if file_path in self._changed:
+                return f"文件大小与下载时不同（可能已被替换）: {file_path}"
+            if column == 4:
+                return file_path
+        elif role == Qt.ItemDataRole.ForegroundRole:
+            if file_path in self._missing:
+                return self.MISSING_COLOR
+            if file_path in self._changed:
+                return self.CHANGED_COLOR
+        elif role == Qt.ItemDataRole.UserRole:
+            return file_path
+        return None
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+下载目录监视
+"""
+
+import os
+import threading
+from typing import List, Set
+
+from PyQt6.QtCore import QFileSystemWatcher, QObject, QTimer, pyqtSignal
+
+from core.library import LibraryIndex
+
+
+class LibraryWatcher(QObject):
+    """
+    监视下载目录及其子目录，文件新增、移动或删除时只同步发生变化的目录
+
+    子目录列表由后台扫描（LibraryScanWorker）提供，界面线程不遍历目录树。
+
+    同一时间段内的多次变化合并为一次同步（下载、复制大文件时会产生大量事件），
+    同步在后台线程执行，新出现的子目录会自动加入监视。
+    """
+
+    changed = pyqtSignal(list, list)  # 索引已更新 (新增或更新的路径, 移除的路径)
+    _synced = pyqtSignal(list, list, list)  # 后台同步完成 (新增或更新, 移除, 新子目录)
+
+    DEBOUNCE_MS = 500  # 收到第一个事件后等待多久再同步
+
+    def __init__(self, index: LibraryIndex, parent=None):
+        super().__init__(parent)
+        self.index = index
+        self.root = ''
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._on_directory_changed)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self.DEBOUNCE_MS)
+        self._timer.timeout.connect(self._flush)
+        self._synced.connect(self._on_synced)
+        self._dirty: Set[str] = set()
+        self._busy = False
+
+    def start(self, root: str):
+        """开始监视根目录（替换之前的目录），子目录由 add_directories 加入"""
+        self.stop()
+        self.root = os.path.abspath(root)
+        self._watcher.addPath(self.root)
+
+    def add_directories(self, root: str, directories: List[str]):
+        """监视后台扫描得到的子目录（扫描期间已切换到其他目录时忽略）"""
+        if not self.root or os.path.abspath(root) != self.root:
+            return
+        watched = set(self._watcher.directories())
+        new = [d for d in directories if d not in watched]
+        failed = self._watcher.addPaths(new) if new else []
+        if failed:
+            print(f"无法监视 {len(failed)} 个目录（可能超出系统的监视数量上限）")
+
+    def stop(self):
+        """停止监视"""
+        watched = self._watcher.directories()
+        if watched:
+            self._watcher.removePaths(watched)
+        self._timer.stop()
+        self._dirty.clear()
+        self.root = ''
+
+    @property
+    def watching(self) -> bool:
+        return bool(self.root)
+
+    def _on_directory_changed(self, path: str):
+        self._dirty.add(os.path.abspath(path))
+        # 不重新计时：持续写入时也能在固定延迟后同步
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def _flush(self):
+        if self._busy:
+            self._timer.start()
+            return
+        if not self._dirty:
+            return
+        directories, self._dirty = sorted(self._dirty), set()
+        self._busy = True
+        watched = set(self._watcher.directories())
+        threading.Thread(target=self._sync, args=(directories, watched), daemon=True).start()
+
+    def _sync(self, directories: List[str], watched: Set[str]):
+        """同步变化的目录（后台线程）"""
+        updated: List[str] = []
+        removed: List[str] = []
+        new_dirs: List[str] = []
+        stack = list(directories)
+        try:
+            while stack:
+                u, r, subdirs = self.index.sync_directory(stack.pop(), save=False)
+                updated.extend(u)
+                removed.extend(r)
+                for sub in subdirs:
+                    if sub not in watched and sub not in new_dirs:
+                        # 整个目录被移入时其中的文件不会产生单独的事件，需要一并同步
+                        new_dirs.append(sub)
+                        stack.append(sub)
+            if updated or removed:
+                self.index.save()
+        except Exception as e:
+            print(f"同步下载目录失败: {e}")
+        self._synced.emit(updated, removed, new_dirs)
+
+    def _on_synced(self, updated: list, removed: list, new_dirs: list):
+        self._busy = False
+        # 同步期间可能已切换到其他目录
+        prefix = self.root.rstrip(os.sep) + os.sep
+        existing = [d for d in new_dirs if d.startswith(prefix) and os.path.isdir(d)]
+        if self.root and existing:
+            self._watcher.addPaths(existing)
+        if updated or removed:
+            self.changed.emit(updated, removed)
+        if self._dirty and not self._timer.isActive():
+            self._timer.start()
+
+    def watched_directories(self) -> List[str]:
+        """当前监视的目录"""
+        return self._watcher.directories()
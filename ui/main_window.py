@@ -9,49 +9,140 @@ from PyQt6.QtWidgets import (
     QTableWidget, QTableWidgetItem, QTabWidget,
     QProgressBar, QMessageBox, QFileDialog, QComboBox,
     QCheckBox, QGroupBox, QHeaderView, QToolBar, QStatusBar,
-    QInputDialog
+    QInputDialog, QTableView, QSpinBox
 )
-from PyQt6.QtCore import Qt, QTimer
-from PyQt6.QtGui import QIcon
+from PyQt6.QtCore import Qt, QTimer, QByteArray, QThread
 from pathlib import Path
+from functools import partial
+import os
+import re
+import shutil
+from typing import Callable, Dict, List, Optional
 
 import time
+from core.accounts import get_account_pool
+from core.concurrency import AIMDController, Decision
 from core.config import Config
 from core.ipatool import IPATool
-from core.ipatool_installer import IPAToolInstaller, check_ipatool_installed
+from core.jobs import DownloadJob
+from core.library import CHANGED, MISSING, get_library_index
+from core.models import AppRecord
+from core.profiler import StartupProfiler
+from core.progress import format_bytes
+from core.session import SessionSnapshot
 
-from .dialogs import SettingsDialog, LoginDialog, InstallIPADialog
-from .workers import SearchWorker, DownloadWorker
+from . import assets
+from .download_queue import DownloadQueue
+from .library_watcher import LibraryWatcher
+
+# 各功能模块（历史、关注列表、清单、工作线程等）在对应的标签页和操作中按需导入，缩短启动时间
+# 对话框与 ipatool 安装器同样按需导入（安装器依赖 ssl/zipfile/tarfile 等较重模块）
+
+DOWNLOAD_BUTTON_STYLE = """
+    QPushButton {
+        background-color: #007aff;
+        color: white;
+        border: none;
+        padding: 10px;
+        font-size: 14px;
+        border-radius: 5px;
+    }
+    QPushButton:hover {
+        background-color: #005ecb;
+    }
+    QPushButton:disabled {
+        background-color: #ccc;
+    }
+"""
+
+# 搜索结果行内下载按钮样式，在表格上设置一次，由各行按钮继承
+ROW_BUTTON_STYLE = """
+    QPushButton#rowDownloadButton {
+        background-color: #4CAF50;
+        border: none;
+        color: white;
+        padding: 5px 10px;
+        text-align: center;
+        text-decoration: none;
+        margin: 2px 1px;
+        border-radius: 4px;
+        min-width: 60px;
+    }
+    QPushButton#rowDownloadButton:hover {
+        background-color: #45a049;
+    }
+    QPushButton#rowDownloadButton:disabled {
+        background-color: #cccccc;
+    }
+"""
 
 
 class MainWindow(QMainWindow):
     """主窗口"""
     
-    def __init__(self):
+    HISTORY_CHECK_INTERVAL_MS = 10 * 60 * 1000  # 后台检查历史记录文件的间隔
+    WATCHLIST_TICK_MS = 5 * 60 * 1000  # 关注列表每隔多久查询一批到期的应用
+    
+    def __init__(self, profiler: StartupProfiler = None):
         super().__init__()
+        self.profiler = profiler or StartupProfiler()
         self.config = Config()
         self.ipatool = None
         self.current_download = None
         self.ipatool_installer = None
+        self._lazy_tabs: Dict[int, Callable[[], QWidget]] = {}
+        self._pending_logs: List[str] = []
+        self.last_search_results: List[AppRecord] = []
+        # 搜索结果中各应用的当前版本（Bundle ID -> 版本），下载前据此判断是否已存在
+        self._search_versions: Dict[str, str] = {}
+        self.library = get_library_index()
+        self.library_worker = None
+        self._rescan_root: Optional[str] = None
+        # 下载目录中文件变化时增量更新索引与历史页
+        self.library_watcher = LibraryWatcher(self.library, self)
+        self.library_watcher.changed.connect(self.on_library_changed)
+        self._missing_paths: set = set()
+        # 后台检查历史记录中的文件（启动后及每隔一段时间执行，下载进行时暂停）
+        self._changed_paths: set = set()
+        self.history_check_worker = None
+        self._history_check_timer = QTimer(self)
+        self._history_check_timer.setInterval(self.HISTORY_CHECK_INTERVAL_MS)
+        self._history_check_timer.timeout.connect(self.start_history_check)
+        # 关注列表：分批查询到期应用的当前版本，版本变化时才加入下载队列
+        self._watchlist = None  # 首次使用时加载
+        self.watchlist_worker = None
+        self._watch_inflight: set = set()  # 由关注列表加入队列、尚未结束的 Bundle ID
+        self._watchlist_timer = QTimer(self)
+        self._watchlist_timer.setInterval(self.WATCHLIST_TICK_MS)
+        self._watchlist_timer.timeout.connect(self.check_watchlist)
+        self._batch = {'total': 0, 'done': 0, 'failed': 0}
+        self._resume_after_auth = False
+        self.account_pool = get_account_pool()
+        self.concurrency = AIMDController(self.config.concurrency_floor, self.config.concurrency_ceiling)
+        self.download_queue = DownloadQueue(
+            lambda: self.ipatool, account_pool=self.account_pool,
+            controller=self.concurrency, parent=self
+        )
+        self.download_queue.verify = self.config.verify_downloads
+        self.download_queue.job_started.connect(self.on_job_started)
+        self.download_queue.job_progress.connect(self.on_download_progress)
+        self.download_queue.job_transfer.connect(self.on_download_transfer)
+        self.download_queue.job_finished.connect(self.on_download_finished)
+        self.download_queue.job_failed.connect(self.on_download_error)
+        self.download_queue.drained.connect(self.on_queue_drained)
+        self.download_queue.concurrency_changed.connect(self.on_concurrency_changed)
+        self.session = SessionSnapshot()
+        self._session_data = self.session.load()
+        self.profiler.mark('加载配置')
         
         # 设置窗口图标（assets/qianshu.png），支持 PyInstaller 运行目录
-        try:
-            icon_path = (Path(__file__).resolve().parent.parent / 'assets' / 'qianshu.png')
-            if not icon_path.exists():
-                try:
-                    meipass = getattr(__import__('sys'), '_MEIPASS', None)
-                    if meipass:
-                        alt = Path(meipass) / 'assets' / 'qianshu.png'
-                        if alt.exists():
-                            icon_path = alt
-                except Exception:
-                    pass
-            if icon_path.exists():
-                self.setWindowIcon(QIcon(str(icon_path)))
-        except Exception:
-            pass
+        self.setWindowIcon(assets.icon())
         
         self.init_ui()
+        self.profiler.mark('构建首屏界面')
+        # 先渲染上次会话快照，实时数据随后在后台校验
+        self._restore_session()
+        self.profiler.mark('恢复会话快照')
         # 延迟初始化，先展示主窗口，提升启动体验
         QTimer.singleShot(120, self._post_init)
 
@@ -59,12 +150,310 @@ class MainWindow(QMainWindow):
         try:
             self.statusBar().showMessage("正在初始化 ipatool...")
             self.init_ipatool()
-            self.check_auth()
+            # 未完成的任务需要知道当前账号，等后台认证检查完成后再恢复
+            self._resume_after_auth = True
+            self.check_auth_async()
+            self.compact_history_now()
+            self.scan_library()
+            self.start_history_check()
+            self._history_check_timer.start()
+            if self.config.watchlist_interval:
+                self._watchlist_timer.start()
         except Exception as e:
             self.update_status(f"初始化失败: {str(e)}", error=True)
         finally:
             self.statusBar().showMessage("就绪")
     
+    def scan_library(self, root: Optional[str] = None):
+        """在后台扫描下载目录，只解析新增或变化的 IPA"""
+        root = root or self.config.download_path
+        if not root or not Path(root).is_dir():
+            return
+        # 先开始监视根目录，子目录在后台扫描得到后加入监视
+        if os.path.abspath(root) != self.library_watcher.root:
+            self.library_watcher.start(root)
+        if self.library_worker and self.library_worker.isRunning():
+            # 正在扫描其他目录时，完成后再扫描新目录
+            if os.path.abspath(root) != os.path.abspath(self.library_worker.root):
+                self._rescan_root = root
+            return
+        self._rescan_root = None
+        from .workers import LibraryScanWorker
+        self.library_worker = LibraryScanWorker(root)
+        self.library_worker.directories.connect(self.library_watcher.add_directories)
+        self.library_worker.finished.connect(self.on_library_scanned)
+        self.library_worker.error.connect(lambda e: print(f"扫描下载目录失败: {e}"))
+        self.library_worker.start()
+    
+    def on_library_scanned(self, stats: dict):
+        """下载目录扫描完成"""
+        print(f"库索引: {stats['total']} 个 IPA，解析 {stats['parsed']} 个，"
+              f"移除 {stats['removed']} 个，耗时 {stats['elapsed']:.2f}s")
+        if self._showing_library() and (stats['parsed'] or stats['removed']):
+            self._load_history_model()
+        if self._rescan_root:
+            root, self._rescan_root = self._rescan_root, None
+            self.library_worker.wait()  # 完成信号发出后线程随即结束
+            self.scan_library(root)
+    
+    def on_library_changed(self, updated: list, removed: list):
+        """下载目录中有文件新增、移动或删除（历史页只更新受影响的行）"""
+        from core.manifest import manifest_path
+        history = self.config.get('download_history', [])
+        removed_set = set(removed)
+        index = self.library.entries() if updated else {}
+        entries = {path: index.get(path) for path in updated}
+        # 原路径 -> 移动后记录需要修改的字段
+        moves: Dict[str, dict] = {}
+        unclaimed = dict(entries) if removed_set else {}
+        for item in history:
+            if not isinstance(item, dict) or item.get('file_path') not in removed_set:
+                continue
+            old = item['file_path']
+            changes = moves.get(old)
+            if changes is None:
+                # 同一应用、同样大小的新文件视为被移动或改名
+                new = self._match_moved(item, unclaimed)
+                if new is None:
+                    continue
+                changes = moves[old] = {'file_path': new}
+            item['file_path'] = changes['file_path']
+            if item.get('manifest'):
+                item['manifest'] = changes['manifest'] = manifest_path(changes['file_path'])
+        if moves:
+            self.config.set('download_history', history)
+        
+        paths = {item.get('file_path') for item in history if isinstance(item, dict)}
+        missing = (self._missing_paths - set(updated)) | (removed_set & paths)
+        self._missing_paths = missing
+        if not self._tab_built(self.history_tab_index):
+            return
+        model = self.history_model
+        if self._showing_library():
+            added = {path: entry for path, entry in entries.items() if entry}
+            for old in removed:
+                previous = model.items_for(old)
+                new = self._match_moved(previous[0], added) if previous else None
+                if new is None:
+                    model.remove_path(old)
+                else:
+                    model.update_path(old, self._library_item(new, entries[new]))
+            for path, entry in added.items():
+                model.upsert(self._library_item(path, entry))
+        else:
+            for old, changes in moves.items():
+                model.update_path(old, changes)
+        model.set_missing(missing)
+    
+    @staticmethod
+    def _match_moved(item: dict, candidates: Dict[str, Optional[dict]]) -> Optional[str]:
+        """在新出现的文件中查找与记录同一应用、同样大小的文件（找到后从 candidates 中移除）"""
+        for path, entry in candidates.items():
+            if (entry and entry.get('bundle_id') == item.get('bundle_id')
+                    and (not item.get('size') or entry.get('size') == item.get('size'))):
+                del candidates[path]
+                return path
+        return None
+    
+    @staticmethod
+    def _library_item(path: str, entry: dict) -> dict:
+        """库索引条目转换为历史表格中的记录"""
+        return {
+            'file_path': path,
+            'app_name': entry.get('name') or Path(path).stem,
+            'bundle_id': entry.get('bundle_id', ''),
+            'version': entry.get('version', ''),
+            'timestamp': entry.get('mtime_ns', 0) // 1_000_000_000,
+            'size': entry.get('size', 0),
+        }
+    
+    def start_history_check(self):
+        """在后台检查历史记录中的文件是否仍存在、大小是否变化"""
+        if self.history_check_worker and self.history_check_worker.isRunning():
+            return
+        history = self.config.get('download_history', [])
+        if not history:
+            return
+        from .workers import HistoryCheckWorker
+        self.history_check_worker = HistoryCheckWorker(history)
+        self.history_check_worker.batch.connect(self.on_history_checked)
+        if not self.download_queue.idle:
+            self.history_check_worker.pause()
+        self.history_check_worker.start(QThread.Priority.LowestPriority)
+    
+    def on_history_checked(self, statuses: dict):
+        """一批历史记录检查完成，只更新状态变化的行"""
+        checked = set(statuses)
+        self._missing_paths = (self._missing_paths - checked) | {p for p, s in statuses.items() if s == MISSING}
+        self._changed_paths = (self._changed_paths - checked) | {p for p, s in statuses.items() if s == CHANGED}
+        if self._tab_built(self.history_tab_index):
+            self.history_model.set_missing(self._missing_paths)
+            self.history_model.set_changed(self._changed_paths)
+            self._update_prune_button()
+    
+    def _update_prune_button(self):
+        count = len(self._missing_paths)
+        self.prune_history_btn.setEnabled(count > 0)
+        self.prune_history_btn.setText(f"清理失效记录 ({count})" if count else "清理失效记录")
+    
+    def prune_history(self):
+        """删除文件已不存在的历史记录"""
+        history = self.config.get('download_history', [])
+        dead = [item for item in history if isinstance(item, dict) and item.get('file_path') in self._missing_paths]
+        if not dead:
+            QMessageBox.information(self, "提示", "没有发现失效的记录")
+            return
+        reply = QMessageBox.question(
+            self, "清理失效记录",
+            f"共有 {len(dead)} 条记录对应的文件已不存在，是否从下载历史中删除？",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            QMessageBox.StandardButton.No
+        )
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        kept = [item for item in history if not (isinstance(item, dict) and item.get('file_path') in self._missing_paths)]
+        self.config.set('download_history', kept)
+        self._missing_paths = set()
+        self.statusBar().showMessage(f"已删除 {len(history) - len(kept)} 条失效的历史记录", 5000)
+        if self._tab_built(self.history_tab_index):
+            self._load_history_model()
+            self._update_prune_button()
+    
+    def _retention_policy(self):
+        """设置中的历史保留策略（RetentionPolicy）"""
+        from core.history import RetentionPolicy
+        return RetentionPolicy(
+            self.config.history_max_entries,
+            self.config.history_max_age_days,
+            self.config.history_keep_per_bundle,
+        )
+    
+    def compact_history_now(self, interactive: bool = False):
+        """
+        去重并按保留策略裁剪下载历史，有变化时写回配置文件
+        
+        Args:
+            interactive: 手动执行（删除前确认；自动执行只在设置了保留策略时进行）
+        """
+        policy = self._retention_policy()
+        # 自动执行只在用户设置了保留策略后进行，默认不删除任何记录
+        if not interactive and not policy.active:
+            self._update_history_stats()
+            return
+        from core.history import compact_history
+        history = self.config.get('download_history', [])
+        kept, stats = compact_history(history, policy)
+        removed = stats['before'] - stats['after']
+        if interactive:
+            if not removed:
+                QMessageBox.information(self, "压缩历史", f"没有需要清理的记录\n\n保留策略：{policy.describe()}")
+                return
+            reply = QMessageBox.question(
+                self, "压缩历史",
+                f"共 {stats['before']} 条记录，将删除 {removed} 条，保留 {stats['after']} 条：\n\n"
+                f"重复记录 {stats['duplicates']} 条\n"
+                f"超过保留天数 {stats['expired']} 条\n"
+                f"超过每个应用的保留数 {stats['per_bundle']} 条\n"
+                f"超过总数上限 {stats['overflow']} 条\n\n"
+                f"保留策略：{policy.describe()}\n\n是否继续？此操作不可恢复！",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+                QMessageBox.StandardButton.No
+            )
+            if reply != QMessageBox.StandardButton.Yes:
+                return
+        if not removed:
+            self._update_history_stats()
+            return
+        self.config.set('download_history', kept)
+        if self._tab_built(self.history_tab_index) and not self._showing_library():
+            self._load_history_model()
+        else:
+            self._update_history_stats()
+        self.statusBar().showMessage(f"已按保留策略清理 {removed} 条历史记录", 5000)
+    
+    def _update_history_stats(self):
+        """历史页显示记录数、文件总大小与配置文件大小"""
+        if not self._tab_built(self.history_tab_index):
+            return
+        from core.history import history_stats
+        stats = history_stats(self.config.get('download_history', []))
+        try:
+            storage = os.path.getsize(self.config.config_file)
+        except OSError:
+            storage = 0
+        self.history_stats_label.setText(
+            f"{stats['entries']} 条记录 · {stats['bundles']} 个应用 · "
+            f"文件 {format_bytes(stats['files'])} · 存储 {format_bytes(storage)}"
+        )
+    
+    def _restore_session(self):
+        """渲染上次会话快照"""
+        data = self._session_data
+        if not data:
+            return
+        try:
+            geometry = data.get('geometry')
+            if geometry:
+                self.restoreGeometry(QByteArray.fromBase64(geometry.encode('ascii')))
+            state = data.get('window_state')
+            if state:
+                self.restoreState(QByteArray.fromBase64(state.encode('ascii')))
+            
+            # 账号信息先按快照显示，待后台校验后更新
+            account = data.get('account')
+            if account:
+                self.account_label.setText(f"已登录: {account}（验证中...）")
+                self.account_label.setStyleSheet("color: #999; padding: 5px;")
+            
+            self.search_input.setText(data.get('keyword', ''))
+            results = [AppRecord.from_dict(d) for d in data.get('search_results') or []]
+            if results:
+                self.last_search_results = results
+                self._populate_search_table(results)
+            
+            tab = data.get('current_tab', 0)
+            if isinstance(tab, int) and 0 <= tab < self.tab_widget.count():
+                self.tab_widget.setCurrentIndex(tab)
+                if tab == self.history_tab_index:
+                    scroll = data.get('history_scroll', 0)
+                    self.history_table.verticalScrollBar().setValue(scroll)
+        except Exception as e:
+            print(f"恢复会话快照失败: {e}")
+    
+    def _save_session(self):
+        """保存会话快照"""
+        # 账号取自最近一次 auth info 的结果，未初始化或未登录时为空；
+        # 启动时的认证检查尚未完成则沿用上次快照中的账号
+        account = (self.ipatool.account_email or '') if self.ipatool else ''
+        auth_worker = getattr(self, 'auth_worker', None)
+        if not account and auth_worker is not None and auth_worker.isRunning():
+            account = (self._session_data or {}).get('account', '')
+        history_scroll = 0
+        if self._tab_built(self.history_tab_index):
+            history_scroll = self.history_table.verticalScrollBar().value()
+        self.session.save({
+            'geometry': bytes(self.saveGeometry().toBase64()).decode('ascii'),
+            'window_state': bytes(self.saveState().toBase64()).decode('ascii'),
+            'account': account,
+            'keyword': self.search_input.text().strip(),
+            'search_results': [r.to_dict() for r in self.last_search_results],
+            'current_tab': self.tab_widget.currentIndex(),
+            'history_scroll': history_scroll
+        })
+    
+    def closeEvent(self, event):
+        """关闭窗口时保存会话快照"""
+        try:
+            self._save_session()
+        except Exception as e:
+            print(f"保存会话快照失败: {e}")
+        self.download_queue.shutdown()
+        if self.history_check_worker:
+            self.history_check_worker.stop()
+        if self.watchlist_worker:
+            self.watchlist_worker.stop()
+        super().closeEvent(event)
+    
     def init_ui(self):
         """初始化界面"""
         self.setWindowTitle("IPA Download Tool - iOS 应用下载工具")
@@ -98,19 +487,17 @@ class MainWindow(QMainWindow):
         self.tab_widget = QTabWidget()
         main_layout.addWidget(self.tab_widget)
         
-        # 搜索标签页
+        # 搜索标签页（首屏，立即构建）
         search_tab = self.create_search_tab()
         self.tab_widget.addTab(search_tab, "🔍 搜索下载")
         
-        # 下载标签页
-        download_tab = self.create_download_tab()
-        self.tab_widget.addTab(download_tab, "📥 直接下载")
-        
-        # 历史标签页
-        history_tab = self.create_history_tab()
-        self.history_tab_index = self.tab_widget.addTab(history_tab, "📋 下载历史")
+        # 下载/历史标签页在首次显示时再构建
+        self.download_tab_index = self._add_lazy_tab(self.create_download_tab, "📥 直接下载")
+        self.history_tab_index = self._add_lazy_tab(self.create_history_tab, "📋 下载历史")
+        self.watchlist_tab_index = self._add_lazy_tab(self.create_watchlist_tab, "👀 关注列表")
+        self.metrics_tab_index = self._add_lazy_tab(self.create_metrics_tab, "📊 指标")
         
-        # 切换到历史标签时自动刷新
+        # 切换标签时构建延迟标签页，切换到历史标签时自动刷新
         self.tab_widget.currentChanged.connect(self.on_tab_changed)
         
         # 状态栏
@@ -132,6 +519,11 @@ class MainWindow(QMainWindow):
         self.login_btn.clicked.connect(self.show_login_dialog)
         toolbar.addWidget(self.login_btn)
         
+        # 账号池按钮（多个 Apple ID 并行下载）
+        accounts_btn = QPushButton("账号池")
+        accounts_btn.clicked.connect(self.show_account_pool)
+        toolbar.addWidget(accounts_btn)
+        
         # 清除缓存按钮（清理 ipatool 认证与本地保存的账号信息）
         clear_cache_btn = QPushButton("清除缓存")
         clear_cache_btn.clicked.connect(self.clear_ipatool_cache)
@@ -149,6 +541,30 @@ class MainWindow(QMainWindow):
         
         return toolbar
     
+    def _add_lazy_tab(self, builder: Callable[[], QWidget], title: str) -> int:
+        """添加占位标签页，内容在首次显示时由 builder 构建"""
+        placeholder = QWidget()
+        layout = QVBoxLayout(placeholder)
+        layout.setContentsMargins(0, 0, 0, 0)
+        index = self.tab_widget.addTab(placeholder, title)
+        self._lazy_tabs[index] = builder
+        return index
+    
+    def _tab_built(self, index: int) -> bool:
+        """标签页内容是否已构建"""
+        return index not in self._lazy_tabs
+    
+    def _ensure_tab(self, index: int):
+        """确保标签页内容已构建"""
+        builder = self._lazy_tabs.pop(index, None)
+        if builder is None:
+            return
+        self.tab_widget.widget(index).layout().addWidget(builder())
+        if index == self.download_tab_index and self._pending_logs:
+            for message in self._pending_logs:
+                self.log_text.append(message)
+            self._pending_logs.clear()
+    
     def create_search_tab(self) -> QWidget:
         """创建搜索标签页"""
         widget = QWidget()
@@ -179,6 +595,7 @@ class MainWindow(QMainWindow):
         self.search_table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
         self.search_table.setAlternatingRowColors(True)
         self.search_table.setSortingEnabled(False)  # 初始禁用排序，填充数据后再启用
+        self.search_table.setStyleSheet(ROW_BUTTON_STYLE)
         layout.addWidget(self.search_table)
         
         return widget
@@ -186,8 +603,9 @@ class MainWindow(QMainWindow):
     def on_tab_changed(self, index: int):
         """标签页切换时处理"""
         try:
-            if index == getattr(self, 'history_tab_index', None):
-                self.refresh_history()
+            self._ensure_tab(index)
+            if index == getattr(self, 'metrics_tab_index', None):
+                self.refresh_metrics()
         except Exception as e:
             print(f"Error in on_tab_changed: {str(e)}")
     
@@ -204,7 +622,7 @@ class MainWindow(QMainWindow):
         bundle_layout = QHBoxLayout()
         bundle_layout.addWidget(QLabel("Bundle ID:"))
         self.bundle_input = QLineEdit()
-        self.bundle_input.setPlaceholderText("例如: com.tencent.xin")
+        self.bundle_input.setPlaceholderText("例如: com.tencent.xin（多个以空格或逗号分隔）")
         bundle_layout.addWidget(self.bundle_input)
         input_layout.addLayout(bundle_layout)
         
@@ -229,9 +647,17 @@ class MainWindow(QMainWindow):
         input_layout.addLayout(path_layout)
         
         # 选项
+        options_layout = QHBoxLayout()
         self.auto_purchase_check = QCheckBox("自动获取应用许可")
         self.auto_purchase_check.setChecked(self.config.auto_purchase)
-        input_layout.addWidget(self.auto_purchase_check)
+        options_layout.addWidget(self.auto_purchase_check)
+        options_layout.addStretch()
+        
+        self.bulk_license_btn = QPushButton("批量获取许可...")
+        self.bulk_license_btn.setToolTip("从文本文件读取 Bundle ID 列表，仅获取许可不下载")
+        self.bulk_license_btn.clicked.connect(self.start_bulk_license)
+        options_layout.addWidget(self.bulk_license_btn)
+        input_layout.addLayout(options_layout)
         
         input_group.setLayout(input_layout)
         layout.addWidget(input_group)
@@ -239,22 +665,7 @@ class MainWindow(QMainWindow):
         # 下载按钮
         self.download_btn = QPushButton("开始下载")
         self.download_btn.clicked.connect(self.start_download)
-        self.download_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #007aff;
-                color: white;
-                border: none;
-                padding: 10px;
-                font-size: 14px;
-                border-radius: 5px;
-            }
-            QPushButton:hover {
-                background-color: #005ecb;
-            }
-            QPushButton:disabled {
-                background-color: #ccc;
-            }
-        """)
+        self.download_btn.setStyleSheet(DOWNLOAD_BUTTON_STYLE)
         layout.addWidget(self.download_btn)
         
         # 进度组
@@ -267,6 +678,10 @@ class MainWindow(QMainWindow):
         self.progress_bar = QProgressBar()
         progress_layout.addWidget(self.progress_bar)
         
+        self.queue_label = QLabel("")
+        self.queue_label.setStyleSheet("color: #666;")
+        progress_layout.addWidget(self.queue_label)
+        
         self.log_text = QTextEdit()
         self.log_text.setReadOnly(True)
         self.log_text.setMaximumHeight(150)
@@ -294,21 +709,346 @@ class MainWindow(QMainWindow):
         clear_btn.clicked.connect(self.clear_history)
         toolbar.addWidget(clear_btn)
         
+        self.verify_library_btn = QPushButton("校验库")
+        self.verify_library_btn.setToolTip("校验历史记录中所有 IPA 的 ZIP 结构与 CRC")
+        self.verify_library_btn.clicked.connect(self.verify_library)
+        toolbar.addWidget(self.verify_library_btn)
+        
+        self.prune_history_btn = QPushButton("清理失效记录")
+        self.prune_history_btn.setToolTip("删除文件已被删除或移走的历史记录（后台检查发现后可用）")
+        self.prune_history_btn.clicked.connect(self.prune_history)
+        toolbar.addWidget(self.prune_history_btn)
+        
+        compact_btn = QPushButton("压缩历史")
+        compact_btn.setToolTip("合并重复记录，并按设置中的保留策略删除旧记录")
+        compact_btn.clicked.connect(lambda: self.compact_history_now(interactive=True))
+        toolbar.addWidget(compact_btn)
+        
         toolbar.addStretch()
+        self.history_stats_label = QLabel()
+        self.history_stats_label.setStyleSheet("color: #666;")
+        toolbar.addWidget(self.history_stats_label)
         layout.addLayout(toolbar)
         
-        # 历史表格
-        self.history_table = QTableWidget()
-        self.history_table.setColumnCount(4)
-        self.history_table.setHorizontalHeaderLabels([
-            "应用名称", "Bundle ID", "下载时间", "文件路径"
-        ])
-        self.history_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        self.history_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        # 筛选栏
+        filter_bar = QHBoxLayout()
+        self.history_scope = QComboBox()
+        self.history_scope.addItems(["下载历史", "下载目录"])
+        self.history_scope.setToolTip("下载目录：显示库索引中的全部 IPA（包括不在历史记录中的文件）")
+        self.history_scope.currentIndexChanged.connect(self.refresh_history)
+        filter_bar.addWidget(self.history_scope)
+        self.history_filter = QLineEdit()
+        self.history_filter.setPlaceholderText("筛选：应用名称 / Bundle ID / 版本 / 路径")
+        self.history_filter.setClearButtonEnabled(True)
+        filter_bar.addWidget(self.history_filter, 1)
+        self.history_count_label = QLabel()
+        self.history_count_label.setStyleSheet("color: #666;")
+        filter_bar.addWidget(self.history_count_label)
+        layout.addLayout(filter_bar)
+        # 输入停顿后再筛选，连续输入时不重复查询
+        self._history_filter_timer = QTimer(self)
+        self._history_filter_timer.setSingleShot(True)
+        self._history_filter_timer.setInterval(120)
+        self._history_filter_timer.timeout.connect(
+            lambda: self.history_model.set_filter(self.history_filter.text())
+        )
+        self.history_filter.textChanged.connect(self._history_filter_timer.start)
+        
+        # 历史表格（模型按需加载行，新下载只插入一行）
+        from .history_model import HistoryModel
+        self.history_model = HistoryModel(self)
+        self.history_model.filter_changed.connect(self.on_history_filter_changed)
+        self.history_table = QTableView()
+        self.history_table.setModel(self.history_model)
+        self.history_table.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
+        self.history_table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.history_table.setAlternatingRowColors(True)
+        self.history_table.setWordWrap(False)
+        # 固定行高，滚动时无需逐行计算尺寸
+        self.history_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.history_table.verticalHeader().setVisible(False)
+        header = self.history_table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        header.setStretchLastSection(True)
+        for column, width in enumerate((220, 200, 220, 150)):
+            header.resizeSection(column, width)
         layout.addWidget(self.history_table)
+        self._load_history_model()
+        
+        return widget
+    
+    @property
+    def watchlist(self):
+        """关注列表（首次使用时加载）"""
+        if self._watchlist is None:
+            from core.watchlist import get_watchlist
+            self._watchlist = get_watchlist()
+        return self._watchlist
+    
+    def create_watchlist_tab(self) -> QWidget:
+        """创建关注列表标签页"""
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+        
+        # 添加应用
+        add_layout = QHBoxLayout()
+        self.watch_input = QLineEdit()
+        self.watch_input.setPlaceholderText("Bundle ID（多个以空格或逗号分隔）")
+        self.watch_input.returnPressed.connect(self.add_to_watchlist)
+        add_layout.addWidget(self.watch_input)
+        add_btn = QPushButton("添加")
+        add_btn.clicked.connect(self.add_to_watchlist)
+        add_layout.addWidget(add_btn)
+        remove_btn = QPushButton("移除选中")
+        remove_btn.clicked.connect(self.remove_from_watchlist)
+        add_layout.addWidget(remove_btn)
+        layout.addLayout(add_layout)
+        
+        # 检查设置
+        options_layout = QHBoxLayout()
+        options_layout.addWidget(QLabel("检查间隔:"))
+        self.watch_interval_spin = QSpinBox()
+        self.watch_interval_spin.setRange(0, 24 * 60)
+        self.watch_interval_spin.setSingleStep(30)
+        self.watch_interval_spin.setSuffix(" 分钟")
+        self.watch_interval_spin.setSpecialValueText("仅手动")
+        self.watch_interval_spin.setValue(self.config.watchlist_interval)
+        self.watch_interval_spin.valueChanged.connect(self.on_watch_interval_changed)
+        options_layout.addWidget(self.watch_interval_spin)
+        self.watch_auto_check = QCheckBox("有新版本时自动下载")
+        self.watch_auto_check.setChecked(self.config.watchlist_auto_download)
+        self.watch_auto_check.toggled.connect(lambda checked: setattr(self.config, 'watchlist_auto_download', checked))
+        options_layout.addWidget(self.watch_auto_check)
+        options_layout.addStretch()
+        self.watch_check_btn = QPushButton("立即检查")
+        self.watch_check_btn.clicked.connect(lambda: self.check_watchlist(force=True))
+        options_layout.addWidget(self.watch_check_btn)
+        self.watch_download_btn = QPushButton("下载更新")
+        self.watch_download_btn.setToolTip("下载当前版本尚未下载的应用")
+        self.watch_download_btn.clicked.connect(lambda: self.enqueue_watchlist_updates(self.watchlist.outdated()))
+        options_layout.addWidget(self.watch_download_btn)
+        layout.addLayout(options_layout)
+        
+        self.watch_table = QTableWidget()
+        self.watch_table.setColumnCount(6)
+        self.watch_table.setHorizontalHeaderLabels([
+            "应用名称", "Bundle ID", "当前版本", "已下载版本", "上次检查", "状态"
+        ])
+        self.watch_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.watch_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.watch_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        layout.addWidget(self.watch_table)
+        
+        self.watch_status_label = QLabel()
+        self.watch_status_label.setStyleSheet("color: #666;")
+        layout.addWidget(self.watch_status_label)
+        
+        self.refresh_watchlist()
+        return widget
+    
+    def refresh_watchlist(self):
+        """刷新关注列表表格"""
+        if not self._tab_built(self.watchlist_tab_index):
+            return
+        items = sorted(self.watchlist.items().items(), key=lambda kv: (kv[1].get('name') or kv[0]).lower())
+        self.watch_table.setRowCount(len(items))
+        for row, (bundle_id, entry) in enumerate(items):
+            version = entry.get('version') or entry.get('external_version') or ''
+            checked = entry.get('checked')
+            if entry.get('error'):
+                status = f"查询失败: {entry['error']}"
+            elif bundle_id in self._watch_inflight:
+                status = "下载中"
+            elif not checked:
+                status = "等待检查"
+            elif entry.get('version') and entry.get('version') != entry.get('downloaded'):
+                # 首次查询到的版本只是基准，之后版本变化才算新版本
+                status = "有新版本" if entry.get('changed') else "未下载"
+            else:
+                status = "最新"
+            values = [
+                entry.get('name') or '', bundle_id, version, entry.get('downloaded') or '',
+                time.strftime('%Y-%m-%d %H:%M', time.localtime(checked)) if checked else '从未',
+                status,
+            ]
+            for column, value in enumerate(values):
+                self.watch_table.setItem(row, column, QTableWidgetItem(value))
+        self.watch_download_btn.setEnabled(bool(self.watchlist.outdated()))
+    
+    def add_to_watchlist(self):
+        """添加输入框中的 Bundle ID"""
+        bundle_ids = [b for b in re.split(r'[\s,;，；]+', self.watch_input.text().strip()) if b]
+        if not bundle_ids:
+            return
+        # 名称先取自搜索结果，首次检查后由 App Store 返回的名称补全
+        names = {app.bundle_id: app.name for app in self.last_search_results}
+        added = [b for b in bundle_ids if self.watchlist.add(b, names.get(b, ''))]
+        self.watch_input.clear()
+        self.refresh_watchlist()
+        if added:
+            self.watch_status_label.setText(f"已添加 {len(added)} 个应用")
+            self.check_watchlist(bundle_ids=added)
+    
+    def remove_from_watchlist(self):
+        """移除选中的应用"""
+        rows = sorted({index.row() for index in self.watch_table.selectionModel().selectedRows()})
+        bundle_ids = [self.watch_table.item(row, 1).text() for row in rows]
+        for bundle_id in bundle_ids:
+            self.watchlist.remove(bundle_id)
+        if bundle_ids:
+            self.refresh_watchlist()
+    
+    def on_watch_interval_changed(self, minutes: int):
+        """修改检查间隔（0 表示只手动检查）"""
+        self.config.watchlist_interval = minutes
+        if minutes:
+            self._watchlist_timer.start()
+        else:
+            self._watchlist_timer.stop()
+    
+    def check_watchlist(self, force: bool = False, bundle_ids: Optional[List[str]] = None):
+        """
+        查询关注应用的当前版本
+        
+        Args:
+            force: 忽略检查间隔，查询全部应用
+            bundle_ids: 只查询指定的应用
+        """
+        if self.watchlist_worker and self.watchlist_worker.isRunning():
+            return
+        if not self.ipatool or not self.ipatool.account_email:
+            if force:
+                QMessageBox.warning(self, "警告", "请先登录 Apple ID")
+            return
+        if bundle_ids is None:
+            if force:
+                bundle_ids = self.watchlist.due(ttl=0, limit=None)
+            else:
+                # 每次只查询一批检查结果已过期的应用，请求均匀分布在整个间隔内
+                bundle_ids = self.watchlist.due(ttl=self.config.watchlist_interval * 60)
+        if not bundle_ids:
+            return
+        from .workers import WatchlistWorker
+        self.watchlist_worker = WatchlistWorker(self.ipatool, bundle_ids)
+        self.watchlist_worker.progress.connect(self.on_watchlist_progress)
+        self.watchlist_worker.finished.connect(self.on_watchlist_checked)
+        if self._tab_built(self.watchlist_tab_index):
+            self.watch_check_btn.setEnabled(False)
+        self.watchlist_worker.start()
+    
+    def on_watchlist_progress(self, done: int, total: int, result: dict):
+        """单个应用查询完成"""
+        if not self._tab_built(self.watchlist_tab_index):
+            return
+        self.watch_status_label.setText(f"正在检查 {done}/{total}: {result['bundle_id']}")
+    
+    def on_watchlist_checked(self, changed: list):
+        """一批查询完成，版本变化的应用加入下载队列"""
+        if changed:
+            print(f"关注列表: {len(changed)} 个应用有新版本: {', '.join(changed)}")
+            if self.config.watchlist_auto_download:
+                self.enqueue_watchlist_updates(changed)
+        if self._tab_built(self.watchlist_tab_index):
+            self.watch_check_btn.setEnabled(True)
+            self.watch_status_label.setText(
+                f"检查完成，{len(changed)} 个应用有新版本" if changed else "检查完成，没有新版本"
+            )
+            self.refresh_watchlist()
+    
+    def enqueue_watchlist_updates(self, bundle_ids: List[str]):
+        """把关注应用的当前版本加入下载队列（已在队列中或下载目录中已有该版本的跳过）"""
+        if not self.ipatool or not self.ipatool.account_email:
+            return
+        from core.staging import estimate_size
+        items = self.watchlist.items()
+        output_path = Path(self.config.download_path)
+        output_path.mkdir(parents=True, exist_ok=True)
+        history = self.config.get('download_history', [])
+        new_jobs = []
+        for bundle_id in bundle_ids:
+            entry = items.get(bundle_id)
+            if not entry or bundle_id in self._watch_inflight:
+                continue
+            version = entry.get('version', '')
+            if version and self.library.find(bundle_id, version):
+                self.watchlist.mark_downloaded(bundle_id, version)
+                continue
+            new_jobs.append(DownloadJob(
+                bundle_id=bundle_id, output_path=str(output_path / f"{bundle_id}.ipa"),
+                auto_purchase=self.config.auto_purchase,
+                expected_size=estimate_size(bundle_id, history), version=version
+            ))
+        if new_jobs:
+            self._watch_inflight.update(job.bundle_id for job in new_jobs)
+            self._ensure_tab(self.download_tab_index)
+            self._enqueue_jobs(new_jobs)
+            self.log(f"关注列表: {len(new_jobs)} 个应用有新版本，已加入下载队列")
+        self.refresh_watchlist()
+    
+    def create_metrics_tab(self) -> QWidget:
+        """创建指标标签页"""
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+        
+        # 并发控制状态
+        concurrency_group = QGroupBox("下载并发（自适应）")
+        concurrency_layout = QVBoxLayout()
+        self.concurrency_label = QLabel()
+        concurrency_layout.addWidget(self.concurrency_label)
+        self.rate_limit_label = QLabel()
+        self.rate_limit_label.setStyleSheet("color: #666;")
+        concurrency_layout.addWidget(self.rate_limit_label)
+        concurrency_group.setLayout(concurrency_layout)
+        layout.addWidget(concurrency_group)
+        
+        # 调整记录
+        self.decision_table = QTableWidget()
+        self.decision_table.setColumnCount(6)
+        self.decision_table.setHorizontalHeaderLabels([
+            "时间", "并发数", "原因", "总吞吐", "错误率", "每 MB 耗时"
+        ])
+        self.decision_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.decision_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.decision_table)
         
         return widget
     
+    def refresh_metrics(self):
+        """刷新指标页"""
+        if not self._tab_built(self.metrics_tab_index):
+            return
+        c = self.concurrency
+        self.concurrency_label.setText(
+            f"当前并发: {c.limit}（范围 {c.floor}-{c.ceiling}） · "
+            f"进行中: {self.download_queue.active_count} · 等待: {self.download_queue.pending_count} · "
+            f"当前级别吞吐: {format_bytes(c.throughput)}/s · 错误率: {c.error_rate:.0%}"
+        )
+        from core.ratelimit import get_rate_limiter
+        stats = get_rate_limiter().stats()
+        self.rate_limit_label.setText("限速等待: " + (" · ".join(
+            f"{cmd} {s['calls']} 次/{s['waited']:.1f}s" for cmd, s in sorted(stats.items())
+        ) or "无"))
+        
+        decisions = list(reversed(c.snapshot()))
+        self.decision_table.setRowCount(len(decisions))
+        for row, d in enumerate(decisions):
+            values = [
+                time.strftime('%H:%M:%S', time.localtime(d.ts)),
+                f"{d.old} → {d.new}" if d.changed else str(d.new),
+                d.reason,
+                f"{format_bytes(d.throughput)}/s",
+                f"{d.error_rate:.0%}",
+                f"{d.latency:.2f}s",
+            ]
+            for col, value in enumerate(values):
+                self.decision_table.setItem(row, col, QTableWidgetItem(value))
+    
+    def on_concurrency_changed(self, decision: Decision):
+        """并发控制器评估结果"""
+        if decision.changed:
+            self.log(f"并发下载数 {decision.old} → {decision.new}：{decision.reason}")
+        self.refresh_metrics()
+    
     def init_ipatool(self):
         """初始化 ipatool"""
         try:
@@ -361,6 +1101,9 @@ class MainWindow(QMainWindow):
     
     def install_ipatool(self):
         """安装 ipatool"""
+        from core.ipatool_installer import IPAToolInstaller
+        from .dialogs import InstallIPADialog
+        
         # 显示安装对话框
         dialog = InstallIPADialog(self, self.config)
         if dialog.exec():
@@ -379,6 +1122,9 @@ class MainWindow(QMainWindow):
         """安装完成"""
         self.statusBar().showMessage("ipatool 安装成功！", 5000)
         self.config.ipatool_path = path
+        # 可执行文件已更换，清空查找与版本缓存
+        from core.discovery import get_discovery_cache
+        get_discovery_cache().invalidate()
         self.init_ipatool()  # 重新初始化
         
         # 显示完成消息
@@ -402,6 +1148,40 @@ class MainWindow(QMainWindow):
     def check_auth(self):
         """检查认证状态"""
         if not self.ipatool:
+            self._apply_auth_info(None)
+            return False
+        
+        try:
+            return self._apply_auth_info(self.ipatool.get_account_info())
+        except Exception as e:
+            self._on_auth_error(str(e))
+            return False
+    
+    def check_auth_async(self):
+        """在后台线程检查认证状态，完成后更新界面"""
+        if not self.ipatool:
+            self._apply_auth_info(None)
+            return
+        from .workers import AuthWorker
+        self.auth_worker = AuthWorker(self.ipatool)
+        self.auth_worker.finished.connect(self._on_auth_checked)
+        self.auth_worker.error.connect(self._on_auth_error)
+        self.auth_worker.start()
+    
+    def _on_auth_checked(self, info: dict):
+        """后台认证检查完成（ipatool 的当前账号已更新）"""
+        logged_in = self._apply_auth_info(info)
+        if not self._resume_after_auth:
+            return
+        self._resume_after_auth = False
+        if logged_in:
+            self._resume_pending_jobs()
+        elif self.download_queue.recover():
+            self.log("未登录 Apple ID，未完成的下载任务将在下次启动时恢复")
+    
+    def _apply_auth_info(self, info) -> bool:
+        """根据账号信息更新界面，返回是否已登录"""
+        if info is None:
             self.account_label.setText("未登录 (ipatool 未初始化)")
             self.account_label.setStyleSheet("color: #ff3b30; padding: 5px;")
             self.login_btn.setText("登录")
@@ -409,38 +1189,32 @@ class MainWindow(QMainWindow):
             self.login_btn.clicked.connect(self.show_login_dialog)
             return False
         
-        try:
-            auth_result = self.ipatool.check_auth()
-            if auth_result:
-                info = self.ipatool.get_account_info()
-                if isinstance(info, dict) and 'email' in info:
-                    email = info.get('email', '未知')
-                    self.account_label.setText(f"已登录: {email}")
-                    self.account_label.setStyleSheet("color: #34c759; padding: 5px;")
-                    self.login_btn.setText("退出登录")
-                    self.login_btn.clicked.disconnect()
-                    self.login_btn.clicked.connect(self.logout)
-                    return True
-                else:
-                    self.log(f"获取账号信息失败: {info}")
-            
-            # 未登录或登录失效
-            self.account_label.setText("未登录")
-            self.account_label.setStyleSheet("color: #999; padding: 5px;")
-            self.login_btn.setText("登录")
+        if isinstance(info, dict) and info.get('email') is not None:
+            email = info.get('email', '未知')
+            self.account_label.setText(f"已登录: {email}")
+            self.account_label.setStyleSheet("color: #34c759; padding: 5px;")
+            self.login_btn.setText("退出登录")
             self.login_btn.clicked.disconnect()
-            self.login_btn.clicked.connect(self.show_login_dialog)
-            return False
-            
-        except Exception as e:
-            error_msg = str(e)
-            self.log(f"检查认证状态失败: {error_msg}")
-            self.account_label.setText("认证状态检查失败")
-            self.account_label.setStyleSheet("color: #ff9500; padding: 5px;")
-            return False
+            self.login_btn.clicked.connect(self.logout)
+            return True
+        
+        # 未登录或登录失效
+        self.account_label.setText("未登录")
+        self.account_label.setStyleSheet("color: #999; padding: 5px;")
+        self.login_btn.setText("登录")
+        self.login_btn.clicked.disconnect()
+        self.login_btn.clicked.connect(self.show_login_dialog)
+        return False
+    
+    def _on_auth_error(self, error_msg: str):
+        """认证状态检查失败"""
+        self.log(f"检查认证状态失败: {error_msg}")
+        self.account_label.setText("认证状态检查失败")
+        self.account_label.setStyleSheet("color: #ff9500; padding: 5px;")
     
     def show_login_dialog(self):
         """显示登录对话框"""
+        from .dialogs import LoginDialog
         dialog = LoginDialog(self, self.config)
         if dialog.exec():
             creds = dialog.get_credentials()
@@ -452,22 +1226,33 @@ class MainWindow(QMainWindow):
                 auth_code = ""
             self.login(email, password, auth_code)
     
-    def login(self, email: str, password: str, auth_code: str = ""):
-        """登录"""
+    def login(self, email: str, password: str, auth_code: str = "", ipatool: IPATool = None):
+        """
+        登录
+        
+        Args:
+            ipatool: 要登录的实例（账号池中的账号），None 则为主账号
+        """
         if not self.ipatool:
             QMessageBox.warning(self, "警告", "ipatool 未初始化")
             return False
+        tool = ipatool or self.ipatool
+        if self._downloads_block_auth(tool):
+            return False
         
         try:
             self.statusBar().showMessage("正在登录...")
-            result = self.ipatool.login(email, password, auth_code or None)
+            result = tool.login(email, password, auth_code or None)
             
             # 检查登录是否成功
             if isinstance(result, dict) and result.get('success', False):
                 # 验证登录状态
-                if self.ipatool.check_auth():
+                if tool.check_auth():
+                    # 共用系统钥匙串时其他账号的凭据可能已被覆盖，下次分配任务前重新核对
+                    self.account_pool.invalidate()
                     QMessageBox.information(self, "成功", "登录成功！")
-                    self.check_auth()  # 更新UI状态
+                    if tool is self.ipatool:
+                        self.check_auth()  # 更新UI状态
                     return True
                 else:
                     QMessageBox.warning(self, "警告", "登录状态验证失败，请重试")
@@ -485,11 +1270,13 @@ class MainWindow(QMainWindow):
                 if need_code_flag or need_code_text:
                     code, ok = QInputDialog.getText(self, "需要验证码", "请输入 6 位验证码：")
                     if ok and code.strip():
-                        retry = self.ipatool.login(email, password, code.strip())
+                        retry = tool.login(email, password, code.strip())
                         if isinstance(retry, dict) and (retry.get('success') or 'email' in retry):
-                            if self.ipatool.check_auth():
+                            if tool.check_auth():
+                                self.account_pool.invalidate()
                                 QMessageBox.information(self, "成功", "登录成功！")
-                                self.check_auth()
+                                if tool is self.ipatool:
+                                    self.check_auth()
                                 return True
                         else:
                             # 更新错误消息为重试结果
@@ -518,11 +1305,60 @@ class MainWindow(QMainWindow):
         finally:
             self.statusBar().showMessage("就绪")
     
+    def _downloads_block_auth(self, tool: IPATool) -> bool:
+        """账号有下载进行中时拒绝登录/注销（会话更新需等待下载结束，避免界面长时间无响应）"""
+        if self.download_queue.busy_for(tool):
+            QMessageBox.warning(self, "警告", "该账号有下载正在进行，请等待下载完成后再登录、注销或清除缓存")
+            return True
+        return False
+    
+    def show_account_pool(self):
+        """管理账号池"""
+        from .dialogs import AccountPoolDialog
+        dialog = AccountPoolDialog(self, self.account_pool, self.add_pool_account)
+        dialog.exec()
+        # 新账号可立即分担队列中等待的任务
+        self.download_queue.rebalance()
+    
+    def add_pool_account(self) -> bool:
+        """登录并添加账号池账号（在独立的 ipatool 主目录中登录）"""
+        if not self.ipatool:
+            QMessageBox.warning(self, "警告", "ipatool 未初始化")
+            return False
+        from .dialogs import LoginDialog
+        dialog = LoginDialog(self)
+        if not dialog.exec():
+            return False
+        creds = dialog.get_credentials()
+        email, password = creds[0].strip(), creds[1]
+        if not email or not password:
+            QMessageBox.warning(self, "警告", "Email 和密码不能为空")
+            return False
+        
+        existing = {a['email'].lower() for a in self.account_pool.accounts()}
+        self.account_pool.add(email)
+        tool = self.account_pool.tool_for(email, self.ipatool.ipatool_path)
+        if self.login(email, password, ipatool=tool):
+            if self.account_pool.verify(email, self.ipatool.ipatool_path):
+                self.log(f"已添加账号池账号: {tool.account_email}")
+                return True
+            QMessageBox.warning(
+                self, "警告",
+                f"登录后会话中的账号与 {email} 不一致（macOS 上多个账号可能共用系统钥匙串），该账号已停用"
+            )
+            return True
+        # 登录失败时不保留新建的账号
+        if email.lower() not in existing:
+            self.account_pool.remove(email)
+        return False
+    
     def logout(self):
         """退出登录"""
         if not self.ipatool:
             self.check_auth()  # 重置UI状态
             return
+        if self._downloads_block_auth(self.ipatool):
+            return
             
         reply = QMessageBox.question(
             self, "确认", "确定要退出登录吗？",
@@ -545,9 +1381,8 @@ class MainWindow(QMainWindow):
                     
                     # 清除搜索和下载状态
                     self.search_table.setRowCount(0)
-                    self.log_text.clear()
-                    self.progress_bar.setValue(0)
-                    self.progress_label.setText("等待下载...")
+                    self.last_search_results = []
+                    self._reset_download_state()
                     
                     QMessageBox.information(self, "成功", "已退出登录")
                 else:
@@ -564,6 +1399,8 @@ class MainWindow(QMainWindow):
     
     def clear_ipatool_cache(self):
         """清除 ipatool 本地缓存（认证）与已保存的账号信息"""
+        if self.ipatool and self._downloads_block_auth(self.ipatool):
+            return
         try:
             reply = QMessageBox.question(
                 self,
@@ -630,9 +1467,9 @@ class MainWindow(QMainWindow):
             # 清空日志与下载状态
             try:
                 self.search_table.setRowCount(0)
-                self.log_text.clear()
-                self.progress_bar.setValue(0)
-                self.progress_label.setText("等待下载...")
+                self.last_search_results = []
+                self._reset_download_state()
+                self.session.clear()
             except Exception:
                 pass
 
@@ -656,6 +1493,7 @@ class MainWindow(QMainWindow):
         self.search_table.setRowCount(0)
         
         # 创建搜索线程
+        from .workers import SearchWorker
         self.search_worker = SearchWorker(self.ipatool, keyword)
         self.search_worker.finished.connect(self.on_search_finished)
         self.search_worker.error.connect(self.on_search_error)
@@ -664,7 +1502,7 @@ class MainWindow(QMainWindow):
     def on_search_finished(self, results):
         """搜索完成"""
         try:
-            print(f"Search results received: {results}")
+            print(f"Search results received: {len(results) if results else 0}")
             self.search_btn.setEnabled(True)
             self.search_btn.setText("搜索")
             
@@ -674,6 +1512,7 @@ class MainWindow(QMainWindow):
             self.search_table.setColumnCount(0)  # 重置列
             
             if not results:
+                self.last_search_results = []
                 QMessageBox.information(self, "提示", "未找到相关应用")
                 return
             
@@ -683,104 +1522,8 @@ class MainWindow(QMainWindow):
                 QMessageBox.warning(self, "错误", "搜索结果格式不正确")
                 return
                 
-            # 设置表头
-            headers = ["应用名称", "Bundle ID", "版本", "价格", "操作"]
-            self.search_table.setColumnCount(len(headers))
-            self.search_table.setHorizontalHeaderLabels(headers)
-            
-            # 设置行数
-            self.search_table.setRowCount(len(results))
-            
-            for row, app in enumerate(results):
-                try:
-                    # 确保app是字典类型
-                    if not isinstance(app, dict):
-                        print(f"Skipping non-dict app data at index {row}: {app}")
-                        continue
-                    
-                    # 获取应用信息，提供默认值
-                    app_info = {
-                        'name': str(app.get('trackName') or app.get('name') or app.get('trackName', '未知应用')),
-                        'bundle_id': str(app.get('bundleId') or app.get('bundleID') or ''),
-                        'version': str(app.get('version') or ''),
-                        'price': str(app.get('formattedPrice') or app.get('price') or 'Free')
-                    }
-                    
-                    print(f"Processing app {row + 1}: {app_info}")
-                    
-                    # 应用名称
-                    name_item = QTableWidgetItem(app_info['name'])
-                    name_item.setTextAlignment(Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft)
-                    self.search_table.setItem(row, 0, name_item)
-                    
-                    # Bundle ID
-                    bundle_id = app_info['bundle_id']
-                    bundle_item = QTableWidgetItem(bundle_id)
-                    bundle_item.setTextAlignment(Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft)
-                    self.search_table.setItem(row, 1, bundle_item)
-                    
-                    # 版本
-                    version_item = QTableWidgetItem(app_info['version'])
-                    version_item.setTextAlignment(Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft)
-                    self.search_table.setItem(row, 2, version_item)
-                    
-                    # 价格
-                    price_item = QTableWidgetItem(app_info['price'])
-                    price_item.setTextAlignment(Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignRight)
-                    self.search_table.setItem(row, 3, price_item)
-                    
-                    # 下载按钮
-                    if bundle_id:  # 只有在有 bundle_id 时才添加下载按钮
-                        download_btn = QPushButton("下载")
-                        download_btn.setCursor(Qt.CursorShape.PointingHandCursor)
-                        download_btn.setProperty("bundle_id", bundle_id)  # 存储bundle_id
-                        download_btn.setStyleSheet("""
-                            QPushButton {
-                                background-color: #4CAF50;
-                                border: none;
-                                color: white;
-                                padding: 5px 10px;
-                                text-align: center;
-                                text-decoration: none;
-                                margin: 2px 1px;
-                                border-radius: 4px;
-                                min-width: 60px;
-                            }
-                            QPushButton:hover {
-                                background-color: #45a049;
-                            }
-                            QPushButton:disabled {
-                                background-color: #cccccc;
-                            }
-                        """)
-                        # 使用functools.partial确保正确的bundle_id被传递
-                        from functools import partial
-                        download_btn.clicked.connect(partial(self.download_from_search, bundle_id))
-                        self.search_table.setCellWidget(row, 4, download_btn)
-                    
-                    print(f"Added app to table: {app_info['name']} - {bundle_id}")
-                    
-                except Exception as app_error:
-                    print(f"Error processing app at index {row}: {str(app_error)}")
-                    import traceback
-                    traceback.print_exc()
-                    continue
-            
-            # 调整列宽策略
-            header = self.search_table.horizontalHeader()
-            header.setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)  # 应用名称 - 自适应
-            header.setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents)  # Bundle ID
-            header.setSectionResizeMode(2, QHeaderView.ResizeMode.ResizeToContents)  # 版本
-            header.setSectionResizeMode(3, QHeaderView.ResizeMode.ResizeToContents)  # 价格
-            header.setSectionResizeMode(4, QHeaderView.ResizeMode.Fixed)  # 操作按钮
-            header.resizeSection(4, 80)  # 设置操作列固定宽度
-            
-            # 启用排序
-            self.search_table.setSortingEnabled(True)
-            
-            # 滚动到顶部
-            if results:
-                self.search_table.scrollToTop()
+            self.last_search_results = results
+            self._populate_search_table(results)
             
             # 更新状态栏
             self.update_status(f"找到 {len(results)} 个应用")
@@ -794,6 +1537,77 @@ class MainWindow(QMainWindow):
             traceback.print_exc()
             QMessageBox.critical(self, "错误", error_msg)
     
+    def _populate_search_table(self, results: List[AppRecord]):
+        """填充搜索结果表格"""
+        self.search_table.setSortingEnabled(False)
+        
+        # 设置表头
+        headers = ["应用名称", "Bundle ID", "版本", "价格", "操作"]
+        self.search_table.setColumnCount(len(headers))
+        self.search_table.setHorizontalHeaderLabels(headers)
+        
+        # 设置行数
+        self.search_table.setRowCount(len(results))
+        
+        align_left = Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft
+        align_right = Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignRight
+        for row, app in enumerate(results):
+            try:
+                # 应用名称
+                name_item = QTableWidgetItem(app.name)
+                name_item.setTextAlignment(align_left)
+                self.search_table.setItem(row, 0, name_item)
+                
+                # Bundle ID
+                bundle_id = app.bundle_id
+                bundle_item = QTableWidgetItem(bundle_id)
+                bundle_item.setTextAlignment(align_left)
+                self.search_table.setItem(row, 1, bundle_item)
+                
+                # 版本
+                if bundle_id and app.version:
+                    self._search_versions[bundle_id] = app.version
+                version_item = QTableWidgetItem(app.version)
+                version_item.setTextAlignment(align_left)
+                self.search_table.setItem(row, 2, version_item)
+                
+                # 价格
+                price_item = QTableWidgetItem(app.formatted_price)
+                price_item.setTextAlignment(align_right)
+                self.search_table.setItem(row, 3, price_item)
+                
+                # 下载按钮
+                if bundle_id:  # 只有在有 bundle_id 时才添加下载按钮
+                    download_btn = QPushButton("下载")
+                    download_btn.setObjectName("rowDownloadButton")  # 样式由表格统一设置
+                    download_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+                    download_btn.setProperty("bundle_id", bundle_id)  # 存储bundle_id
+                    # 使用functools.partial确保正确的bundle_id被传递
+                    download_btn.clicked.connect(partial(self.download_from_search, bundle_id))
+                    self.search_table.setCellWidget(row, 4, download_btn)
+                
+            except Exception as app_error:
+                print(f"Error processing app at index {row}: {str(app_error)}")
+                import traceback
+                traceback.print_exc()
+                continue
+        
+        # 调整列宽策略
+        header = self.search_table.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)  # 应用名称 - 自适应
+        header.setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents)  # Bundle ID
+        header.setSectionResizeMode(2, QHeaderView.ResizeMode.ResizeToContents)  # 版本
+        header.setSectionResizeMode(3, QHeaderView.ResizeMode.ResizeToContents)  # 价格
+        header.setSectionResizeMode(4, QHeaderView.ResizeMode.Fixed)  # 操作按钮
+        header.resizeSection(4, 80)  # 设置操作列固定宽度
+        
+        # 启用排序
+        self.search_table.setSortingEnabled(True)
+        
+        # 滚动到顶部
+        if results:
+            self.search_table.scrollToTop()
+    
     def on_search_error(self, error_msg):
         """搜索错误"""
         try:
@@ -821,8 +1635,9 @@ class MainWindow(QMainWindow):
     
     def download_from_search(self, bundle_id: str):
         """从搜索结果下载"""
+        self._ensure_tab(self.download_tab_index)
         self.bundle_input.setText(bundle_id)
-        self.tab_widget.setCurrentIndex(1)  # 切换到下载标签页
+        self.tab_widget.setCurrentIndex(self.download_tab_index)  # 切换到下载标签页
         self.start_download()
     
     def browse_output_path(self):
@@ -831,13 +1646,14 @@ class MainWindow(QMainWindow):
         if path:
             self.output_path.setText(path)
             self.config.download_path = path
+            self.scan_library()
     
     def start_download(self):
-        """开始下载"""
-        bundle_id = self.bundle_input.text().strip()
+        """开始下载（多个 Bundle ID 以空格、逗号或换行分隔时批量加入队列）"""
+        bundle_ids = [b for b in re.split(r'[\s,;，；]+', self.bundle_input.text().strip()) if b]
         app_id = self.appid_input.text().strip()
         
-        if not bundle_id and not app_id:
+        if not bundle_ids and not app_id:
             QMessageBox.warning(self, "警告", "请输入 Bundle ID 或 App ID")
             return
         
@@ -851,58 +1667,331 @@ class MainWindow(QMainWindow):
             return
         
         # 准备下载
+        from core.staging import MIN_FREE_BYTES, SIZE_MARGIN, cleanup_stale, estimate_size
         output_path = Path(self.output_path.text())
         output_path.mkdir(parents=True, exist_ok=True)
+        auto_purchase = self.auto_purchase_check.isChecked()
+        # 清理上次异常退出遗留的暂存文件
+        cleanup_stale(str(output_path))
+        if os.path.abspath(output_path) != self.library_watcher.root:
+            self.scan_library(str(output_path))
+        history = self.config.get('download_history', [])
+        skipped = []
         
-        filename = f"{bundle_id or app_id}.ipa"
-        full_path = str(output_path / filename)
+        if bundle_ids:
+            new_jobs = [
+                DownloadJob(bundle_id=b, output_path=str(output_path / f"{b}.ipa"), auto_purchase=auto_purchase,
+                            expected_size=estimate_size(b, history), version=self._search_versions.get(b, ''))
+                for b in bundle_ids
+            ]
+            # 当前版本已在下载目录（或曾经的下载目录）中存在时跳过
+            for job in new_jobs:
+                existing = self.library.find(job.bundle_id, job.version) if job.version else []
+                if existing:
+                    skipped.append((job, existing[0]))
+            if skipped:
+                skipped_ids = {job.id for job, _ in skipped}
+                new_jobs = [job for job in new_jobs if job.id not in skipped_ids]
+                if not new_jobs:
+                    QMessageBox.information(
+                        self, "提示",
+                        "所选应用的当前版本已存在：\n" + "\n".join(path for _, path in skipped)
+                    )
+                    return
+        else:
+            new_jobs = [
+                DownloadJob(app_id=app_id, output_path=str(output_path / f"{app_id}.ipa"), auto_purchase=auto_purchase)
+            ]
         
-        self.download_btn.setEnabled(False)
-        self.progress_bar.setValue(0)
-        self.progress_label.setText("准备下载...")
-        self.log_text.clear()
-        self.log("开始下载...")
+        # 批量下载前按已知大小预估所需空间，避免中途写满磁盘（每个任务开始时还会再次检查）
+        known = sum(job.expected_size for job in new_jobs)
+        if known:
+            try:
+                free = shutil.disk_usage(str(output_path)).free
+            except OSError:
+                free = None
+            needed = int(known * SIZE_MARGIN) + MIN_FREE_BYTES
+            if free is not None and free < needed:
+                reply = QMessageBox.question(
+                    self, "磁盘空间不足",
+                    f"已知大小的 {sum(1 for j in new_jobs if j.expected_size)} 个应用预计需要 "
+                    f"{format_bytes(needed)}，下载目录剩余 {format_bytes(free)}。\n\n是否仍然继续？",
+                    QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+                    QMessageBox.StandardButton.No
+                )
+                if reply != QMessageBox.StandardButton.Yes:
+                    return
         
-        # 创建下载线程
-        auto_purchase = self.auto_purchase_check.isChecked()
-        self.download_worker = DownloadWorker(
-            self.ipatool, bundle_id, app_id, full_path, auto_purchase
+        self._enqueue_jobs(new_jobs)
+        for job, path in skipped:
+            self.log(f"已存在 {job.bundle_id} {job.version}，跳过: {path}")
+    
+    def _enqueue_jobs(self, new_jobs: List[DownloadJob]):
+        """把任务加入下载队列（队列空闲时开始新的一批）"""
+        if self.download_queue.idle:
+            self._batch = {'total': 0, 'done': 0, 'failed': 0}
+            self.progress_bar.setValue(0)
+            self.progress_label.setText("准备下载...")
+            self.log_text.clear()
+            self.log("开始下载...")
+        self._batch['total'] += len(new_jobs)
+        if len(new_jobs) > 1:
+            self.log(f"已加入队列: {len(new_jobs)} 个任务")
+        for job in new_jobs:
+            self.download_queue.enqueue(job)
+        self._update_queue_label()
+    
+    def start_bulk_license(self):
+        """批量获取许可（读取 Bundle ID 列表文件，结果写入同目录的 CSV 报告）"""
+        if not self.ipatool:
+            QMessageBox.warning(self, "警告", "ipatool 未初始化")
+            return
+        
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "选择 Bundle ID 列表", "", "文本文件 (*.txt *.csv);;所有文件 (*)"
         )
-        self.download_worker.progress.connect(self.on_download_progress)
-        self.download_worker.finished.connect(self.on_download_finished)
-        self.download_worker.error.connect(self.on_download_error)
-        self.download_worker.start()
+        if not file_path:
+            return
+        
+        from core.bulk_license import read_bundle_ids
+        try:
+            bundle_ids = read_bundle_ids(file_path)
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"读取列表失败：\n{str(e)}")
+            return
+        if not bundle_ids:
+            QMessageBox.information(self, "提示", "列表中没有 Bundle ID")
+            return
+        
+        if not self.ipatool.check_auth():
+            QMessageBox.warning(self, "警告", "请先登录 Apple ID")
+            self.show_login_dialog()
+            return
+        
+        self._bulk_report_path = str(Path(file_path).with_name(Path(file_path).stem + '_licenses.csv'))
+        self.bulk_license_btn.setEnabled(False)
+        self.log(f"开始批量获取许可: {len(bundle_ids)} 个应用")
+        from .workers import BulkLicenseWorker
+        self.bulk_license_worker = BulkLicenseWorker(self.ipatool, bundle_ids)
+        self.bulk_license_worker.progress.connect(self.on_bulk_license_progress)
+        self.bulk_license_worker.finished.connect(self.on_bulk_license_finished)
+        self.bulk_license_worker.error.connect(self.on_bulk_license_error)
+        self.bulk_license_worker.start()
+    
+    def on_bulk_license_progress(self, done: int, total: int, entry: dict):
+        """批量获取许可进度"""
+        error = f" ({entry['error']})" if entry.get('error') else ""
+        self.log(f"[许可 {done}/{total}] {entry['bundle_id']}: {entry['status']}{error}")
+        self.statusBar().showMessage(f"批量获取许可: {done}/{total}")
+    
+    def on_bulk_license_finished(self, results: list):
+        """批量获取许可完成"""
+        from core.bulk_license import summarize, write_report, LICENSED, CACHED, FAILED
+        self.bulk_license_btn.setEnabled(True)
+        self.statusBar().showMessage("就绪")
+        counts = summarize(results)
+        report = self._bulk_report_path
+        try:
+            write_report(results, report)
+        except Exception as e:
+            report = f"写入报告失败: {e}"
+        QMessageBox.information(
+            self,
+            "批量获取许可完成",
+            f"新获取 {counts[LICENSED]} 个，已拥有 {counts[CACHED]} 个，失败 {counts[FAILED]} 个。\n\n报告：{report}"
+        )
+    
+    def verify_library(self):
+        """校验下载历史中仍存在的全部 IPA"""
+        history = self.config.get('download_history', [])
+        # 文件是否仍存在由校验线程检查，避免在界面线程逐条访问磁盘
+        paths = list(dict.fromkeys(
+            item['file_path'] for item in history
+            if isinstance(item, dict) and item.get('file_path')
+        ))
+        if not paths:
+            QMessageBox.information(self, "提示", "没有可校验的文件")
+            return
+        
+        self.verify_library_btn.setEnabled(False)
+        self.log(f"开始校验下载历史中的文件（{len(paths)} 条记录）")
+        from .workers import VerifyWorker
+        self.verify_worker = VerifyWorker(paths)
+        self.verify_worker.progress.connect(self.on_verify_progress)
+        self.verify_worker.finished.connect(self.on_verify_finished)
+        self.verify_worker.error.connect(self.on_verify_error)
+        self.verify_worker.start()
+    
+    def on_verify_progress(self, done: int, total: int, entry: dict):
+        """校验进度"""
+        if not entry['ok']:
+            self.log(f"[校验 {done}/{total}] 文件损坏: {entry['path']}: {'; '.join(entry['errors'][:3])}")
+        self.statusBar().showMessage(f"校验库: {done}/{total}")
+    
+    def on_verify_finished(self, results: list):
+        """校验完成，结果写回历史记录"""
+        self.verify_library_btn.setEnabled(True)
+        self.statusBar().showMessage("就绪")
+        if not results:
+            QMessageBox.information(self, "提示", "没有可校验的文件")
+            return
+        status = {r['path']: r['ok'] for r in results}
+        now = int(time.time())
+        history = self.config.get('download_history', [])
+        for item in history:
+            if isinstance(item, dict) and item.get('file_path') in status:
+                item['verified'] = now
+                item['intact'] = status[item['file_path']]
+        self.config.set('download_history', history)
+        
+        bad = [r['path'] for r in results if not r['ok']]
+        total_mb = sum(r['bytes'] for r in results) / 1048576
+        message = f"共校验 {len(results)} 个文件（解压 {total_mb:.1f} MB），损坏 {len(bad)} 个。"
+        if bad:
+            message += "\n\n" + "\n".join(bad[:10])
+            if len(bad) > 10:
+                message += f"\n…… 另有 {len(bad) - 10} 个"
+            QMessageBox.warning(self, "校验完成", message)
+        else:
+            QMessageBox.information(self, "校验完成", message)
+    
+    def on_verify_error(self, error_msg: str):
+        """校验出错"""
+        self.verify_library_btn.setEnabled(True)
+        self.statusBar().showMessage("就绪")
+        QMessageBox.critical(self, "错误", f"校验失败：\n{error_msg}")
+    
+    def on_bulk_license_error(self, error_msg: str):
+        """批量获取许可出错"""
+        self.bulk_license_btn.setEnabled(True)
+        self.statusBar().showMessage("就绪")
+        self.log(f"批量获取许可失败: {error_msg}")
+        QMessageBox.critical(self, "错误", f"批量获取许可失败：\n{error_msg}")
     
-    def on_download_progress(self, message: str, percent: int):
+    def _resume_pending_jobs(self):
+        """恢复上次未完成的下载任务"""
+        pending = self.download_queue.recover()
+        if not pending:
+            return
+        names = "\n".join(job.label for job in pending[:10])
+        more = f"\n... 共 {len(pending)} 个" if len(pending) > 10 else ""
+        reply = QMessageBox.question(
+            self,
+            "恢复下载",
+            f"发现 {len(pending)} 个未完成的下载任务：\n\n{names}{more}\n\n是否继续下载？",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            QMessageBox.StandardButton.Yes
+        )
+        if reply != QMessageBox.StandardButton.Yes or not self.ipatool:
+            self.download_queue.discard(pending)
+            return
+        self._ensure_tab(self.download_tab_index)
+        self._batch = {'total': len(pending), 'done': 0, 'failed': 0}
+        self.log(f"恢复 {len(pending)} 个未完成的下载任务")
+        self.download_queue.resume(pending)
+        self._update_queue_label()
+    
+    def _update_queue_label(self):
+        """更新队列状态"""
+        if not self._tab_built(self.download_tab_index):
+            return
+        queue = self.download_queue
+        if queue.idle:
+            self.queue_label.setText("")
+            return
+        batch = self._batch
+        self.queue_label.setText(
+            f"队列: 进行中 {queue.active_count} · 等待 {queue.pending_count}"
+            f" · 完成 {batch['done']}/{batch['total']} · 失败 {batch['failed']}"
+        )
+    
+    def on_job_started(self, job: DownloadJob):
+        """任务开始"""
+        self._ensure_tab(self.download_tab_index)
+        self.progress_bar.setValue(0)
+        self.progress_label.setText(f"[{job.label}] 准备下载...")
+        self._update_queue_label()
+        # 下载期间暂停后台文件检查，避免争用磁盘
+        if self.history_check_worker and self.history_check_worker.isRunning():
+            self.history_check_worker.pause()
+    
+    def on_download_progress(self, job: DownloadJob, message: str, percent: int):
         """下载进度更新"""
-        self.progress_label.setText(message)
-        self.progress_bar.setValue(percent)
-        self.log(message)
+        self.progress_label.setText(f"[{job.label}] {message}")
+        self.progress_bar.setValue(max(self.progress_bar.value(), percent))
+        self.log(f"[{job.label}] {message}")
+    
+    def on_download_transfer(self, job: DownloadJob, event):
+        """传输进度更新（已下载字节、速率、剩余时间）"""
+        self.progress_label.setText(f"[{job.label}] {event.message}")
+        if event.percent is not None:
+            from .workers import DownloadWorker
+            percent = DownloadWorker.overall_percent(event.percent)
+            self.progress_bar.setValue(max(self.progress_bar.value(), percent))
+        if event.stage == 'finished':
+            self.log(f"[{job.label}] {event.message}")
     
-    def on_download_finished(self, file_path: str):
+    def on_download_finished(self, job: DownloadJob, file_path: str):
         """下载完成"""
         try:
-            self.download_btn.setEnabled(True)
+            self._batch['done'] += 1
+            self._update_queue_label()
             self.progress_bar.setValue(100)
-            self.progress_label.setText("下载完成！")
+            self.progress_label.setText(f"[{job.label}] 下载完成！")
             self.log(f"下载成功: {file_path}")
             
-            # 保存下载历史
+            # 保存下载历史（附带下载清单中的摘要与版本信息）
+            from core.ipa_inspect import inspect_ipa
+            from core.manifest import load_manifest, manifest_path
+            manifest = load_manifest(file_path) or {}
+            # 应用名称与版本取自 IPA 中的 Info.plist（清单中已有则直接使用）
+            if manifest:
+                info = {'name': manifest.get('app_name'), 'version': manifest.get('version')}
+            else:
+                info = inspect_ipa(file_path) or {}
             history = self.config.get('download_history', [])
-            history.append({
+            entry = {
                 'file_path': file_path,
-                'app_name': self.bundle_input.text() or Path(file_path).stem,
-                'bundle_id': self.bundle_input.text(),
-                'timestamp': int(time.time())
-            })
+                'app_name': info.get('name') or job.label or Path(file_path).stem,
+                'bundle_id': job.bundle_id,
+                'timestamp': int(time.time()),
+                'size': manifest.get('size') or (Path(file_path).stat().st_size if Path(file_path).is_file() else 0)
+            }
+            if info.get('version'):
+                entry['version'] = info['version']
+            # 同步到库索引（清单中已有信息，无需重新读取 IPA）
+            self.library.update_file(file_path, {
+                'bundle_id': manifest.get('bundle_id') or job.bundle_id,
+                'name': info.get('name'),
+                'version': info.get('version'),
+                'build': manifest.get('build'),
+            } if manifest else None)
+            if manifest:
+                entry.update({
+                    'sha256': manifest.get('sha256'),
+                    'version': manifest.get('version'),
+                    'external_version_id': manifest.get('external_version_id'),
+                    'account': manifest.get('account'),
+                    'manifest': manifest_path(file_path),
+                })
+                if manifest.get('blake3'):
+                    entry['blake3'] = manifest['blake3']
+            history.append(entry)
             self.config.set('download_history', history)
             
-            # 刷新历史记录
-            self.refresh_history()
+            # 历史表格只插入新的一行（显示下载目录时由目录监视更新）
+            if self._tab_built(self.history_tab_index) and not self._showing_library():
+                self.history_model.prepend(entry)
+            self._update_history_stats()
             
-            # 如果当前在历史页，确保可见更新；否则不强制切换
-            if self.tab_widget.currentIndex() == getattr(self, 'history_tab_index', 2):
-                self.history_table.repaint()
+            # 关注的应用记录已下载的版本
+            self._watch_inflight.discard(job.bundle_id)
+            if self.watchlist.mark_downloaded(job.bundle_id, info.get('version') or job.version):
+                self.refresh_watchlist()
+            
+            # 批量下载时不逐个弹窗，队列清空后统一汇总
+            if self._batch['total'] > 1 or not self.download_queue.idle:
+                return
             
             reply = QMessageBox.information(
                 self,
@@ -926,86 +2015,85 @@ class MainWindow(QMainWindow):
             import traceback
             traceback.print_exc()
     
-    def on_download_error(self, error_msg: str):
+    def on_download_error(self, job: DownloadJob, error_msg: str):
         """下载错误"""
-        self.download_btn.setEnabled(True)
-        self.progress_label.setText("下载失败")
-        self.log(f"错误: {error_msg}")
-        QMessageBox.critical(self, "下载失败", f"下载失败：\n{error_msg}")
+        self._batch['failed'] += 1
+        self._update_queue_label()
+        if job.bundle_id in self._watch_inflight:
+            self._watch_inflight.discard(job.bundle_id)
+            self.refresh_watchlist()
+        self.progress_label.setText(f"[{job.label}] 下载失败")
+        self.log(f"[{job.label}] 错误: {error_msg}")
+        if self._batch['total'] == 1 and self.download_queue.idle:
+            QMessageBox.critical(self, "下载失败", f"下载失败：\n{error_msg}")
+    
+    def on_queue_drained(self):
+        """队列清空"""
+        self._update_queue_label()
+        if self.history_check_worker:
+            self.history_check_worker.resume()
+        batch = self._batch
+        if batch['total'] > 1:
+            self.progress_label.setText("队列已完成")
+            QMessageBox.information(
+                self,
+                "批量下载完成",
+                f"共 {batch['total']} 个任务：成功 {batch['done']} 个，失败 {batch['failed']} 个。\n\n"
+                "失败原因见下载日志。"
+            )
     
     def log(self, message: str):
-        """添加日志"""
+        """添加日志（下载标签页未构建时先缓存）"""
+        if not self._tab_built(self.download_tab_index):
+            self._pending_logs.append(message)
+            return
         self.log_text.append(message)
     
+    def _reset_download_state(self):
+        """清空下载日志与进度"""
+        self._pending_logs.clear()
+        if not self._tab_built(self.download_tab_index):
+            return
+        self.log_text.clear()
+        self.progress_bar.setValue(0)
+        self.progress_label.setText("等待下载...")
+    
     def refresh_history(self):
-        """刷新历史"""
+        """刷新历史（重新读取全部记录）"""
+        # 历史标签页尚未构建时无需刷新，首次显示时会自动加载
+        if not self._tab_built(self.history_tab_index):
+            return
         try:
-            # 清空表格
-            self.history_table.setRowCount(0)
-            
-            # 从配置文件加载历史记录
-            history = self.config.get('download_history', [])
-            
-            if not history:
-                print("No download history found")
-                return
-                
-            # 设置表头
-            headers = ["文件名", "应用名称", "Bundle ID", "下载时间", "文件路径"]
-            self.history_table.setColumnCount(len(headers))
-            self.history_table.setHorizontalHeaderLabels(headers)
-            
-            # 设置行数
-            self.history_table.setRowCount(len(history))
-            
-            # 按时间倒序排序
-            history_sorted = sorted(
-                history, 
-                key=lambda x: x.get('timestamp', 0), 
-                reverse=True
-            )
-            
-            for row, item in enumerate(history_sorted):
-                # 文件名
-                file_path = item.get('file_path', '')
-                file_name = Path(file_path).name if file_path else '未知'
-                name_item = QTableWidgetItem(file_name)
-                name_item.setData(Qt.ItemDataRole.UserRole, file_path)  # 存储完整路径
-                self.history_table.setItem(row, 0, name_item)
-                
-                # 应用名称
-                app_name = item.get('app_name', '未知')
-                app_item = QTableWidgetItem(app_name)
-                self.history_table.setItem(row, 1, app_item)
-                
-                # Bundle ID
-                bundle_id = item.get('bundle_id', '')
-                bundle_item = QTableWidgetItem(bundle_id)
-                self.history_table.setItem(row, 2, bundle_item)
-                
-                # 下载时间
-                timestamp = item.get('timestamp', 0)
-                from datetime import datetime
-                time_str = datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S') if timestamp else '未知'
-                time_item = QTableWidgetItem(time_str)
-                self.history_table.setItem(row, 3, time_item)
-                
-                # 文件路径
-                path_item = QTableWidgetItem(file_path)
-                path_item.setToolTip(file_path)  # 鼠标悬停显示完整路径
-                self.history_table.setItem(row, 4, path_item)
-                
-                print(f"Added to history: {app_name} - {bundle_id}")
-            
-            # 调整列宽
-            self.history_table.resizeColumnsToContents()
-            self.history_table.horizontalHeader().setStretchLastSection(True)
-            
+            self._load_history_model()
         except Exception as e:
             print(f"Error refreshing history: {str(e)}")
             import traceback
             traceback.print_exc()
     
+    def _load_history_model(self):
+        """把下载历史（或库索引中的文件）载入表格模型，保留当前的筛选条件"""
+        if self._showing_library():
+            items = [self._library_item(path, entry) for path, entry in self.library.entries().items()]
+        else:
+            items = self.config.get('download_history', [])
+        self.history_model.set_items(items)
+        self.history_model.set_missing(self._missing_paths)
+        self.history_model.set_changed(self._changed_paths)
+        self._update_prune_button()
+        self._update_history_stats()
+        self.history_model.set_filter(self.history_filter.text())
+    
+    def _showing_library(self) -> bool:
+        """历史页当前是否显示下载目录中的文件"""
+        return self._tab_built(self.history_tab_index) and self.history_scope.currentIndex() == 1
+    
+    def on_history_filter_changed(self, shown: int, total: int):
+        """筛选结果变化"""
+        if shown == total:
+            self.history_count_label.setText(f"共 {total} 条")
+        else:
+            self.history_count_label.setText(f"{shown} / {total} 条")
+    
     def clear_history(self):
         """清空历史"""
         try:
@@ -1022,7 +2110,8 @@ class MainWindow(QMainWindow):
                 self.config.set('download_history', [])
                 
                 # 清空表格
-                self.history_table.setRowCount(0)
+                if self._tab_built(self.history_tab_index):
+                    self._load_history_model()
                 
                 QMessageBox.information(self, "成功", "下载历史记录已清空")
                 
@@ -1032,10 +2121,25 @@ class MainWindow(QMainWindow):
     
     def show_settings(self):
         """显示设置对话框"""
+        from .dialogs import SettingsDialog
         dialog = SettingsDialog(self, self.config)
+        old_download_path = self.config.download_path
         if dialog.exec():
+            # ipatool 路径可能已修改，重新查找而不是沿用缓存的结果
+            from core.discovery import get_discovery_cache
+            get_discovery_cache().invalidate()
             self.init_ipatool()
-            self.output_path.setText(self.config.download_path)
+            self.check_auth_async()
+            self.concurrency.set_bounds(self.config.concurrency_floor, self.config.concurrency_ceiling)
+            self.download_queue.max_concurrent = self.concurrency.limit
+            self.download_queue.rebalance()
+            self.refresh_metrics()
+            if self._tab_built(self.download_tab_index):
+                self.output_path.setText(self.config.download_path)
+            if self.config.download_path != old_download_path:
+                # 下载目录已修改：监视新目录并建立索引
+                self.scan_library()
+            self.compact_history_now()
     
     def show_about(self):
         """显示关于对话框"""
@@ -4,14 +4,23 @@
 """
 
 from PyQt6.QtCore import QThread, pyqtSignal
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple
 from pathlib import Path
 import subprocess
 import os
-import json
+import threading
 import time
 
+from core.fastjson import loads as json_loads, DecodeError
+from core import jobs
 from core.ipatool import IPATool
+from core.hashing import StreamingHasher
+from core.ipa_inspect import inspect_ipa
+from core.manifest import build_manifest, write_manifest
+from core.licenses import LicensePrefetcher, acquire_license, get_license_cache, is_license_error
+from core.progress import ProgressEvent, TransferMonitor
+from core.ratelimit import get_rate_limiter
+from core.staging import get_space_reservations, preflight, remove_partial, staging_path
 
 
 class SearchWorker(QThread):
@@ -35,20 +44,249 @@ class SearchWorker(QThread):
             self.error.emit(str(e))
 
 
+class AuthWorker(QThread):
+    """认证状态检查线程"""
+    
+    finished = pyqtSignal(dict)  # 账号信息（未登录时不含 email）
+    error = pyqtSignal(str)  # 错误
+    
+    def __init__(self, ipatool: IPATool):
+        super().__init__()
+        self.ipatool = ipatool
+    
+    def run(self):
+        """执行检查"""
+        try:
+            info = self.ipatool.get_account_info()
+            self.finished.emit(info if isinstance(info, dict) else {})
+        except Exception as e:
+            self.error.emit(str(e))
+
+
+class BulkLicenseWorker(QThread):
+    """批量获取许可线程"""
+    
+    progress = pyqtSignal(int, int, dict)  # 进度 (已完成, 总数, 单个结果)
+    finished = pyqtSignal(list)  # 全部完成 (结果列表)
+    error = pyqtSignal(str)  # 错误
+    
+    def __init__(self, ipatool: IPATool, bundle_ids: List[str]):
+        super().__init__()
+        self.ipatool = ipatool
+        self.bundle_ids = bundle_ids
+    
+    def run(self):
+        """执行批量获取"""
+        from core.bulk_license import acquire_licenses
+        try:
+            total = len(self.bundle_ids)
+            done = [0]
+            lock = threading.Lock()
+            
+            def on_result(entry: Dict):
+                with lock:
+                    done[0] += 1
+                    count = done[0]
+                self.progress.emit(count, total, entry)
+            
+            results = acquire_licenses(self.ipatool, self.bundle_ids, on_result=on_result)
+            self.finished.emit(results)
+        except Exception as e:
+            self.error.emit(str(e))
+
+
+class AccountVerifyWorker(QThread):
+    """账号池账号身份核对线程（逐个在账号主目录中执行 auth info）"""
+    
+    finished = pyqtSignal(int)  # 全部完成 (可用的账号数)
+    
+    def __init__(self, pool, emails: List[str], ipatool_path: str):
+        super().__init__()
+        self.pool = pool
+        self.emails = emails
+        self.ipatool_path = ipatool_path
+    
+    def run(self):
+        """执行核对"""
+        # verify 内部处理 ipatool 的错误（核对失败的账号会被停用，不会反复重试）
+        usable = sum(1 for email in self.emails if self.pool.verify(email, self.ipatool_path))
+        self.finished.emit(usable)
+
+
+class VerifyWorker(QThread):
+    """IPA 完整性校验线程（实际校验在共享进程池中并行执行）"""
+    
+    progress = pyqtSignal(int, int, dict)  # 进度 (已完成, 总数, 单个结果)
+    finished = pyqtSignal(list)  # 全部完成 (结果列表)
+    error = pyqtSignal(str)  # 错误
+    
+    def __init__(self, paths: List[str]):
+        super().__init__()
+        self.paths = paths  # 下载历史中的路径，可能包含已删除的文件
+    
+    def run(self):
+        """执行校验（跳过已不存在的文件）"""
+        try:
+            paths = [path for path in self.paths if os.path.isfile(path)]
+            total = len(paths)
+            done = [0]
+            
+            def on_result(entry: Dict):
+                done[0] += 1
+                self.progress.emit(done[0], total, entry)
+            
+            # 校验进程池（multiprocessing）较重，第一次校验时才导入
+            from core.ipa_verify import get_verify_pool, verify_files
+            results = verify_files(paths, get_verify_pool(), on_result=on_result) if paths else []
+            self.finished.emit(results)
+        except Exception as e:
+            self.error.emit(str(e))
+
+
+class LibraryScanWorker(QThread):
+    """下载目录索引扫描线程"""
+    
+    directories = pyqtSignal(str, list)  # 扫描到的子目录 (根目录, 目录列表)，供目录监视使用
+    finished = pyqtSignal(dict)  # 扫描完成 (统计)
+    error = pyqtSignal(str)  # 错误
+    
+    def __init__(self, root: str):
+        super().__init__()
+        self.root = root
+    
+    def run(self):
+        """执行扫描"""
+        from core.library import get_library_index
+        try:
+            directories: List[str] = []
+            stats = get_library_index().scan(self.root, directories=directories)
+            self.directories.emit(os.path.abspath(self.root), directories)
+            self.finished.emit(stats)
+        except Exception as e:
+            self.error.emit(str(e))
+
+
+class HistoryCheckWorker(QThread):
+    """
+    后台检查历史记录中的文件（低优先级、分批执行）
+
+    每批之间稍作停顿；有下载进行时调用 pause 暂停，避免与下载争用磁盘。
+    """
+    
+    batch = pyqtSignal(dict)  # 一批的检查结果 {路径: 状态}
+    
+    BATCH_SIZE = 200
+    INTERVAL = 0.2  # 批次间隔（秒）
+    
+    def __init__(self, items: List[Dict]):
+        super().__init__()
+        # 同一路径只检查一次，以最近一次记录的大小为准
+        entries: Dict[str, int] = {}
+        for item in items:
+            if isinstance(item, dict) and item.get('file_path'):
+                size = item.get('size')
+                entries[item['file_path']] = size if isinstance(size, int) else 0
+        self.entries = list(entries.items())
+        self._resume = threading.Event()
+        self._resume.set()
+        self._stop = threading.Event()
+    
+    def pause(self):
+        """暂停（当前批次完成后生效）"""
+        self._resume.clear()
+    
+    def resume(self):
+        """继续"""
+        self._resume.set()
+    
+    def stop(self):
+        """停止"""
+        self._stop.set()
+        self._resume.set()
+    
+    def run(self):
+        """执行检查"""
+        from core.library import check_paths
+        for start in range(0, len(self.entries), self.BATCH_SIZE):
+            self._resume.wait()
+            if self._stop.is_set():
+                return
+            try:
+                self.batch.emit(check_paths(self.entries[start:start + self.BATCH_SIZE]))
+            except Exception as e:
+                print(f"检查历史记录失败: {e}")
+                return
+            if self._stop.wait(self.INTERVAL):
+                return
+
+
+class WatchlistWorker(QThread):
+    """关注列表版本查询线程（逐个查询，App Store 请求由 IPATool 统一限速）"""
+    
+    progress = pyqtSignal(int, int, dict)  # 进度 (已完成, 总数, {bundle_id, changed, version, error})
+    finished = pyqtSignal(list)  # 全部完成 (版本发生变化的 Bundle ID)
+    
+    def __init__(self, ipatool: IPATool, bundle_ids: List[str]):
+        super().__init__()
+        self.ipatool = ipatool
+        self.bundle_ids = bundle_ids
+        self._stop = threading.Event()
+    
+    def stop(self):
+        """停止（当前查询完成后生效）"""
+        self._stop.set()
+    
+    def run(self):
+        """执行查询"""
+        from core.watchlist import get_watchlist, lookup_version
+        watchlist = get_watchlist()
+        changed = []
+        total = len(self.bundle_ids)
+        for done, bundle_id in enumerate(self.bundle_ids, 1):
+            if self._stop.is_set():
+                break
+            try:
+                result = lookup_version(self.ipatool, bundle_id)
+                error = ''
+            except Exception as e:
+                result, error = None, str(e)
+            is_changed = watchlist.record(bundle_id, result, error)
+            if is_changed:
+                changed.append(bundle_id)
+            self.progress.emit(done, total, {
+                'bundle_id': bundle_id,
+                'changed': is_changed,
+                'version': (result or {}).get('version', ''),
+                'error': '' if result else (error or '未找到该应用'),
+            })
+        self.finished.emit(changed)
+
+
 class DownloadWorker(QThread):
     """下载工作线程"""
     
     progress = pyqtSignal(str, int)  # 进度更新 (消息, 百分比)
+    transfer = pyqtSignal(object)  # 传输进度 (ProgressEvent)
+    stage = pyqtSignal(str)  # 生命周期阶段 (core.jobs 中的状态)
     finished = pyqtSignal(str)  # 下载完成 (文件路径)
     error = pyqtSignal(str)  # 错误
     
+    # 下载阶段在整体进度条中占据的区间
+    DOWNLOAD_START = 30
+    DOWNLOAD_END = 95
+    SAMPLE_INTERVAL = 0.5  # 文件大小采样间隔（秒）
+    HASH_INTERVAL = 0.2  # 增量计算摘要的读取间隔（秒）
+    
     def __init__(
         self,
         ipatool: IPATool,
         bundle_id: Optional[str] = None,
         app_id: Optional[str] = None,
         output_path: Optional[str] = None,
-        auto_purchase: bool = True
+        auto_purchase: bool = True,
+        prefetcher: Optional[LicensePrefetcher] = None,
+        expected_size: int = 0,
+        verify: bool = True
     ):
         super().__init__()
         self.ipatool = ipatool
@@ -56,19 +294,183 @@ class DownloadWorker(QThread):
         self.app_id = app_id
         self.output_path = output_path
         self.auto_purchase = auto_purchase
+        self.prefetcher = prefetcher
+        self.expected_size = expected_size
+        self.verify = verify  # 改名为目标文件前校验 ZIP 结构与 CRC
+        # 暂存文件（ipatool 实际写入的位置）及磁盘空间预留
+        self.stage_path: Optional[str] = None
+        self._reserved = 0
+        # 成功后写入的下载清单
+        self.manifest: Optional[Dict] = None
+        self.hasher: Optional[StreamingHasher] = None
+        self._started = 0.0
+        self.monitor: Optional[TransferMonitor] = None
+        self.last_event: Optional[ProgressEvent] = None
+    
+    @classmethod
+    def overall_percent(cls, transfer_percent: Optional[float]) -> int:
+        """将传输百分比映射到整体进度条"""
+        if transfer_percent is None:
+            return cls.DOWNLOAD_START
+        span = cls.DOWNLOAD_END - cls.DOWNLOAD_START
+        return cls.DOWNLOAD_START + int(transfer_percent * span / 100)
+    
+    def _sample_loop(self, stop: threading.Event):
+        """定期采样输出文件大小并发送传输进度"""
+        while not stop.wait(self.SAMPLE_INTERVAL):
+            self.last_event = self.monitor.sample()
+            self.transfer.emit(self.last_event)
+    
+    def _hash_loop(self, stop: threading.Event):
+        """跟随 ipatool 写入增量计算输出文件的摘要"""
+        while not stop.wait(self.HASH_INTERVAL):
+            self.hasher.poll()
+    
+    def _stream(self, cmd: List[str]) -> Tuple[int, List[str]]:
+        """
+        启动 ipatool download 并流式读取输出，同时采样输出文件发送传输进度、增量计算摘要
+
+        Returns:
+            (返回码, 输出行)
+        """
+        # 账号池中的账号使用各自的 ipatool 主目录
+        env = self.ipatool.env()
+
+        # 启动子进程并流式读取
+        # 隐藏控制台窗口（Windows）
+        startupinfo = None
+        creationflags = 0
+        try:
+            import platform as _pl
+            if _pl.system() == 'Windows':
+                startupinfo = subprocess.STARTUPINFO()
+                startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+                creationflags = subprocess.CREATE_NO_WINDOW
+        except Exception:
+            startupinfo = None
+            creationflags = 0
+
+        proc = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            bufsize=1,
+            universal_newlines=True,
+            env=env,
+            startupinfo=startupinfo,
+            creationflags=creationflags
+        )
+
+        # 采样输出文件（ipatool 先写入 <output>.tmp）计算速率与剩余时间
+        sample_paths = [self.stage_path, self.stage_path + '.tmp'] if self.stage_path else []
+        self.monitor = TransferMonitor(sample_paths)
+        stop_sampling = threading.Event()
+        sampler = threading.Thread(target=self._sample_loop, args=(stop_sampling,), daemon=True)
+        sampler.start()
+        helpers = [sampler]
+        if self.stage_path:
+            # 与采样相同，下载过程中跟随 <output>.tmp，改名后继续使用已计算的部分
+            self.hasher = StreamingHasher(self.stage_path, self.stage_path + '.tmp')
+            hashing = threading.Thread(target=self._hash_loop, args=(stop_sampling,), daemon=True)
+            hashing.start()
+            helpers.append(hashing)
+
+        collected_lines: List[str] = []
+        percent = self.DOWNLOAD_START
+        try:
+            for line in proc.stdout:  # type: ignore[arg-type]
+                line_strip = line.strip()
+                if not line_strip:
+                    continue
+                collected_lines.append(line_strip)
+                # 解析 ipatool 报告的百分比/总大小，进度只增不减
+                if self.monitor.feed_line(line_strip):
+                    percent = max(percent, self.overall_percent(self.monitor.reported_percent))
+                self.progress.emit(line_strip, percent)
+
+            returncode = proc.wait()
+        finally:
+            stop_sampling.set()
+            for thread in helpers:
+                thread.join()
+        self.last_event = self.monitor.sample('finished')
+        self.transfer.emit(self.last_event)
+        return returncode, collected_lines
+    
+    def _locate_output(self, result: Dict) -> Optional[str]:
+        """
+        定位 ipatool 实际写出的文件：暂存文件 > 结果中的 output > 下载目录中本次生成的匹配文件
+        """
+        for candidate in (self.stage_path, result.get('output')):
+            if candidate and os.path.isfile(candidate):
+                return candidate
+        # 未指定输出路径时 ipatool 写入子进程的工作目录，即本进程的当前目录
+        directory = os.path.dirname(os.path.abspath(self.output_path)) if self.output_path else os.getcwd()
+        pattern = f"*{self.bundle_id or self.app_id}*.ipa"
+        files = [p for p in Path(directory).glob(pattern) if p.stat().st_mtime >= self._started - 1]
+        if not files:
+            return None
+        return str(max(files, key=lambda p: p.stat().st_mtime).absolute())
+    
+    def _write_manifest(
+        self,
+        path: str,
+        result: Dict,
+        account: Optional[str],
+        timings: Dict[str, float],
+        digests: Optional[Dict[str, str]] = None
+    ):
+        """写入下载清单（失败不影响下载结果）"""
+        try:
+            self.manifest = build_manifest(
+                path, result, self.bundle_id or '', self.app_id or '',
+                account, self.ipatool.version, timings, digests, inspect_ipa(path)
+            )
+            write_manifest(self.manifest, path)
+        except Exception as e:
+            print(f"写入下载清单失败: {e}")
     
     def run(self):
         """执行下载"""
+        self._started = time.time()
+        timings: Dict[str, float] = {'started': self._started}
+        clock = time.monotonic()
         try:
-            # 如果需要自动获取许可
+            # 如果需要自动获取许可：已缓存的许可直接跳过，
+            # 已确认拥有许可时下载命令不再附带 --purchase
+            license_cache = get_license_cache()
+            account = self.ipatool.account_email
+            purchase_flag = self.auto_purchase
             if self.auto_purchase and self.bundle_id:
-                self.progress.emit("正在获取应用许可...", 10)
-                purchase_result = self.ipatool.purchase(self.bundle_id)
-                if not purchase_result.get('success', True):
-                    # 许可获取失败可能是已经拥有，继续尝试下载
-                    pass
+                if license_cache.is_licensed(account, self.bundle_id):
+                    self.progress.emit("已拥有应用许可，跳过获取", 10)
+                    purchase_flag = False
+                else:
+                    self.stage.emit(jobs.PURCHASING)
+                    # 队列已提前为本任务获取许可时直接使用预取结果
+                    license_result = self.prefetcher.wait(self.bundle_id, account) if self.prefetcher else None
+                    if license_result is None:
+                        self.progress.emit("正在获取应用许可...", 10)
+                        license_result = acquire_license(self.ipatool, self.bundle_id, license_cache)
+                    else:
+                        self.progress.emit("已使用预先获取的应用许可结果", 10)
+                    if license_result['licensed']:
+                        purchase_flag = False
+                    # 许可获取失败时仍带 --purchase 尝试下载，由 ipatool 给出最终结果
+            timings['license'] = time.monotonic() - clock
+
+            # 检查剩余空间；下载写入同目录的暂存文件，校验后再原子改名为目标文件
+            if self.output_path:
+                out_dir = os.path.dirname(os.path.abspath(self.output_path))
+                os.makedirs(out_dir, exist_ok=True)
+                ok, message, self._reserved = preflight(out_dir, self.expected_size)
+                if not ok:
+                    self.error.emit(message)
+                    return
+                self.stage_path = staging_path(self.output_path)
 
             # 开始下载（流式输出）
+            self.stage.emit(jobs.DOWNLOADING)
             self.progress.emit("正在下载应用...", 30)
 
             # 组装命令参数
@@ -81,9 +483,9 @@ class DownloadWorker(QThread):
                 self.error.emit('必须提供 Bundle ID 或 App ID')
                 return
 
-            if self.output_path:
-                args += ['--output', self.output_path]
-            if self.auto_purchase:
+            if self.stage_path:
+                args += ['--output', self.stage_path]
+            if purchase_flag:
                 args += ['--purchase']
 
             # 与 IPATool._execute 一致的基础参数
@@ -95,71 +497,23 @@ class DownloadWorker(QThread):
 
             cmd = [self.ipatool.ipatool_path] + args + base_args
 
-            env = os.environ.copy()
-            env['PYTHONIOENCODING'] = 'utf-8'
-
-            # 启动子进程并流式读取
-            # 隐藏控制台窗口（Windows）
-            startupinfo = None
-            creationflags = 0
-            try:
-                import platform as _pl
-                if _pl.system() == 'Windows':
-                    startupinfo = subprocess.STARTUPINFO()
-                    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                    creationflags = subprocess.CREATE_NO_WINDOW
-            except Exception:
-                startupinfo = None
-                creationflags = 0
-
-            proc = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                bufsize=1,
-                universal_newlines=True,
-                env=env,
-                startupinfo=startupinfo,
-                creationflags=creationflags
-            )
-
-            collected_lines: List[str] = []
-            percent = 30
-            for line in proc.stdout:  # type: ignore[arg-type]
-                line_strip = line.strip()
-                if not line_strip:
-                    continue
-                collected_lines.append(line_strip)
-                # 尝试从行中解析进度百分比
-                updated = False
-                try:
-                    if '%' in line_strip:
-                        # 提取诸如 "65%" 的数字
-                        import re
-                        m = re.search(r"(\d{1,3})%", line_strip)
-                        if m:
-                            pct = int(m.group(1))
-                            # 将 30-95 作为下载阶段进度映射
-                            percent = max(percent, min(95, 30 + int(pct * 0.65)))
-                            updated = True
-                except Exception:
-                    pass
-                if not updated:
-                    # 若无法解析，缓慢推进，表示活跃
-                    percent = min(95, percent + 1)
-                self.progress.emit(line_strip, percent)
-
-            returncode = proc.wait()
+            # 共享 download 预算（先取令牌，限速等待期间不占用槽位）；
+            # 登录/注销期间等待，同一账号的下载进程数受信号量限制
+            get_rate_limiter().acquire('download', account)
+            with self.ipatool.command_slot('download', timeout=IPATool.SLOT_TIMEOUT):
+                download_started = time.monotonic()
+                returncode, collected_lines = self._stream(cmd)
+                timings['download'] = time.monotonic() - download_started
 
             # 结束后解析结果
             # 优先从收集的行中查找最后一个 JSON 对象
             result: Dict = {}
             for line in reversed(collected_lines):
                 try:
-                    obj = json.loads(line)
+                    obj = json_loads(line)
                     result = obj
                     break
-                except json.JSONDecodeError:
+                except DecodeError:
                     continue
 
             if not result:
@@ -169,27 +523,59 @@ class DownloadWorker(QThread):
                     first = full.find('{')
                     last = full.rfind('}')
                     if first != -1 and last != -1 and last > first:
-                        result = json.loads(full[first:last+1])
+                        result = json_loads(full[first:last+1])
                 except Exception:
                     pass
 
             if isinstance(result, dict) and result.get('success', False):
+                if self.bundle_id:
+                    license_cache.mark(account, self.bundle_id)
+                self.stage.emit(jobs.VERIFYING)
+                verify_started = time.monotonic()
+                produced = self._locate_output(result)
+                if produced is None:
+                    self.error.emit("ipatool 报告下载成功，但未找到输出文件")
+                    return
+                if os.path.getsize(produced) == 0:
+                    self.error.emit(f"下载的文件为空: {produced}")
+                    return
+                # 摘要已在下载过程中增量计算，这里只需读取最后写入的部分
+                digests = self.hasher.finish(produced) if self.hasher else None
+                if self.verify:
+                    self.progress.emit("正在校验文件...", self.DOWNLOAD_END)
+                    from core.ipa_verify import verify_ipa
+                    check = verify_ipa(produced)
+                    if not check['ok']:
+                        self.error.emit("下载的文件已损坏: " + "; ".join(check['errors'][:3]))
+                        return
+                final_path = self.output_path or produced
+                if os.path.abspath(produced) != os.path.abspath(final_path):
+                    # 原子替换：目标位置要么是旧文件，要么是完整的新文件
+                    os.replace(produced, final_path)
+                timings['verify'] = time.monotonic() - verify_started
+                timings['finished'] = time.time()
+                timings['total'] = timings['finished'] - self._started
+                self._write_manifest(final_path, result, account, timings, digests)
                 self.progress.emit("下载完成", 100)
-                if self.output_path and Path(self.output_path).exists():
-                    self.finished.emit(self.output_path)
-                else:
-                    pattern = f"*{self.bundle_id or self.app_id}*.ipa"
-                    files = list(Path('.').glob(pattern))
-                    if files:
-                        self.finished.emit(str(files[0].absolute()))
-                    else:
-                        self.finished.emit("未知位置")
+                self.finished.emit(final_path)
             else:
                 # 将子进程返回码与最后一行作为错误信息
                 err = result.get('error') if isinstance(result, dict) else None
                 if not err:
                     err = collected_lines[-1] if collected_lines else f"下载失败，返回码 {returncode}"
+                if self.bundle_id and is_license_error(err):
+                    license_cache.forget(account, self.bundle_id)
                 self.error.emit(err)
 
         except Exception as e:
             self.error.emit(str(e))
+        finally:
+            self._release_stage()
+    
+    def _release_stage(self):
+        """删除未能改名为目标文件的暂存文件（失败、异常），并释放空间预留"""
+        if self.stage_path:
+            remove_partial(self.stage_path)
+        if self._reserved:
+            get_space_reservations().release(os.path.dirname(os.path.abspath(self.output_path)), self._reserved)
+            self._reserved = 0